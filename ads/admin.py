@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Ad, ExchangeProposal
+from .models import Ad, ExchangeProposal, OutboxEvent
 
 
 class AdAdmin(admin.ModelAdmin):
@@ -16,4 +16,11 @@ class ExchangeProposalAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
 admin.site.register(Ad, AdAdmin)
-admin.site.register(ExchangeProposal, ExchangeProposalAdmin)
\ No newline at end of file
+admin.site.register(ExchangeProposal, ExchangeProposalAdmin)
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'recipient', 'proposal', 'attempts', 'available_at', 'last_error')
+    list_filter = ('kind', 'attempts')
+    raw_id_fields = ('recipient', 'proposal')
+
+admin.site.register(OutboxEvent, OutboxEventAdmin)
@@ -0,0 +1,115 @@
+"""
+Read-only JSON API для мобильного клиента.
+
+Списки листаются курсором (см. pagination.py) и получают ETag по
+содержимому ответа. Детальная страница объявления проверяет ETag и
+Last-Modified по updated_at еще до выборки и сериализации, поэтому
+неизмененное объявление возвращает 304 без тела.
+"""
+from django.middleware.http import ConditionalGetMiddleware
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import decorator_from_middleware
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import BasePagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+from . import inbox
+from .forms import AdSearchForm, ProposalInboxForm
+from .models import Ad
+from .pagination import KeysetPaginator
+from .queries import filter_ads
+from .serializers import AdListSerializer, AdDetailSerializer, ExchangeProposalSerializer
+
+conditional_get = decorator_from_middleware(ConditionalGetMiddleware)
+
+API_AD_FIELDS = ('id', 'title', 'category', 'condition', 'image_url', 'created_at', 'user__username')
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация DRF поверх KeysetPaginator"""
+    page_size = 20
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(queryset, self.page_size)
+        self.page = paginator.get_page(request.query_params.get(self.cursor_query_param))
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, 'page'), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.previous_cursor),
+            'results': data,
+        })
+
+
+def _paginated(request, queryset, serializer_class):
+    pagination = KeysetPagination()
+    page = pagination.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return pagination.get_paginated_response(serializer.data)
+
+
+def _ad_updated_at(request, pk):
+    # condition() вызывает обе функции, а запрос к БД нужен один: значение запоминается на запросе
+    if not hasattr(request, '_ad_updated_at'):
+        request._ad_updated_at = Ad.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return request._ad_updated_at
+
+
+def _ad_etag(request, pk):
+    updated_at = _ad_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    return f'ad-{pk}-{updated_at.timestamp()}'
+
+
+@conditional_get
+@api_view(['GET'])
+def ad_list(request):
+    """Список объявлений с теми же фильтрами, что и AdSearchForm"""
+    form = AdSearchForm(request.query_params)
+    if not form.is_valid():
+        return Response(form.errors, status=400)
+
+    data = form.cleaned_data
+    owner = request.user if data['is_mine'] and request.user.is_authenticated else None
+    queryset = Ad.objects.select_related('user').only(*API_AD_FIELDS)
+    queryset = filter_ads(queryset, data['query'], data['category'], data['condition'], owner)
+    return _paginated(request, queryset, AdListSerializer)
+
+
+@condition(etag_func=_ad_etag, last_modified_func=_ad_updated_at)
+@api_view(['GET'])
+def ad_detail(request, pk):
+    """Объявление целиком"""
+    ad = get_object_or_404(Ad.objects.select_related('user'), pk=pk)
+    return Response(AdDetailSerializer(ad, context={'request': request}).data)
+
+
+@conditional_get
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def proposal_list(request):
+    """Предложения обмена текущего пользователя: direction=sent|received, status"""
+    form = ProposalInboxForm(request.query_params)
+    if not form.is_valid():
+        return Response(form.errors, status=400)
+
+    # Та же выборка по индексу ленты, что и у страницы "Мои предложения"
+    queryset = inbox.inbox_queryset(request.user, form.cleaned_data['direction'], form.cleaned_data['status'])
+    pagination = KeysetPagination()
+    entries = pagination.paginate_queryset(queryset, request)
+    serializer = ExchangeProposalSerializer([entry.proposal for entry in entries], many=True,
+                                            context={'request': request})
+    return pagination.get_paginated_response(serializer.data)
@@ -0,0 +1,115 @@
+"""
+Асинхронные версии представлений чтения для запуска под ASGI.
+
+Запросы к БД выполняются через асинхронный ORM, поэтому запрос не занимает
+поток пула sync_to_async на все время обработки. Построение запросов и
+контекста общее с синхронными представлениями из views.py, которые
+по-прежнему обслуживают WSGI. Маршрутизация - project/asgi_urls.py.
+
+Здесь же поток server-sent events ленты предложений (live.py): под ASGI
+открытое соединение - это корутина, а не занятый поток.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render, aget_object_or_404
+
+from . import counters, live, similar, trade_cycles
+from .cache import cache_anonymous_page
+from .forms import ExchangeProposalForm
+from .models import Ad
+from .pagination import KeysetPaginator
+from .views import ADS_PER_PAGE, AD_LIST_FILTERS, ad_list_queryset, ad_list_context, user_ads_queryset, \
+    proposal_inbox_page, proposal_list_context
+
+
+# Комментарий в пустом потоке, чтобы прокси не закрыли соединение по таймауту
+EVENTS_KEEPALIVE = 15
+# Через сколько миллисекунд браузер переподключается после обрыва
+EVENTS_RETRY = 5000
+
+
+async def _resolve_user(request):
+    # Шаблоны обращаются к request.user синхронно, поэтому подставляем уже загруженного
+    # пользователя вместе со счетчиками для значка в шапке
+    request.user = await counters.preload_badge(await request.auser())
+    return request.user
+
+
+async def _numbered_page(queryset, number):
+    paginator = Paginator(queryset, ADS_PER_PAGE)
+    paginator.count = await queryset.acount()
+    page = paginator.get_page(number)
+    page.object_list = [obj async for obj in page.object_list]
+    return page
+
+
+@cache_anonymous_page(*AD_LIST_FILTERS, 'page', 'cursor')
+async def ad_list(request):
+    """Отображение списка объявлений с поиском и фильтрацией"""
+    user = await _resolve_user(request)
+    queryset = ad_list_queryset(request, user)
+    if request.GET.get('query'):
+        page_obj = await _numbered_page(queryset, request.GET.get('page'))
+    else:
+        page_obj = await KeysetPaginator(queryset, ADS_PER_PAGE).aget_page(request.GET.get('cursor'))
+
+    return render(request, 'ads/ad_list.html', ad_list_context(request, page_obj))
+
+
+@cache_anonymous_page()
+async def ad_detail(request, pk):
+    """Отображение детальной информации об объявлении"""
+    user = await _resolve_user(request)
+    ad = await aget_object_or_404(Ad.objects.select_related('user'), pk=pk)
+    context = {
+        'ad': ad,
+        'is_owner': user.pk == ad.user_id,
+        'similar_ads': [row.similar async for row in similar.similar_ads(ad.pk)],
+    }
+
+    if user.is_authenticated:
+        context['has_user_ads'] = await user_ads_queryset(user, ad.id).aexists()
+        context['proposal_form'] = ExchangeProposalForm()
+
+    return render(request, 'ads/ad_detail.html', context)
+
+
+@login_required
+async def my_proposals(request):
+    """Просмотр предложений обмена пользователя"""
+    user = await _resolve_user(request)
+    form, filters, paginator = proposal_inbox_page(request, user)
+    context = proposal_list_context(form, filters, await paginator.aget_page(request.GET.get('cursor')))
+    context['trade_cycles'] = await sync_to_async(trade_cycles.suggestions_for_user)(user)
+    return render(request, 'ads/proposal_list.html', context)
+
+
+async def _event_stream(user_id):
+    yield f'retry: {EVENTS_RETRY}\n\n'
+    async with live.get_bus().subscribe(user_id) as queue:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # До Python 3.11 это отдельный класс, а не встроенный TimeoutError
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+
+
+async def proposal_events(request):
+    """Поток событий ленты предложений пользователя (server-sent events)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        # Код 204 останавливает переподключения EventSource
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(_event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
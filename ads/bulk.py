@@ -0,0 +1,238 @@
+"""
+Массовая загрузка и выгрузка объявлений (команды import_ads и export_ads).
+
+Файлы CSV и JSONL читаются и пишутся построчно, поэтому расход памяти не
+зависит от их размера: в памяти держится только очередная пачка.
+
+Каждая импортируемая строка проверяется формой AdForm, как при создании
+объявления через сайт, а пачка вставляется одним bulk_create в своей
+транзакции. Пачка держит только пути к изображениям, а не содержимое
+файлов: изображения сохраняются в хранилище перед вставкой пачки и
+удаляются из него, если вставка не удалась. bulk_create не вызывает
+сигналы, поэтому поисковый индекс пачки обновляется здесь же, кэш страниц
+сбрасывается в конце, а миниатюры строит generate_thumbnails.
+
+Выгрузка читает values_list().iterator(chunk_size) в порядке id без
+загрузки моделей.
+"""
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils._os import safe_join
+
+from . import cache, search
+from .forms import AdForm
+from .models import Ad, ExchangeProposal, title_key
+
+FORMATS = ('csv', 'jsonl')
+
+# Колонки импорта: поля AdForm, изображение - путь относительно каталога --images
+IMPORT_COLUMNS = ('title', 'description', 'category', 'condition', 'image')
+
+# Колонка выгрузки -> поле для values_list
+EXPORT_FIELDS = {
+    'ads': (Ad, {
+        'id': 'id',
+        'user': 'user__username',
+        'title': 'title',
+        'description': 'description',
+        'category': 'category',
+        'condition': 'condition',
+        'image': 'image_url',
+        'created_at': 'created_at',
+    }),
+    'proposals': (ExchangeProposal, {
+        'id': 'id',
+        'ad_sender': 'ad_sender_id',
+        'ad_receiver': 'ad_receiver_id',
+        'sender_user': 'sender_user__username',
+        'receiver_user': 'receiver_user__username',
+        'status': 'status',
+        'comment': 'comment',
+        'created_at': 'created_at',
+    }),
+}
+
+
+class RowError(Exception):
+    def __init__(self, number, messages):
+        super().__init__(f'строка {number}: {"; ".join(messages)}')
+        self.number = number
+        self.messages = messages
+
+
+def detect_format(path, fmt=None):
+    """Формат из параметра или по расширению файла"""
+    fmt = fmt or Path(path).suffix.lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат {fmt!r}: укажите один из {", ".join(FORMATS)}')
+    return fmt
+
+
+@contextmanager
+def open_text(path, mode):
+    """Файл или stdin/stdout для пути '-'"""
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+        return
+    with open(path, mode, encoding='utf-8-sig' if mode == 'r' else 'utf-8', newline='') as file:
+        yield file
+
+
+def read_rows(file, fmt):
+    """Пары (номер строки, словарь); нечитаемая строка JSONL дает None вместо словаря"""
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+class Progress:
+    """Число строк и скорость для отчета команды"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rows = 0
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return f'{self.rows} строк за {self.elapsed:.1f} с, {self.rate:.0f} строк/с'
+
+
+class AdImporter:
+    """Проверяет строки формой AdForm и вставляет объявления пачками"""
+
+    def __init__(self, user, images_dir=None, chunk_size=1000, dry_run=False, on_flush=None):
+        self.user = user
+        self.images_dir = images_dir
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.on_flush = on_flush
+        self.batch = []
+        self.created = Progress()
+
+    def _image_path(self, number, image):
+        if self.images_dir is None:
+            raise RowError(number, ['image: не задан каталог изображений (--images)'])
+        try:
+            path = Path(safe_join(self.images_dir, image))
+        except SuspiciousFileOperation:
+            raise RowError(number, [f'image: {image} вне каталога изображений'])
+        if not path.is_file():
+            raise RowError(number, [f'image: нет файла {image}'])
+        return path
+
+    def build(self, number, row):
+        """Объявление из строки файла или RowError с ошибками формы"""
+        if not isinstance(row, dict):
+            raise RowError(number, ['строка не является объектом JSON'])
+        image = str(row.get('image') or '').strip()
+        path = self._image_path(number, image) if image else None
+        files = {'image_url': File(path.open('rb'), name=path.name)} if path else {}
+        try:
+            form = AdForm(data={column: row.get(column) or '' for column in IMPORT_COLUMNS}, files=files)
+            if not form.is_valid():
+                raise RowError(number, [f'{field}: {" ".join(errors)}' for field, errors in form.errors.items()])
+            ad = form.save(commit=False)
+            ad.user = self.user
+            # bulk_create не вызывает Ad.save
+            ad.title_search = title_key(ad.title)
+            # Файл сохраняется в хранилище только при вставке пачки (см. flush)
+            ad._import_image = path
+            return ad
+        finally:
+            for file in files.values():
+                file.close()
+
+    def add(self, ad):
+        self.batch.append(ad)
+        if len(self.batch) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        if not self.dry_run:
+            saved = []
+            try:
+                self._store_images(saved)
+                with transaction.atomic():
+                    created = Ad.objects.bulk_create(self.batch)
+                    search.index_ads(created)
+            except BaseException:
+                # Строки пачки не вставлены, их изображения никому не нужны
+                for name in saved:
+                    default_storage.delete(name)
+                raise
+        self.created.rows += len(self.batch)
+        self.batch = []
+        if self.on_flush:
+            self.on_flush(self.created)
+
+    def _store_images(self, saved):
+        """Сохраняет изображения пачки в хранилище, дописывая их имена в saved"""
+        for ad in self.batch:
+            if ad._import_image is None:
+                continue
+            with File(ad._import_image.open('rb'), name=ad._import_image.name) as file:
+                ad.image_url.save(file.name, file, save=False)
+            saved.append(ad.image_url.name)
+
+    def finish(self):
+        self.flush()
+        if self.created.rows and not self.dry_run:
+            cache.bump_generation()
+        return self.created
+
+
+def export_rows(model_name, chunk_size, **filters):
+    """Колонки и генератор строк выгрузки"""
+    model, fields = EXPORT_FIELDS[model_name]
+    rows = (model.objects.filter(**filters).order_by('pk')
+            .values_list(*fields.values()).iterator(chunk_size=chunk_size))
+    return list(fields), rows
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_rows(file, fmt, columns, rows, progress):
+    """Пишет строки в CSV или JSONL по одной"""
+    if fmt == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(['' if value is None else _plain(value) for value in row])
+            progress.rows += 1
+        return
+    for row in rows:
+        file.write(json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False))
+        file.write('\n')
+        progress.rows += 1
@@ -0,0 +1,217 @@
+"""
+Кэш страниц для анонимных посетителей.
+
+Ключ страницы включает номер поколения. Любое изменение объявления
+увеличивает поколение (см. signals.py), и все ранее сохраненные страницы
+перестают находиться - устаревшие данные никогда не отдаются, а старые
+записи просто вытесняются по таймауту.
+
+Счетчики и поколение хранятся в самом кэше, поэтому при общем бэкенде
+(файловый кэш, Memcached, Redis) они общие для всех процессов.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+GENERATION_KEY = 'ads:page-cache:generation'
+STATS_KEYS = {
+    'hits': 'ads:page-cache:hits',
+    'misses': 'ads:page-cache:misses',
+}
+
+
+def get_cache():
+    return caches[getattr(settings, 'ADS_PAGE_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'ADS_PAGE_CACHE_TIMEOUT', 300)
+
+
+def _initial_generation():
+    # После вытеснения ключа поколение не должно вернуться к уже использованному номеру
+    return int(time.time() * 1000)
+
+
+def get_generation():
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _initial_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+async def aget_generation():
+    cache = get_cache()
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, _initial_generation(), timeout=None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+def _bump_generation():
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, _initial_generation(), timeout=None)
+
+
+def bump_generation():
+    """Сбрасывает все закэшированные страницы"""
+    _bump_generation()
+    # Повтор после коммита: страница, собранная параллельным запросом
+    # по еще не закоммиченным данным, не переживет транзакцию
+    transaction.on_commit(_bump_generation)
+
+
+def _incr_stat(name):
+    cache = get_cache()
+    key = STATS_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def _aincr_stat(name):
+    cache = get_cache()
+    key = STATS_KEYS[name]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+def get_stats():
+    """Счетчики попаданий и промахов кэша страниц"""
+    values = get_cache().get_many(STATS_KEYS.values())
+    stats = {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / total if total else 0.0
+    return stats
+
+
+def reset_stats():
+    get_cache().delete_many(STATS_KEYS.values())
+
+
+def _page_digest(request, param_names, view_kwargs):
+    params = sorted(
+        (name, request.GET.get(name))
+        for name in param_names
+        if request.GET.get(name)
+    )
+    raw = repr((sorted(view_kwargs.items()), params)).encode()
+    return hashlib.md5(raw, usedforsecurity=False).hexdigest()
+
+
+def page_cache_key(view_name, request, param_names, view_kwargs):
+    """Ключ страницы: поколение, представление и нормализованные GET-параметры"""
+    return f'ads:page:{get_generation()}:{view_name}:{_page_digest(request, param_names, view_kwargs)}'
+
+
+async def apage_cache_key(view_name, request, param_names, view_kwargs):
+    return f'ads:page:{await aget_generation()}:{view_name}:{_page_digest(request, param_names, view_kwargs)}'
+
+
+def value_key(name, *parts):
+    """Ключ значения, которое сбрасывается вместе с кэшем страниц"""
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'ads:{name}:{get_generation()}:{digest}'
+
+
+def _is_cacheable(request, user):
+    return request.method == 'GET' and not user.is_authenticated and not len(get_messages(request))
+
+
+def _hit_response(cached):
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'HIT'
+    return response
+
+
+def _is_storable(request, response):
+    # Страницу с CSRF-токеном нельзя отдавать другим посетителям
+    return (response.status_code == 200 and not response.streaming
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+
+
+def _cached_response(key):
+    cached = get_cache().get(key)
+    if cached is None:
+        _incr_stat('misses')
+        return None
+    _incr_stat('hits')
+    return _hit_response(cached)
+
+
+async def _acached_response(key):
+    cached = await get_cache().aget(key)
+    if cached is None:
+        await _aincr_stat('misses')
+        return None
+    await _aincr_stat('hits')
+    return _hit_response(cached)
+
+
+def _store_response(request, key, response):
+    if _is_storable(request, response):
+        get_cache().set(key, (response.content, response['Content-Type']), get_timeout())
+    response['X-Page-Cache'] = 'MISS'
+    return response
+
+
+async def _astore_response(request, key, response):
+    if _is_storable(request, response):
+        await get_cache().aset(key, (response.content, response['Content-Type']), get_timeout())
+    response['X-Page-Cache'] = 'MISS'
+    return response
+
+
+def cache_anonymous_page(*param_names):
+    """
+    Кэширует ответ представления для анонимных GET-запросов.
+
+    В ключ попадают только перечисленные GET-параметры и аргументы из URL.
+    Запросы с непоказанными flash-сообщениями не кэшируются.
+    Подходит и для синхронных, и для асинхронных представлений; асинхронные
+    обращаются к кэшу через aget/aset, не блокируя цикл событий файловым
+    или сетевым бэкендом.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if not _is_cacheable(request, await request.auser()):
+                    return await view(request, *args, **kwargs)
+                key = await apage_cache_key(view.__name__, request, param_names, kwargs)
+                response = await _acached_response(key)
+                if response is None:
+                    response = await _astore_response(request, key, await view(request, *args, **kwargs))
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable(request, request.user):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(view.__name__, request, param_names, kwargs)
+            response = _cached_response(key)
+            if response is None:
+                response = _store_response(request, key, view(request, *args, **kwargs))
+            return response
+        return wrapper
+    return decorator
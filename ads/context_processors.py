@@ -0,0 +1,13 @@
+from .models import ProposalCounters
+
+
+def proposal_badge(request):
+    """Число полученных предложений, ожидающих ответа, для значка в шапке"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    try:
+        pending = user.proposal_counters.pending_received_count
+    except ProposalCounters.DoesNotExist:
+        pending = 0
+    return {'pending_proposals_badge': pending}
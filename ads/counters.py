@@ -0,0 +1,105 @@
+"""
+Денормализованные счетчики ожидающих предложений.
+
+Ad.pending_proposals_count - сколько ожидающих предложений получило
+объявление; ProposalCounters - сколько ожидающих предложений пользователь
+получил и отправил. Значок в шапке читает строку счетчиков по первичному
+ключу (см. context_processors.py), без COUNT по ExchangeProposal на каждый
+запрос; асинхронные представления загружают ее заранее - preload_badge().
+
+Счетчики меняются только относительными UPDATE ... SET x = x + n, поэтому
+параллельные изменения не теряются. Сохранение и удаление предложения
+учитывают сигналы, массовые UPDATE в exchange.py вызывают apply() сами.
+Строки, созданные в обход сигналов (bulk_create, загрузка данных), и
+возможный дрейф исправляет команда recount_proposal_counters.
+"""
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Ad, ExchangeProposal, ProposalCounters
+
+# Поля предложения, от которых зависят счетчики
+ROW_FIELDS = ('ad_receiver_id', 'sender_user_id', 'receiver_user_id')
+
+
+def proposal_row(proposal):
+    return tuple(getattr(proposal, field) for field in ROW_FIELDS)
+
+
+def _by_amount(counter):
+    groups = defaultdict(list)
+    for pk, amount in counter.items():
+        groups[amount].append(pk)
+    return groups
+
+
+def _update(queryset, field, counter, sign):
+    """Один UPDATE на каждую различную величину изменения; возвращает id обновленных строк"""
+    missing = set()
+    for amount, ids in _by_amount(counter).items():
+        value = F(field) + amount if sign > 0 else Greatest(F(field) - amount, Value(0))
+        if queryset.filter(pk__in=ids).update(**{field: value}) < len(ids):
+            missing.update(ids)
+    return missing
+
+
+def _update_users(field, counter, sign):
+    missing = _update(ProposalCounters.objects, field, counter, sign)
+    if missing and sign > 0:
+        # Пользователь появился в обход сигналов: заводим строку и повторяем увеличение
+        missing -= set(ProposalCounters.objects.filter(pk__in=missing).values_list('pk', flat=True))
+        ProposalCounters.objects.bulk_create([ProposalCounters(user_id=pk) for pk in missing],
+                                             ignore_conflicts=True)
+        _update(ProposalCounters.objects, field, {pk: counter[pk] for pk in missing}, sign)
+
+
+def apply(rows, sign):
+    """
+    Учитывает появление (sign=1) или исчезновение (sign=-1) ожидающих
+    предложений; rows - кортежи полей ROW_FIELDS
+    """
+    ads, sent, received = Counter(), Counter(), Counter()
+    for ad_receiver_id, sender_user_id, receiver_user_id in rows:
+        ads[ad_receiver_id] += 1
+        sent[sender_user_id] += 1
+        received[receiver_user_id] += 1
+    if not ads:
+        return
+    _update(Ad.objects, 'pending_proposals_count', ads, sign)
+    _update_users('pending_sent_count', sent, sign)
+    _update_users('pending_received_count', received, sign)
+
+
+def _pending_count(lookup):
+    pending = (ExchangeProposal.objects.filter(status='pending', **{lookup: OuterRef('pk')})
+               .order_by().values(lookup).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(pending, output_field=IntegerField()), Value(0))
+
+
+def recount():
+    """Пересчет всех счетчиков по таблице предложений; возвращает число обновленных строк"""
+    existing = ProposalCounters.objects.values('pk')
+    ProposalCounters.objects.bulk_create(
+        [ProposalCounters(user_id=pk) for pk in User.objects.exclude(pk__in=existing).values_list('pk', flat=True)],
+        batch_size=1000, ignore_conflicts=True,
+    )
+    ads = Ad.objects.update(pending_proposals_count=_pending_count('ad_receiver'))
+    users = ProposalCounters.objects.update(
+        pending_received_count=_pending_count('receiver_user'),
+        pending_sent_count=_pending_count('sender_user'),
+    )
+    return ads, users
+
+
+async def preload_badge(user):
+    """
+    Загружает счетчики пользователя в кэш связи proposal_counters: шаблон
+    асинхронного представления читает их синхронно, где запрос к БД запрещен
+    """
+    if user.is_authenticated:
+        row = await ProposalCounters.objects.filter(user=user).afirst()
+        User._meta.get_field('proposal_counters').set_cached_value(user, row)
+    return user
@@ -0,0 +1,116 @@
+"""
+Принятие и отклонение предложений обмена.
+
+Принятие идет одной транзакцией: сначала блокируются оба объявления
+(select_for_update, всегда в порядке id, чтобы встречные транзакции не
+взаимоблокировались), затем статус предложения меняется условным UPDATE
+... WHERE status = 'pending', и одним UPDATE отклоняются все остальные
+ожидающие предложения с участием этих объявлений. Их id выбираются заранее
+с блокировкой строк, чтобы точно уменьшить счетчики.
+
+Если два пользователя одновременно принимают разные предложения на одно
+объявление, вторая транзакция дождется блокировки объявления и увидит, что
+ее предложение уже отклонено первой. Предложение, созданное после принятия
+обмена, принять не получится: под той же блокировкой проверяется, что ни
+одно из объявлений еще не участвует в принятом обмене. В SQLite, где select_for_update не
+поддерживается, ту же гарантию дает условный UPDATE: записи в SQLite
+выполняются строго по очереди.
+
+QuerySet.update не вызывает сигналы, поэтому счетчики (counters.py), лента
+предложений (inbox.py), уведомления (outbox.py), живые обновления
+(live.py) и граф цепочек обмена обновляются здесь же; граф и живые
+обновления - после коммита.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from . import counters, inbox, live, outbox, trade_cycles
+from .models import Ad, ExchangeProposal
+
+BATCH_LIMIT = 100
+
+
+class ProposalConflict(Exception):
+    """Предложение уже не ожидает ответа: его приняли или отклонили раньше"""
+
+
+class AdAlreadyTraded(ProposalConflict):
+    """Одно из объявлений уже участвует в принятом обмене"""
+
+
+def _involving(ad_ids, status):
+    return ExchangeProposal.objects.filter(Q(ad_sender__in=ad_ids) | Q(ad_receiver__in=ad_ids), status=status)
+
+
+def _conflicting(ad_ids):
+    return _involving(ad_ids, 'pending')
+
+
+def is_traded(ad_ids):
+    """Участвует ли хотя бы одно из объявлений в принятом обмене"""
+    return _involving(ad_ids, 'accepted').exists()
+
+
+def _locked_rows(queryset):
+    """id и поля для счетчиков ожидающих предложений; строки блокируются до конца транзакции"""
+    rows = queryset.select_for_update().values_list('pk', *counters.ROW_FIELDS)
+    return {pk: row for pk, *row in rows}
+
+
+def accept_proposal(proposal):
+    """Принимает предложение и отклоняет конфликтующие; возвращает число отклоненных"""
+    ad_ids = sorted({proposal.ad_sender_id, proposal.ad_receiver_id})
+    with transaction.atomic():
+        list(Ad.objects.select_for_update().filter(pk__in=ad_ids).order_by('pk').values_list('pk', flat=True))
+        if is_traded(ad_ids):
+            raise AdAlreadyTraded(proposal.pk)
+        accepted = ExchangeProposal.objects.filter(pk=proposal.pk, status='pending').update(status='accepted')
+        if not accepted:
+            raise ProposalConflict(proposal.pk)
+        conflicting = _locked_rows(_conflicting(ad_ids))
+        rejected = ExchangeProposal.objects.filter(pk__in=conflicting.keys()).update(status='rejected')
+        counters.apply([counters.proposal_row(proposal), *conflicting.values()], -1)
+        inbox.set_status([proposal.pk], 'accepted')
+        if conflicting:
+            inbox.set_status(conflicting.keys(), 'rejected')
+        outbox.enqueue(outbox.status_events({proposal.pk: counters.proposal_row(proposal)}, 'accepted')
+                       + outbox.status_events(conflicting, 'rejected'))
+        live.publish_proposals({proposal.pk: counters.proposal_row(proposal)}, 'accepted')
+        live.publish_proposals(conflicting, 'rejected')
+        transaction.on_commit(lambda: trade_cycles.graph.discard_ads(ad_ids))
+
+    proposal.status = proposal._loaded_status = 'accepted'
+    return rejected
+
+
+def reject_proposals(proposal_ids, user):
+    """Отклоняет ожидающие предложения, адресованные пользователю; возвращает их число"""
+    with transaction.atomic():
+        pending = _locked_rows(
+            ExchangeProposal.objects.filter(pk__in=proposal_ids, receiver_user=user, status='pending')
+        )
+        rejected = ExchangeProposal.objects.filter(pk__in=pending.keys(), status='pending').update(status='rejected')
+        counters.apply(pending.values(), -1)
+        inbox.set_status(pending.keys(), 'rejected')
+        outbox.enqueue(outbox.status_events(pending, 'rejected'))
+        live.publish_proposals(pending, 'rejected')
+        transaction.on_commit(lambda: trade_cycles.graph.discard_proposals(list(pending)))
+    return rejected
+
+
+def accept_proposals(proposal_ids, user):
+    """
+    Принимает предложения по одному, каждое в своей транзакции: конфликт одного
+    не откатывает остальные. Возвращает (принятые предложения, число отклоненных)
+    """
+    proposals = (ExchangeProposal.objects.filter(pk__in=proposal_ids, receiver_user=user, status='pending')
+                 .only('id', 'status', 'ad_sender_id', *counters.ROW_FIELDS).order_by('created_at', 'id'))
+    accepted, rejected = [], 0
+    for proposal in proposals:
+        try:
+            rejected += accept_proposal(proposal)
+        except ProposalConflict:
+            # Отклонено при принятии другого предложения из этого же пакета или параллельным запросом
+            continue
+        accepted.append(proposal)
+    return accepted, rejected
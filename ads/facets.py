@@ -0,0 +1,46 @@
+"""
+Счетчики объявлений по категориям и состояниям для фильтров ленты.
+
+Оба набора считаются одним запросом GROUP BY (category, condition) по
+объявлениям, отобранным поисковым запросом и фильтром "Мои объявления".
+Из полученной сетки счетчик категории учитывает выбранное состояние и
+наоборот, поэтому смена категории, состояния или страницы нового запроса
+не требует.
+
+Сетка кэшируется в кэше страниц (cache.py) под текущим поколением: любое
+изменение объявления сбрасывает ее вместе со страницами ленты. Страница
+ad_list сама счетчики не считает - их подгружает боковая панель, так что
+стоимость запроса ленты не меняется.
+"""
+from django.db.models import Count
+
+from . import cache
+from .models import Ad
+from .queries import filter_ads
+
+
+def _grid(query, owner):
+    queryset = filter_ads(Ad.objects.all(), query, owner=owner).order_by()
+    return list(queryset.values_list('category', 'condition').annotate(total=Count('id')))
+
+
+def get_grid(query='', owner=None):
+    """Число объявлений для каждой пары (категория, состояние)"""
+    key = cache.value_key('facets', query, owner.pk if owner is not None else None)
+    grid = cache.get_cache().get(key)
+    if grid is None:
+        grid = _grid(query, owner)
+        cache.get_cache().set(key, grid, cache.get_timeout())
+    return grid
+
+
+def facet_counts(query='', category='', condition='', owner=None):
+    """Счетчики для списков категорий и состояний при текущих фильтрах"""
+    categories = dict.fromkeys((value for value, label in Ad.CATEGORY_CHOICES), 0)
+    conditions = dict.fromkeys((value for value, label in Ad.CONDITION_CHOICES), 0)
+    for grid_category, grid_condition, total in get_grid(query, owner):
+        if not condition or grid_condition == condition:
+            categories[grid_category] = categories.get(grid_category, 0) + total
+        if not category or grid_category == category:
+            conditions[grid_condition] = conditions.get(grid_condition, 0) + total
+    return {'category': categories, 'condition': conditions}
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
-from .models import Ad, ExchangeProposal
+from .models import Ad, ExchangeProposal, ProposalInboxEntry
 
 
 class CustomLoginForm(AuthenticationForm):
@@ -87,4 +87,46 @@ class AdSearchForm(forms.Form):
         required=False,
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         label='Мои объявления'
-    )
\ No newline at end of file
+    )
+
+
+class ProposalIdsField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return sorted({int(item) for item in value or ()})
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Некорректный список предложений.')
+
+
+class ProposalBatchForm(forms.Form):
+    status = forms.ChoiceField(
+        choices=[('accepted', 'Принять'), ('rejected', 'Отклонить')],
+        label='Действие'
+    )
+    proposal_ids = ProposalIdsField(label='Предложения')
+
+    def __init__(self, *args, limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limit = limit
+
+    def clean_proposal_ids(self):
+        proposal_ids = self.cleaned_data['proposal_ids']
+        if self.limit is not None and len(proposal_ids) > self.limit:
+            raise forms.ValidationError(f'За один раз можно обработать не больше {self.limit} предложений.')
+        return proposal_ids
+
+
+class ProposalInboxForm(forms.Form):
+    direction = forms.ChoiceField(
+        choices=[('', 'Все')] + ProposalInboxEntry.DIRECTION_CHOICES,
+        required=False,
+        label='Направление'
+    )
+    status = forms.ChoiceField(
+        choices=[('', 'Любой статус')] + ExchangeProposal.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+        label='Статус'
+    )
@@ -0,0 +1,79 @@
+"""
+Лента предложений пользователя ("Мои предложения").
+
+Отправленные и полученные предложения хранятся в таблице
+ProposalInboxEntry по строке на участника, с копиями статуса и даты.
+Любая вкладка ленты - "все", "полученные", "отправленные", с фильтром по
+статусу или без - это один запрос по индексу (user, [direction], [status],
+-created_at, -id) с курсорной пагинацией, без OR, UNION и сортировки.
+
+Записи создаются и обновляются сигналами (signals.py) и массовыми
+операциями в exchange.py; для данных, загруженных в обход сигналов, есть
+rebuild().
+"""
+from django.db import transaction
+
+from .models import ExchangeProposal, ProposalInboxEntry
+
+PER_PAGE = 20
+
+# Поля предложения и связанных объявлений, которые выводит карточка в ленте
+ENTRY_CARD_FIELDS = (
+    'id', 'direction', 'status', 'created_at', 'proposal_id',
+    'proposal__id', 'proposal__comment', 'proposal__status', 'proposal__created_at',
+    'proposal__ad_sender__id', 'proposal__ad_sender__title', 'proposal__ad_sender__image_url',
+    'proposal__ad_sender__thumbnails_source',
+    'proposal__ad_receiver__id', 'proposal__ad_receiver__title',
+    'proposal__sender_user__username', 'proposal__receiver_user__username',
+)
+
+
+def _entries(proposal):
+    return [
+        ProposalInboxEntry(user_id=proposal.sender_user_id, proposal_id=proposal.pk, direction='sent',
+                           status=proposal.status, created_at=proposal.created_at),
+        ProposalInboxEntry(user_id=proposal.receiver_user_id, proposal_id=proposal.pk, direction='received',
+                           status=proposal.status, created_at=proposal.created_at),
+    ]
+
+
+def add_proposals(proposals):
+    ProposalInboxEntry.objects.bulk_create(
+        [entry for proposal in proposals for entry in _entries(proposal)], ignore_conflicts=True,
+    )
+
+
+def set_status(proposal_ids, status):
+    return ProposalInboxEntry.objects.filter(proposal_id__in=proposal_ids).update(status=status)
+
+
+def rebuild(chunk_size=5_000):
+    """Пересоздает ленту по таблице предложений; возвращает число предложений"""
+    total = 0
+    with transaction.atomic():
+        ProposalInboxEntry.objects.all().delete()
+        proposals = ExchangeProposal.objects.only(
+            'id', 'status', 'created_at', 'sender_user_id', 'receiver_user_id'
+        ).order_by('pk')
+        chunk = []
+        for proposal in proposals.iterator(chunk_size=chunk_size):
+            chunk.append(proposal)
+            if len(chunk) >= chunk_size:
+                add_proposals(chunk)
+                total += len(chunk)
+                chunk = []
+        add_proposals(chunk)
+        total += len(chunk)
+    return total
+
+
+def inbox_queryset(user, direction='', status=''):
+    queryset = (ProposalInboxEntry.objects.filter(user=user)
+                .select_related('proposal__ad_sender', 'proposal__ad_receiver',
+                                'proposal__sender_user', 'proposal__receiver_user')
+                .only(*ENTRY_CARD_FIELDS))
+    if direction:
+        queryset = queryset.filter(direction=direction)
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
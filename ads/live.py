@@ -0,0 +1,181 @@
+"""
+Живые обновления ленты предложений (server-sent events).
+
+Создание предложения и смена статуса публикуют после коммита событие
+{'type': 'created' | 'status', 'proposal': id, 'status': ...} обоим
+участникам. Страница «Мои предложения» держит открытым поток
+async_views.proposal_events и по событию подгружает одну карточку
+(views.proposal_entry) вместо перезагрузки всей ленты.
+
+Шина событий задается ADS_EVENT_BUS:
+ * ads.live.InProcessBus - очереди в памяти процесса; годится, когда
+   ASGI-сервер запущен одним процессом;
+ * ads.live.RedisBus - для нескольких процессов: публикация идет в канал
+   Redis пользователя (ADS_EVENT_BUS_URL), а каждый процесс держит одно
+   соединение и одну подписку на пользователя, сколько бы вкладок этого
+   пользователя он ни обслуживал, и раздает события локальным очередям.
+
+Очередь подписчика ограничена QUEUE_SIZE: если клиент не успевает
+читать, накопленное заменяется одним событием resync, по которому
+страница перечитывает ленту целиком.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import counters
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+RESYNC = {'type': 'resync'}
+USER_FIELDS = [counters.ROW_FIELDS.index(field) for field in ('sender_user_id', 'receiver_user_id')]
+
+
+def _offer(queue, event):
+    """Кладет событие в очередь; переполненная очередь сворачивается в resync"""
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+
+
+class InProcessBus:
+    """Подписчики - очереди asyncio; публиковать можно из любого потока"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+    def deliver(self, user_id, event):
+        """Раздает событие подписчикам пользователя в этом процессе"""
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Цикл событий уже закрыт, подписка снимется вместе с ним
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        """Очередь событий пользователя на время блока"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            first = not self._subscribers[user_id]
+            self._subscribers[user_id].add(subscriber)
+        try:
+            if first:
+                await self._user_subscribed(user_id)
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(subscriber)
+                last = not self._subscribers[user_id]
+                if last:
+                    del self._subscribers[user_id]
+            if last:
+                await self._user_unsubscribed(user_id)
+
+    async def _user_subscribed(self, user_id):
+        pass
+
+    async def _user_unsubscribed(self, user_id):
+        pass
+
+
+class RedisBus(InProcessBus):
+    """Публикация через Redis PUB/SUB: одна подписка процесса на пользователя"""
+    CHANNEL_PREFIX = 'ads:proposals:'
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('Для ads.live.RedisBus нужен пакет redis')
+        self.url = settings.ADS_EVENT_BUS_URL
+        self.publisher = redis.Redis.from_url(self.url)
+        self.pubsub = None
+        self.reader = None
+
+    def channel(self, user_id):
+        return f'{self.CHANNEL_PREFIX}{user_id}'
+
+    def publish(self, user_id, event):
+        # Локальные подписчики получат событие из Redis, как и все остальные процессы
+        self.publisher.publish(self.channel(user_id), json.dumps(event))
+
+    async def _user_subscribed(self, user_id):
+        if self.pubsub is None:
+            import redis.asyncio
+
+            self.pubsub = redis.asyncio.Redis.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(self.channel(user_id))
+        # listen() завершается, когда подписок не остается, и перезапускается с первой новой
+        if self.reader is None or self.reader.done():
+            self.reader = asyncio.create_task(self._read())
+
+    async def _user_unsubscribed(self, user_id):
+        await self.pubsub.unsubscribe(self.channel(user_id))
+
+    async def _read(self):
+        async for message in self.pubsub.listen():
+            if message['type'] != 'message':
+                continue
+            channel = message['channel']
+            channel = channel.decode() if isinstance(channel, bytes) else channel
+            self.deliver(int(channel.removeprefix(self.CHANNEL_PREFIX)), json.loads(message['data']))
+
+
+@lru_cache
+def get_bus():
+    return import_string(settings.ADS_EVENT_BUS)()
+
+
+def _reset(**kwargs):
+    if kwargs['setting'] in ('ADS_EVENT_BUS', 'ADS_EVENT_BUS_URL'):
+        get_bus.cache_clear()
+
+
+setting_changed.connect(_reset)
+
+
+def _publish(events):
+    bus = get_bus()
+    for user_id, event in events:
+        try:
+            bus.publish(user_id, event)
+        except Exception:
+            # Живое обновление - удобство: его потеря не должна ломать запрос
+            logger.exception('Не удалось опубликовать событие %s', event)
+
+
+def publish_proposals(rows, status, kind='status'):
+    """
+    После коммита сообщает обоим участникам об изменении предложений;
+    rows - {id предложения: строка counters.ROW_FIELDS}
+    """
+    events = [
+        (row[field], {'type': kind, 'proposal': proposal_id, 'status': status})
+        for proposal_id, row in rows.items()
+        for field in USER_FIELDS
+    ]
+    if events:
+        transaction.on_commit(lambda: _publish(events))
@@ -0,0 +1,107 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def timed_request(app, url, client_delay):
+    """Один GET-запрос медленного клиента: каждая часть ответа читается с задержкой"""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    request_sent = False
+    finished = asyncio.Event()
+    status = None
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            await asyncio.sleep(client_delay)
+            if not message.get('more_body'):
+                finished.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return time.perf_counter() - started, status
+
+
+async def run_load(app, url, clients, requests_per_client, client_delay):
+    async def client():
+        return [await timed_request(app, url, client_delay) for _ in range(requests_per_client)]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    samples = [sample for client_samples in results for sample in client_samples]
+    return elapsed, samples
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест ASGI: много медленных клиентов одновременно, '
+            'сравнение синхронных и асинхронных представлений чтения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/', help='Путь с query string, например "/?category=books"')
+        parser.add_argument('--clients', type=int, default=200, help='Число одновременных клиентов')
+        parser.add_argument('--requests', type=int, default=5, help='Запросов на клиента')
+        parser.add_argument('--client-delay', type=float, default=0.05,
+                            help='Задержка чтения каждой части ответа клиентом, с')
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Не отключать кэш страниц для анонимных посетителей')
+
+    def handle(self, *args, **options):
+        modes = (
+            ('sync', None),
+            ('async', 'project.asgi_urls'),
+        )
+        self.stdout.write(
+            f"{options['clients']} клиентов x {options['requests']} запросов к {options['url']}, "
+            f"задержка клиента {options['client_delay'] * 1000:.0f} мс"
+        )
+        self.stdout.write(f"{'режим':<6} {'rps':>8} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'ошибки':>7}")
+        overrides = {} if options['page_cache'] else {'ADS_PAGE_CACHE_TIMEOUT': 0}
+        for name, urlconf in modes:
+            with override_settings(ASGI_URLCONF=urlconf, **overrides):
+                # Middleware читает ASGI_URLCONF при создании обработчика
+                app = ASGIHandler()
+                elapsed, samples = asyncio.run(run_load(
+                    app, options['url'], options['clients'], options['requests'], options['client_delay'],
+                ))
+            latencies = [latency * 1000 for latency, _ in samples]
+            errors = sum(1 for _, status in samples if status != 200)
+            self.stdout.write(
+                f'{name:<6} {len(samples) / elapsed:>8.1f} {statistics.median(latencies):>9.1f} '
+                f'{percentile(latencies, 95):>9.1f} {percentile(latencies, 99):>9.1f} {errors:>7}'
+            )
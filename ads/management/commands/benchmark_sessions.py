@@ -0,0 +1,108 @@
+import json
+import logging
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ads.models import Ad
+from project import session_profiles
+
+USER_PREFIX = 'bench-sessions-'
+PASSWORD = 'bench-sessions-password'
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+SESSION_TABLE = f'"{Session._meta.db_table}"'
+
+
+class Command(BaseCommand):
+    help = ('Считает записи в БД на просмотр страницы для каждого профиля сессий и сообщений '
+            '(ADS_SESSION_PROFILE) на типичном сценарии: вход, просмотр, предложение обмена, выход')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5, help='Повторов сценария на профиль')
+        parser.add_argument('--profiles', nargs='*', default=list(session_profiles.PROFILES),
+                            help='Профили для сравнения')
+        parser.add_argument('--output', help='Записать результаты в JSON-файл')
+
+    def scenario(self, username, target_ad, own_ad):
+        """Шаги сценария: (метод, url, данные)"""
+        return [
+            ('get', reverse('login'), None),
+            ('post', reverse('login'), {'username': username, 'password': PASSWORD}),
+            ('get', reverse('ad_list'), None),
+            ('get', reverse('ad_detail', kwargs={'pk': target_ad.pk}), None),
+            ('post', reverse('propose_exchange', kwargs={'ad_id': target_ad.pk}),
+             {'sender_ad': own_ad.pk, 'comment': 'Замер сессий'}),
+            ('get', reverse('ad_detail', kwargs={'pk': target_ad.pk}), None),
+            ('get', reverse('my_proposals'), None),
+            ('get', reverse('logout'), None),
+            ('get', reverse('login'), None),
+        ]
+
+    def measure(self, profile, rounds, username, target_ad, own_ad):
+        views = writes = session_writes = session_reads = 0
+        # Лимит частоты входа (ads/ratelimit.py) остановил бы повторы сценария
+        with override_settings(ADS_RATE_LIMIT_ENABLED=False, **session_profiles.session_settings(profile)):
+            for _ in range(rounds):
+                client = Client(HTTP_HOST='localhost')
+                for method, url, data in self.scenario(username, target_ad, own_ad):
+                    with CaptureQueriesContext(connection) as ctx:
+                        response = getattr(client, method)(url, data)
+                    if response.status_code not in (200, 302):
+                        raise CommandError(f'{profile}: {url} вернул {response.status_code}')
+                    views += 1
+                    for query in ctx.captured_queries:
+                        sql = query['sql']
+                        is_session = SESSION_TABLE in sql
+                        if sql.startswith(WRITE_PREFIXES):
+                            writes += 1
+                            session_writes += is_session
+                        elif is_session:
+                            session_reads += 1
+        return {
+            'page_views': views,
+            'db_writes': writes,
+            'writes_per_view': round(writes / views, 2),
+            'session_writes_per_view': round(session_writes / views, 2),
+            'session_reads_per_view': round(session_reads / views, 2),
+        }
+
+    def handle(self, *args, **options):
+        for profile in options['profiles']:
+            session_profiles.session_settings(profile)
+
+        User.objects.filter(username__startswith=USER_PREFIX).delete()
+        member = User.objects.create_user(username=f'{USER_PREFIX}member', password=PASSWORD)
+        owner = User.objects.create_user(username=f'{USER_PREFIX}owner')
+        own_ad = Ad.objects.create(user=member, title='Замер сессий', description='Объявление для замера',
+                                   category='other', condition='good')
+        target_ad = Ad.objects.create(user=owner, title='Цель замера', description='Объявление для замера',
+                                      category='other', condition='good')
+
+        # Построчный лог каждого запроса только мешает читать отчет
+        perf_logger = logging.getLogger('ads.performance')
+        perf_logger_disabled, perf_logger.disabled = perf_logger.disabled, True
+        results = {}
+        try:
+            for profile in options['profiles']:
+                results[profile] = self.measure(profile, options['rounds'], member.username, target_ad, own_ad)
+        finally:
+            perf_logger.disabled = perf_logger_disabled
+            User.objects.filter(username__startswith=USER_PREFIX).delete()
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+        self.stdout.write(f"{'профиль':<16} {'страниц':>8} {'записей':>8} {'на стр.':>8} "
+                          f"{'сессия: запись':>15} {'сессия: чтение':>15}")
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<16} {result['page_views']:>8} {result['db_writes']:>8} "
+                f"{result['writes_per_view']:>8} {result['session_writes_per_view']:>15} "
+                f"{result['session_reads_per_view']:>15}"
+            )
@@ -0,0 +1,141 @@
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ads.models import Ad, ExchangeProposal
+from ads.pagination import encode_cursor
+
+from .benchmark_asgi import percentile
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку и число SQL-запросов основных страниц на текущих данных '
+            '(см. seed_data) и сравнивает с сохраненным baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=3, help='Прогревочных запросов на сценарий')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Файл baseline в JSON')
+        parser.add_argument('--save-baseline', action='store_true', help='Записать результаты как новый baseline')
+        parser.add_argument('--output', help='Записать результаты в JSON-файл')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Допустимый рост p95 относительно baseline (0.25 = 25%%)')
+
+    def scenarios(self):
+        """Сценарии: (имя, url, параметры, пользователь или None)"""
+        first_ad = Ad.objects.order_by('-created_at', '-id').only('id').first()
+        if first_ad is None:
+            raise CommandError('В БД нет объявлений: сначала выполните seed_data.')
+
+        deep_ad = Ad.objects.order_by('-created_at', '-id').only('id', 'created_at')[10_000:10_001].first()
+        deep_ad = deep_ad or Ad.objects.order_by('created_at', 'id').only('id', 'created_at').first()
+        busiest = (
+            ExchangeProposal.objects.values('receiver_user')
+            .annotate(total=Count('id')).order_by('-total').first()
+        )
+        receiver_id = busiest['receiver_user'] if busiest else first_ad.user_id
+
+        return [
+            ('ad_list', reverse('ad_list'), {}, None),
+            ('ad_list_category_condition', reverse('ad_list'), {'category': 'electronics', 'condition': 'good'}, None),
+            ('ad_list_deep_cursor', reverse('ad_list'),
+             {'cursor': encode_cursor(deep_ad.created_at, deep_ad.pk, 'next')}, None),
+            ('ad_list_search', reverse('ad_list'), {'query': 'велосипед'}, None),
+            ('ad_list_is_mine', reverse('ad_list'), {'is_mine': 'on'}, receiver_id),
+            ('ad_facets', reverse('ad_facets'), {}, None),
+            ('ad_facets_search', reverse('ad_facets'), {'query': 'велосипед', 'category': 'sport'}, None),
+            ('ad_detail', reverse('ad_detail', kwargs={'pk': first_ad.pk}), {}, receiver_id),
+            ('my_proposals', reverse('my_proposals'), {}, receiver_id),
+        ]
+
+    def measure(self, client, url, params, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url, params)
+
+        latencies, query_counts = [], []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: статус {response.status_code}')
+            query_counts.append(len(ctx.captured_queries))
+
+        return {
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries': max(query_counts),
+        }
+
+    def handle(self, *args, **options):
+        results = {}
+        # Построчный лог каждого запроса только мешает читать отчет
+        perf_logger = logging.getLogger('ads.performance')
+        perf_logger_disabled, perf_logger.disabled = perf_logger.disabled, True
+        # Кэш страниц скрыл бы стоимость запросов к БД
+        try:
+            with override_settings(ADS_PAGE_CACHE_TIMEOUT=0):
+                for name, url, params, user_id in self.scenarios():
+                    client = Client(HTTP_HOST='localhost')
+                    if user_id is not None:
+                        client.force_login(User.objects.get(pk=user_id))
+                    results[name] = self.measure(client, url, params, options['iterations'], options['warmup'])
+        finally:
+            perf_logger.disabled = perf_logger_disabled
+
+        results_meta = {
+            'ads': Ad.objects.count(),
+            'proposals': ExchangeProposal.objects.count(),
+            'vendor': connection.vendor,
+        }
+        report = {'dataset': results_meta, 'scenarios': results}
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+        baseline_path = Path(options['baseline'])
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+        regressions = self.print_report(report, baseline, options['tolerance'])
+
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+            self.stdout.write(self.style.SUCCESS(f'Baseline сохранен в {baseline_path}'))
+        elif regressions:
+            raise CommandError(f'Регрессии: {", ".join(regressions)}')
+
+    def print_report(self, report, baseline, tolerance):
+        dataset = report['dataset']
+        self.stdout.write(f"Данные: {dataset['ads']} объявлений, {dataset['proposals']} предложений, "
+                          f"{dataset['vendor']}")
+        self.stdout.write(f"{'сценарий':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>4}  baseline p95 / SQL")
+
+        base_scenarios = (baseline or {}).get('scenarios', {})
+        regressions = []
+        for name, result in report['scenarios'].items():
+            line = (f"{name:<28} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                    f"{result['p99_ms']:>8.1f} {result['queries']:>4}")
+            base = base_scenarios.get(name)
+            if base:
+                change = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0.0
+                line += f"  {base['p95_ms']:.1f} ({change:+.0%}) / {base['queries']}"
+                if change > tolerance or result['queries'] > base['queries']:
+                    regressions.append(name)
+                    line += '  РЕГРЕССИЯ'
+            self.stdout.write(line)
+        return regressions
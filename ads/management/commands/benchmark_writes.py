@@ -0,0 +1,167 @@
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from ads.models import Ad, ExchangeProposal
+
+from .benchmark_asgi import percentile
+
+USER_PREFIX = 'bench-writes-'
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность записи: параллельные потоки создают предложения обмена, '
+            'пока другие потоки читают ленту. С --compare запускается для каждого профиля БД')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Потоков, создающих предложения')
+        parser.add_argument('--readers', type=int, default=2, help='Потоков, читающих ленту')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Длительность замера')
+        parser.add_argument('--output', help='Записать результаты в JSON-файл')
+        parser.add_argument('--compare', nargs='*', metavar='PROFILE',
+                            help='Замерить в отдельных процессах для профилей ADS_DB_PROFILE '
+                                 '(по умолчанию sqlite-legacy и sqlite на временных файлах)')
+
+    def handle(self, *args, **options):
+        if options['compare'] is not None:
+            return self.compare(options['compare'] or ['sqlite-legacy', 'sqlite'], options)
+
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('Замер в БД SQLite в памяти не показателен: нужен файл БД.')
+
+        own_ads, targets = self.setup(options['writers'])
+        try:
+            report = self.run(own_ads, targets, options['readers'], options['seconds'])
+        finally:
+            User.objects.filter(username__startswith=USER_PREFIX).delete()
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        self.print_report([report])
+
+    def setup(self, writers):
+        """Отдельный пользователь с объявлением на каждый поток записи и общие целевые объявления"""
+        User.objects.filter(username__startswith=USER_PREFIX).delete()
+        users = [User.objects.create_user(username=f'{USER_PREFIX}{i}') for i in range(writers + 1)]
+        ads = [Ad.objects.create(user=user, title=f'Замер записи {i}', description='Объявление для замера',
+                                 category='other', condition='good')
+               for i, user in enumerate(users)]
+        targets = [Ad.objects.create(user=users[-1], title=f'Цель {i}', description='Объявление для замера',
+                                     category='other', condition='good')
+                   for i in range(writers)]
+        return ads[:-1], targets
+
+    def run(self, own_ads, targets, readers, seconds):
+        barrier = threading.Barrier(len(own_ads) + readers)
+        deadline = [0.0]
+        latencies, errors, reads = [], [], []
+        lock = threading.Lock()
+
+        def write(own_ad):
+            rng = random.Random(own_ad.pk)
+            local_latencies, local_errors = [], 0
+            try:
+                barrier.wait()
+                while time.monotonic() < deadline[0]:
+                    started = time.perf_counter()
+                    try:
+                        # Как create_exchange_proposal: предложение, счетчики и лента в одной транзакции
+                        with transaction.atomic():
+                            ExchangeProposal.objects.create(ad_sender=own_ad, ad_receiver=rng.choice(targets))
+                    except OperationalError:
+                        local_errors += 1
+                    else:
+                        local_latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local_latencies)
+                errors.append(local_errors)
+
+        def read():
+            done = 0
+            try:
+                barrier.wait()
+                while time.monotonic() < deadline[0]:
+                    list(Ad.objects.order_by('-created_at', '-id').values_list('id', 'title')[:10])
+                    done += 1
+            except OperationalError:
+                pass
+            finally:
+                connection.close()
+            with lock:
+                reads.append(done)
+
+        deadline[0] = time.monotonic() + seconds
+        threads = ([threading.Thread(target=write, args=(own_ad,)) for own_ad in own_ads]
+                   + [threading.Thread(target=read) for _ in range(readers)])
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        return {
+            'profile': settings.ADS_DB_PROFILE,
+            'vendor': connection.vendor,
+            'journal_mode': self.journal_mode(),
+            'writers': len(own_ads),
+            'readers': readers,
+            'writes_per_s': round(len(latencies) / elapsed, 1),
+            'write_errors': sum(errors),
+            'write_p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+            'write_p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+            'reads_per_s': round(sum(reads) / elapsed, 1),
+        }
+
+    def journal_mode(self):
+        if connection.vendor != 'sqlite':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            return cursor.fetchone()[0]
+
+    def compare(self, profiles, options):
+        """Каждый профиль в отдельном процессе: настройки БД читаются при старте Django"""
+        manage = Path(settings.BASE_DIR) / 'manage.py'
+        reports = []
+        with tempfile.TemporaryDirectory() as workdir:
+            for profile in profiles:
+                env = dict(os.environ, ADS_DB_PROFILE=profile)
+                if profile.startswith('sqlite'):
+                    env['ADS_SQLITE_PATH'] = str(Path(workdir) / f'{profile}.sqlite3')
+                    subprocess.run([sys.executable, manage, 'migrate', '-v', '0'], env=env, check=True)
+                output = Path(workdir) / f'{profile}.json'
+                subprocess.run([
+                    sys.executable, manage, 'benchmark_writes', '--output', output,
+                    '--writers', str(options['writers']), '--readers', str(options['readers']),
+                    '--seconds', str(options['seconds']),
+                ], env=env, check=True, stdout=subprocess.DEVNULL)
+                reports.append(json.loads(output.read_text()))
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(reports, indent=2, ensure_ascii=False))
+        self.print_report(reports)
+
+    def print_report(self, reports):
+        self.stdout.write(f"{'профиль':<16} {'журнал':<8} {'записей/с':>10} {'ошибок':>7} "
+                          f"{'p50 мс':>8} {'p95 мс':>8} {'чтений/с':>10}")
+        for report in reports:
+            self.stdout.write(
+                f"{report['profile']:<16} {report['journal_mode'] or '-':<8} {report['writes_per_s']:>10} "
+                f"{report['write_errors']:>7} {report['write_p50_ms'] or '-':>8} {report['write_p95_ms'] or '-':>8} "
+                f"{report['reads_per_s']:>10}"
+            )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ads import bulk
+
+
+class Command(BaseCommand):
+    help = 'Выгружает объявления или предложения обмена в CSV или JSONL, не загружая таблицу в память'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл .csv или .jsonl, '-' - stdout")
+        parser.add_argument('--model', choices=list(bulk.EXPORT_FIELDS), default='ads', help='Что выгружать')
+        parser.add_argument('--user', help='Только объявления этого пользователя')
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Формат, если не ясен из расширения')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Строк на одно чтение из курсора БД')
+
+    def handle(self, *args, **options):
+        try:
+            fmt = bulk.detect_format(options['path'], options['format'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        filters = {}
+        if options['user']:
+            if options['model'] != 'ads':
+                raise CommandError('--user применим только к объявлениям')
+            filters['user__username'] = options['user']
+
+        columns, rows = bulk.export_rows(options['model'], options['chunk_size'], **filters)
+        progress = bulk.Progress()
+        with bulk.open_text(options['path'], 'w') as file:
+            bulk.write_rows(file, fmt, columns, rows, progress)
+
+        # При выгрузке в stdout отчет не должен попасть в данные
+        report = self.stderr if options['path'] == '-' else self.stdout
+        report.write(self.style.SUCCESS(f'Выгружено: {progress}'))
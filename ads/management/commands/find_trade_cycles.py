@@ -0,0 +1,42 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads import trade_cycles
+
+
+class Command(BaseCommand):
+    help = 'Ищет цепочки обмена по всем ожидающим предложениям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-length', type=int, default=trade_cycles.MIN_LENGTH)
+        parser.add_argument('--max-length', type=int, default=trade_cycles.MAX_LENGTH)
+        parser.add_argument('--limit', type=int, default=10_000, help='Остановить поиск после стольких циклов')
+        parser.add_argument('--show', type=int, default=20, help='Сколько найденных циклов вывести')
+        parser.add_argument('--output', help='Записать все найденные циклы в файл, по одному JSON-массиву id на строку')
+
+    def handle(self, *args, **options):
+        graph = trade_cycles.TradeGraph()
+
+        started = time.monotonic()
+        graph.load()
+        stats = graph.stats()
+        self.stdout.write(
+            f"Граф: {stats['edges']} предложений, {stats['ads']} объявлений, {stats['users']} пользователей "
+            f"({time.monotonic() - started:.2f} с)"
+        )
+
+        started = time.monotonic()
+        cycles = graph.find_cycles(options['min_length'], options['max_length'], options['limit'])
+        self.stdout.write(f'Найдено циклов: {len(cycles)} ({time.monotonic() - started:.2f} с)')
+        if len(cycles) >= options['limit']:
+            self.stdout.write(self.style.WARNING(f"Поиск остановлен на лимите {options['limit']}"))
+
+        for cycle in cycles[:options['show']]:
+            self.stdout.write(' -> '.join(map(str, cycle + cycle[:1])))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                for cycle in cycles:
+                    output.write(json.dumps(cycle) + '\n')
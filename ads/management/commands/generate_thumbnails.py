@@ -0,0 +1,58 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from ads import cache, thumbnails
+from ads.models import Ad
+
+# Сколько изображений на один процесс отдается в пул за раз
+TASKS_PER_WORKER = 4
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для изображений объявлений, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Число процессов для обработки изображений')
+        parser.add_argument('--force', action='store_true', help='Перестроить миниатюры для всех изображений')
+
+    def handle(self, *args, **options):
+        queryset = Ad.objects.exclude(image_url='').exclude(image_url__isnull=True)
+        if not options['force']:
+            queryset = queryset.exclude(thumbnails_source=F('image_url'))
+        batch_size = options['workers'] * TASKS_PER_WORKER
+
+        started = time.monotonic()
+        done = failed = last_id = 0
+        # Процессы только читают файлы и пишут варианты, БД обновляется здесь. Объявления
+        # читаются пачками по id, чтобы в пуле и в памяти не копились задачи на все изображения
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                pending = list(queryset.filter(pk__gt=last_id).order_by('pk')
+                               .values_list('id', 'image_url')[:batch_size])
+                if not pending:
+                    break
+                last_id = pending[-1][0]
+                futures = {pool.submit(thumbnails.render_variants, name): (ad_id, name) for ad_id, name in pending}
+                for future in as_completed(futures):
+                    ad_id, name = futures[future]
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f'{name}: {exc}')
+                        continue
+                    thumbnails.mark_ready(ad_id, name, bump=False)
+                    done += 1
+        if done:
+            # Страницы, закэшированные со ссылками на оригиналы, сбрасываются один раз
+            cache.bump_generation()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, ошибок: {failed}, за {elapsed:.1f} с.'
+        ))
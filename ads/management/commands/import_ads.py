@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ads import bulk
+
+
+class Command(BaseCommand):
+    help = ('Загружает объявления из CSV или JSONL: строки проверяются как в форме объявления '
+            'и вставляются пачками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл .csv или .jsonl, '-' - stdin")
+        parser.add_argument('--user', required=True, help='Имя пользователя - владельца объявлений')
+        parser.add_argument('--images', help='Каталог, относительно которого указаны файлы в колонке image')
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Формат, если не ясен из расширения')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Строк в одной транзакции')
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help='Прервать загрузку после стольких ошибочных строк')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить строки')
+
+    def handle(self, *args, **options):
+        try:
+            fmt = bulk.detect_format(options['path'], options['format'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["user"]}')
+
+        importer = bulk.AdImporter(
+            user, images_dir=options['images'], chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+            on_flush=self.report_chunk if options['verbosity'] > 1 else None,
+        )
+        read, errors = bulk.Progress(), 0
+        with bulk.open_text(options['path'], 'r') as file:
+            for number, row in bulk.read_rows(file, fmt):
+                read.rows += 1
+                try:
+                    importer.add(importer.build(number, row))
+                except bulk.RowError as exc:
+                    errors += 1
+                    self.stderr.write(str(exc))
+                    if errors >= options['max_errors']:
+                        # Уже проверенные строки вставляются и при прерывании
+                        created = importer.finish()
+                        raise CommandError(f'Слишком много ошибок ({errors}), загрузка прервана; '
+                                           f'загружено: {created.rows}')
+        created = importer.finish()
+
+        label = 'Проверено' if options['dry_run'] else 'Загружено'
+        self.stdout.write(self.style.SUCCESS(f'{label}: {created}; прочитано строк: {read.rows}, ошибок: {errors}'))
+        if created.rows and not options['dry_run']:
+            # bulk_create минует сигналы, пересчитывающие похожие объявления
+            self.stdout.write('Похожие объявления пересчитывает команда rebuild_similar_ads.')
+            if options['images']:
+                self.stdout.write('Миниатюры изображений строит команда generate_thumbnails.')
+
+    def report_chunk(self, progress):
+        self.stdout.write(f'Загружено: {progress}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ads import cache
+
+
+class Command(BaseCommand):
+    help = 'Показывает счетчики попаданий и промахов кэша страниц'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счетчики после вывода')
+
+    def handle(self, *args, **options):
+        stats = cache.get_stats()
+        self.stdout.write(f"Поколение: {cache.get_generation()}")
+        self.stdout.write(f"Попадания: {stats['hits']}")
+        self.stdout.write(f"Промахи: {stats['misses']}")
+        self.stdout.write(f"Доля попаданий: {stats['hit_ratio']:.1%}")
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Счетчики обнулены.'))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads import search
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает полнотекстовый индекс объявлений'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING('Текущая СУБД не поддерживает полнотекстовый индекс.'))
+            return
+
+        started = time.monotonic()
+        total = search.rebuild_index()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано объявлений: {total} за {elapsed:.2f} с.'))
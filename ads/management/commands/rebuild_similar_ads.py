@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads import similar
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает списки похожих объявлений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=similar.CHUNK_SIZE,
+                            help='Сколько списков вставлять за раз')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = similar.rebuild(options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны похожие для объявлений: {total} за {elapsed:.2f} с.'))
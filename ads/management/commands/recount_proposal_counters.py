@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ads import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики ожидающих предложений объявлений и пользователей'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            ads, users = counters.recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано: {ads} объявлений, {users} пользователей ({time.monotonic() - started:.1f} с)'
+        ))
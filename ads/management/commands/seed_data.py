@@ -0,0 +1,159 @@
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ads import cache, counters, inbox, search, similar
+from ads.models import Ad, ExchangeProposal, title_key
+
+# Примерная доля категорий и состояний на живой площадке обмена
+CATEGORY_WEIGHTS = {
+    'electronics': 24, 'clothing': 22, 'books': 14, 'home': 16, 'sport': 9, 'toys': 10, 'other': 5,
+}
+CONDITION_WEIGHTS = {'new': 8, 'like_new': 22, 'good': 40, 'fair': 22, 'poor': 8}
+STATUS_WEIGHTS = {'pending': 70, 'accepted': 10, 'rejected': 20}
+
+TITLE_WORDS = {
+    'electronics': ['Смартфон', 'Ноутбук', 'Наушники', 'Планшет', 'Фотоаппарат', 'Монитор', 'Колонка'],
+    'clothing': ['Куртка', 'Платье', 'Кроссовки', 'Свитер', 'Джинсы', 'Пальто', 'Рубашка'],
+    'books': ['Роман', 'Учебник', 'Сборник рассказов', 'Энциклопедия', 'Детектив', 'Словарь'],
+    'home': ['Чайник', 'Кресло', 'Лампа', 'Сервиз', 'Пылесос', 'Полка', 'Ковер'],
+    'sport': ['Велосипед', 'Гантели', 'Самокат', 'Палатка', 'Лыжи', 'Коврик для йоги'],
+    'toys': ['Конструктор', 'Кукла', 'Машинка', 'Пазл', 'Настольная игра', 'Плюшевый медведь'],
+    'other': ['Картина', 'Гитара', 'Коллекция марок', 'Чемодан', 'Часы', 'Ваза'],
+}
+CATEGORIES, CATEGORY_CUM_WEIGHTS = list(CATEGORY_WEIGHTS), list(accumulate(CATEGORY_WEIGHTS.values()))
+CONDITIONS, CONDITION_CUM_WEIGHTS = list(CONDITION_WEIGHTS), list(accumulate(CONDITION_WEIGHTS.values()))
+
+ADJECTIVES = ['Отличный', 'Почти новый', 'Редкий', 'Большой', 'Компактный', 'Старый', 'Винтажный', 'Удобный']
+DESCRIPTION_PHRASES = [
+    'Меняю на что-нибудь полезное.', 'Пользовались аккуратно.', 'Есть небольшие следы использования.',
+    'В комплекте коробка и документы.', 'Самовывоз из центра.', 'Рассмотрю любые предложения.',
+    'Отдам вместе с аксессуарами.', 'Причина обмена - переезд.',
+]
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """Позволяет bulk_create сохранить заданные даты вместо auto_now/auto_now_add"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Заполняет БД синтетическими пользователями, объявлениями и предложениями обмена'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--ads', type=int, default=1_000_000)
+        parser.add_argument('--proposals', type=int, default=500_000)
+        parser.add_argument('--chunk-size', type=int, default=5_000)
+        parser.add_argument('--days', type=int, default=365, help='За сколько дней распределить даты публикации')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератора для воспроизводимых данных')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        user_ids = self._timed('Пользователи', self.create_users, options['users'])
+        ad_ids, ad_owners = self._timed('Объявления', self.create_ads, options['ads'], user_ids)
+        self._timed('Предложения', self.create_proposals, options['proposals'], ad_ids, ad_owners)
+        self._timed('Поисковый индекс', search.rebuild_index)
+        # bulk_create не вызывает сигналы, которые ведут счетчики и ленту предложений
+        self._timed('Счетчики предложений', counters.recount)
+        self._timed('Лента предложений', inbox.rebuild, self.chunk_size)
+        self._timed('Похожие объявления', similar.rebuild, self.chunk_size)
+        cache.bump_generation()
+
+    def _timed(self, label, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        self.stdout.write(f'{label}: {time.monotonic() - started:.1f} с')
+        return result
+
+    def _chunks(self, total):
+        for start in range(0, total, self.chunk_size):
+            yield min(self.chunk_size, total - start)
+
+    def _random_moment(self):
+        return self.now - timedelta(seconds=self.rng.random() * self.span)
+
+    def create_users(self, total):
+        prefix = f'seed{self.rng.randrange(10 ** 6)}_'
+        # Хэшировать пароли незачем: у синтетических пользователей вход отключен
+        for size in self._chunks(total):
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(username=f'{prefix}{self.rng.randrange(10 ** 12)}', password='!', is_active=True)
+                    for _ in range(size)
+                ], ignore_conflicts=True)
+        return array('q', User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+
+    def _ad(self, user_id):
+        category = self.rng.choices(CATEGORIES, cum_weights=CATEGORY_CUM_WEIGHTS)[0]
+        condition = self.rng.choices(CONDITIONS, cum_weights=CONDITION_CUM_WEIGHTS)[0]
+        created_at = self._random_moment()
+        title = f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(TITLE_WORDS[category]).lower()}'
+        return Ad(
+            user_id=user_id,
+            title=title,
+            title_search=title_key(title),
+            description=' '.join(self.rng.sample(DESCRIPTION_PHRASES, 3)),
+            category=category,
+            condition=condition,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+    def create_ads(self, total, user_ids):
+        ad_ids, ad_owners = array('q'), array('q')
+        # Активность пользователей неравномерна: часть продавцов выставляет много объявлений
+        cum_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(user_ids))))
+        with explicit_timestamps(Ad, 'created_at', 'updated_at'):
+            for size in self._chunks(total):
+                owners = self.rng.choices(user_ids, cum_weights=cum_weights, k=size)
+                with transaction.atomic():
+                    created = Ad.objects.bulk_create([self._ad(user_id) for user_id in owners])
+                for ad in created:
+                    ad_ids.append(ad.pk)
+                    ad_owners.append(ad.user_id)
+        return ad_ids, ad_owners
+
+    def create_proposals(self, total, ad_ids, ad_owners):
+        if len(set(ad_owners)) < 2:
+            self.stdout.write(self.style.WARNING('Для предложений нужны объявления хотя бы двух пользователей.'))
+            return
+        statuses = self.rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=total)
+        with explicit_timestamps(ExchangeProposal, 'created_at'):
+            for offset, size in zip(range(0, total, self.chunk_size), self._chunks(total)):
+                batch = []
+                while len(batch) < size:
+                    sender, receiver = self.rng.randrange(len(ad_ids)), self.rng.randrange(len(ad_ids))
+                    if ad_owners[sender] == ad_owners[receiver]:
+                        continue
+                    batch.append(ExchangeProposal(
+                        ad_sender_id=ad_ids[sender],
+                        ad_receiver_id=ad_ids[receiver],
+                        sender_user_id=ad_owners[sender],
+                        receiver_user_id=ad_owners[receiver],
+                        status=statuses[offset + len(batch)],
+                        created_at=self._random_moment(),
+                    ))
+                with transaction.atomic():
+                    ExchangeProposal.objects.bulk_create(batch)
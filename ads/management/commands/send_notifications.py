@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads import notifications, outbox
+
+
+class Command(BaseCommand):
+    help = ('Доставляет уведомления из очереди исходящих пачками, объединяя события одного '
+            'получателя в одно уведомление')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Событий в одной пачке')
+        parser.add_argument('--loop', action='store_true',
+                            help='Не завершаться, когда очередь пуста, а проверять ее снова')
+        parser.add_argument('--interval', type=float, default=2.0, help='Пауза между проверками пустой очереди, с')
+
+    def handle(self, *args, **options):
+        backend = notifications.get_backend()
+        started = time.monotonic()
+        totals = [0, 0, 0]
+        while True:
+            batch = outbox.drain(backend, options['batch_size'])
+            totals = [total + value for total, value in zip(totals, batch)]
+            if batch[0]:
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Событий: {batch[0]}, уведомлений: {batch[1]}, ошибок: {batch[2]}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        events, digests, failed = totals
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Событий: {events}, уведомлений: {digests}, ошибок доставки: {failed} за {elapsed:.1f} с.'
+        ))
@@ -0,0 +1,38 @@
+import gzip
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ads import vendor
+
+
+class Command(BaseCommand):
+    help = ('Скачивает Bootstrap и Bootstrap Icons в static/vendor/ и собирает CSS только '
+            'с используемыми в шаблонах классами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge-only', action='store_true',
+                            help='Не скачивать, только пересобрать урезанные CSS (после правки шаблонов)')
+
+    def handle(self, *args, **options):
+        if not options['purge_only']:
+            for vendor_file in [asset.source for asset in vendor.ASSETS.values()] + list(vendor.EXTRA_FILES):
+                self.download(vendor_file)
+
+        try:
+            results = vendor.build_purged()
+        except FileNotFoundError as exc:
+            raise CommandError(f'Нет скачанного файла {exc.filename}: запустите без --purge-only.')
+        for path, before, after in results:
+            gzipped = len(gzip.compress((vendor.static_source_dir() / path).read_bytes()))
+            self.stdout.write(f'{path}: {before // 1024} КБ -> {after // 1024} КБ, gzip {gzipped // 1024} КБ')
+
+    def download(self, vendor_file):
+        with urlopen(vendor_file.url, timeout=30) as response:
+            content = response.read()
+        if vendor_file.integrity and vendor.integrity_of(content) != vendor_file.integrity:
+            raise CommandError(f'{vendor_file.url}: хэш не совпадает с {vendor_file.integrity}')
+        target = vendor.static_source_dir() / vendor_file.path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        self.stdout.write(f'{vendor_file.path}: {len(content) // 1024} КБ')
@@ -0,0 +1,37 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Локальный приемник webhook-уведомлений: печатает полученные сводки (для WebhookBackend)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8025)
+
+    def handle(self, *args, **options):
+        stdout = self.stdout
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                payload = json.loads(body or b'{}')
+                stdout.write(f"{payload.get('user')}: {len(payload.get('events', []))} событий")
+                for event in payload.get('events', []):
+                    stdout.write(f"  {event['text']}")
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(f"Прием уведомлений на http://{options['host']}:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
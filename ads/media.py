@@ -0,0 +1,200 @@
+"""
+Раздача загруженных изображений объявлений.
+
+Отдаются только файлы, на которые ссылается существующее объявление:
+оригинал ads/<имя> и его миниатюры thumbs/ads/<имя>_<ширина>.<формат>.
+После удаления объявления или замены изображения старые файлы сразу
+перестают раздаваться, даже если еще лежат на диске. Результат проверки
+кэшируется до следующего сброса кэша страниц (см. cache.py).
+
+Ответ поддерживает ETag, If-None-Match, If-Modified-Since и запросы
+Range. Файл отдается через FileResponse: WSGI-сервер с wsgi.file_wrapper
+(gunicorn) пересылает его системным вызовом sendfile без копирования в
+Python, в том числе для диапазонов.
+
+Если перед Django стоит nginx или Apache, ADS_MEDIA_ACCEL передает саму
+пересылку им: Django проверяет доступ, а файл отдает фронтенд-сервер.
+
+    ADS_MEDIA_ACCEL = 'x-accel-redirect'
+
+    location /protected-media/ {
+        internal;
+        alias /srv/app/media/;
+    }
+
+Для Apache с mod_xsendfile - ADS_MEDIA_ACCEL = 'x-sendfile'.
+"""
+import mimetypes
+import os
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import cache
+from .thumbnails import FORMATS, THUMBNAIL_WIDTHS
+
+ORIGINALS_DIR = 'ads/'
+# Имя миниатюры строит thumbnails.variant_name
+VARIANT_RE = re.compile(
+    rf'^thumbs/(?P<stem>{ORIGINALS_DIR}.+)_(?:{"|".join(map(str, THUMBNAIL_WIDTHS))})'
+    rf'\.(?:{"|".join(FORMATS)})$'
+)
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Имена файлов не меняются при правке объявления, но файл может пропасть
+# вместе с объявлением, поэтому браузеру разрешен только час без перепроверки
+MEDIA_MAX_AGE = 60 * 60
+ACCEL_MODES = ('', 'x-accel-redirect', 'x-sendfile')
+
+
+def _is_referenced(name):
+    from .models import Ad
+
+    match = VARIANT_RE.match(name)
+    if match is None:
+        return name.startswith(ORIGINALS_DIR) and Ad.objects.filter(image_url=name).exists()
+    # У миниатюры нет расширения оригинала: ищем ads/<stem>.* по индексу
+    # диапазоном ['stem.', 'stem/'), символ '/' следует за '.'
+    stem = match['stem']
+    candidates = Ad.objects.filter(image_url__gte=f'{stem}.', image_url__lt=f'{stem}/')
+    return any(os.path.splitext(image)[0] == stem
+               for image in candidates.order_by().values_list('image_url', flat=True))
+
+
+def is_published(name):
+    """Ссылается ли на файл существующее объявление"""
+    key = cache.value_key('media', name)
+    published = cache.get_cache().get(key)
+    if published is None:
+        published = _is_referenced(name)
+        cache.get_cache().set(key, published, cache.get_timeout())
+    return published
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(request, size, etag, last_modified):
+    """
+    (начало, конец) запрошенного диапазона включительно или None, если
+    отдавать нужно весь файл. ValueError - диапазон за пределами файла.
+    """
+    header = request.headers.get('Range')
+    if not header or request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        # Файл изменился с тех пор, как клиент получил первую часть
+        return None
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        # Несколько диапазонов и неизвестные единицы: по RFC 9110 можно отдать файл целиком
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError(header)
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class FileRange:
+    """
+    Часть открытого файла для FileResponse. fileno() открыт, чтобы сервер
+    мог отдать диапазон через sendfile с текущей позиции и длиной из
+    Content-Length; остальные серверы читают через read().
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _accel_response(path, fullpath, content_type):
+    mode = getattr(settings, 'ADS_MEDIA_ACCEL', '')
+    if mode not in ACCEL_MODES:
+        raise ImproperlyConfigured(f'ADS_MEDIA_ACCEL: неизвестный режим {mode!r}, доступны {ACCEL_MODES}')
+    if not mode:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'ADS_MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response.headers['X-Accel-Redirect'] = prefix + quote(path)
+    else:
+        response.headers['X-Sendfile'] = str(fullpath)
+    return response
+
+
+def serve(request, path):
+    """Изображение объявления с проверкой доступа, условными запросами и Range"""
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404
+    if not fullpath.is_file() or not is_published(path):
+        raise Http404
+
+    stat = fullpath.stat()
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type, _ = mimetypes.guess_type(fullpath.name)
+        content_type = content_type or 'application/octet-stream'
+        response = _accel_response(path, fullpath, content_type)
+        if response is None:
+            response = _file_response(request, fullpath, stat.st_size, content_type, etag, last_modified)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}'
+    return response
+
+
+def _file_response(request, fullpath, size, content_type, etag, last_modified):
+    try:
+        byte_range = parse_range(request, size, etag, last_modified)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = fullpath.open('rb')
+    if byte_range is None:
+        return FileResponse(file, content_type=content_type)
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(FileRange(file, start, length), content_type=content_type, status=206)
+    response.headers['Content-Length'] = length
+    response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,139 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseNotFound
+
+from . import media, performance
+
+logger = logging.getLogger('ads.performance')
+
+
+class AsgiUrlconfMiddleware:
+    """Направляет ASGI-запросы в settings.ASGI_URLCONF с асинхронными представлениями"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._route(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._route(request)
+        return await self.get_response(request)
+
+    def _route(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+
+
+class MediaMiddleware:
+    """
+    Отдает MEDIA_URL через media.serve (ADS_SERVE_MEDIA = True) до сессий,
+    CSRF и аутентификации: изображениям они не нужны, а запросов за
+    картинками на странице больше, чем за самой страницей.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.MEDIA_URL if getattr(settings, 'ADS_SERVE_MEDIA', False) else None
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        path = self._media_path(request)
+        if path is None:
+            return self.get_response(request)
+        return self._serve(request, path)
+
+    async def __acall__(self, request):
+        path = self._media_path(request)
+        if path is None:
+            return await self.get_response(request)
+        return await sync_to_async(self._serve)(request, path)
+
+    def _media_path(self, request):
+        if self.prefix and request.path_info.startswith(self.prefix) and request.method in ('GET', 'HEAD'):
+            return request.path_info[len(self.prefix):]
+        return None
+
+    def _serve(self, request, path):
+        try:
+            return media.serve(request, path)
+        except Http404:
+            return HttpResponseNotFound()
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет число и время SQL-запросов, время рендеринга шаблонов и общее
+    время обработки запроса. Отдает их в заголовке Server-Timing, пишет
+    структурированную строку в лог ads.performance и, если включен
+    ADS_PERF_HISTOGRAM, добавляет замер в гистограмму по имени URL.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = performance.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            performance.end_request(token)
+        return self._report(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = performance.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            performance.end_request(token)
+        return self._report(request, response, metrics)
+
+    def _report(self, request, response, metrics):
+        total_ms = metrics.total_time * 1000
+        sql_ms = metrics.sql_time * 1000
+        template_ms = metrics.template_time * 1000
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.2f};desc="{metrics.sql_count} queries", '
+            f'tpl;dur={template_ms:.2f}, '
+            f'total;dur={total_ms:.2f}'
+        )
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'sql_count': metrics.sql_count,
+            'sql_ms': round(sql_ms, 2),
+            'template_ms': round(template_ms, 2),
+        }, ensure_ascii=False))
+
+        if url_name and getattr(settings, 'ADS_PERF_HISTOGRAM', False):
+            performance.histogram.add(url_name, total_ms, metrics.sql_count)
+        return response
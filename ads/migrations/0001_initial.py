@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Заголовок')),
+                ('description', models.TextField(verbose_name='Описание')),
+                ('image_url', models.ImageField(blank=True, null=True, upload_to='ads/', verbose_name='URL изображения')),
+                ('category', models.CharField(choices=[('electronics', 'Электроника'), ('clothing', 'Одежда'), ('books', 'Книги'), ('home', 'Товары для дома'), ('sport', 'Спорт и отдых'), ('toys', 'Игрушки'), ('other', 'Другое')], max_length=30, verbose_name='Категория')),
+                ('condition', models.CharField(choices=[('new', 'Новый'), ('like_new', 'Как новый'), ('good', 'Хорошее'), ('fair', 'Удовлетворительное'), ('poor', 'Плохое')], max_length=30, verbose_name='Состояние')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Объявление',
+                'verbose_name_plural': 'Объявления',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExchangeProposal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment', models.TextField(blank=True, null=True, verbose_name='Комментарий')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('accepted', 'Принято'), ('rejected', 'Отклонено')], default='pending', max_length=30, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('ad_receiver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='received_proposals', to='ads.ad', verbose_name='Получатель')),
+                ('ad_sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sent_proposals', to='ads.ad', verbose_name='Отправитель')),
+            ],
+            options={
+                'verbose_name': 'Предложение обмена',
+                'verbose_name_plural': 'Предложения обмена',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
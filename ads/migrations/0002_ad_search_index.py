@@ -0,0 +1,43 @@
+from django.db import migrations
+
+FTS_TABLE = 'ads_ad_fts'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"title, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description) SELECT id, title, description FROM ads_ad'
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {FTS_TABLE} ('
+            f'ad_id bigint PRIMARY KEY REFERENCES ads_ad (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            f'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(f'CREATE INDEX {FTS_TABLE}_document_gin ON {FTS_TABLE} USING GIN (document)')
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (ad_id, document) "
+            f"SELECT id, setweight(to_tsvector('russian', title), 'A') || "
+            f"setweight(to_tsvector('russian', description), 'B') FROM ads_ad"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
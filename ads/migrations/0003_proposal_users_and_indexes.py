@@ -0,0 +1,79 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_proposal_users(apps, schema_editor):
+    Ad = apps.get_model('ads', 'Ad')
+    ExchangeProposal = apps.get_model('ads', 'ExchangeProposal')
+    ExchangeProposal.objects.update(
+        sender_user=Subquery(Ad.objects.filter(pk=OuterRef('ad_sender_id')).values('user_id')[:1]),
+        receiver_user=Subquery(Ad.objects.filter(pk=OuterRef('ad_receiver_id')).values('user_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+    # В PostgreSQL UPDATE из fill_proposal_users оставляет отложенные проверки внешних ключей,
+    # и AlterField в той же транзакции падает с "pending trigger events": заполнение
+    # коммитится отдельной транзакцией до перевода колонок в NOT NULL
+    atomic = False
+
+    dependencies = [
+        ('ads', '0002_ad_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exchangeproposal',
+            name='receiver_user',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='received_exchange_proposals', to=settings.AUTH_USER_MODEL, verbose_name='Владелец объявления-получателя'),
+        ),
+        migrations.AddField(
+            model_name='exchangeproposal',
+            name='sender_user',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sent_exchange_proposals', to=settings.AUTH_USER_MODEL, verbose_name='Владелец объявления-отправителя'),
+        ),
+        migrations.RunPython(fill_proposal_users, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name='exchangeproposal',
+            name='receiver_user',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='received_exchange_proposals', to=settings.AUTH_USER_MODEL, verbose_name='Владелец объявления-получателя'),
+        ),
+        migrations.AlterField(
+            model_name='exchangeproposal',
+            name='sender_user',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_exchange_proposals', to=settings.AUTH_USER_MODEL, verbose_name='Владелец объявления-отправителя'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['-created_at', '-id'], name='ad_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='ad_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['condition', '-created_at', '-id'], name='ad_condition_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['category', 'condition', '-created_at', '-id'], name='ad_cat_cond_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='ad_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exchangeproposal',
+            index=models.Index(fields=['sender_user', '-created_at'], name='proposal_sender_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exchangeproposal',
+            index=models.Index(fields=['receiver_user', '-created_at'], name='proposal_receiver_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0003_proposal_users_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='thumbnails_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Миниатюры построены для'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0004_ad_thumbnails_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _pending_count(ExchangeProposal, lookup):
+    pending = (ExchangeProposal.objects.filter(status='pending', **{lookup: OuterRef('pk')})
+               .order_by().values(lookup).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(pending, output_field=IntegerField()), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Ad = apps.get_model('ads', 'Ad')
+    ExchangeProposal = apps.get_model('ads', 'ExchangeProposal')
+    ProposalCounters = apps.get_model('ads', 'ProposalCounters')
+
+    ProposalCounters.objects.bulk_create(
+        [ProposalCounters(user_id=pk) for pk in User.objects.values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+    Ad.objects.update(pending_proposals_count=_pending_count(ExchangeProposal, 'ad_receiver'))
+    ProposalCounters.objects.update(
+        pending_received_count=_pending_count(ExchangeProposal, 'receiver_user'),
+        pending_sent_count=_pending_count(ExchangeProposal, 'sender_user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0005_ad_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProposalCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='proposal_counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('pending_received_count', models.PositiveIntegerField(default=0, verbose_name='Полученных ожидающих')),
+                ('pending_sent_count', models.PositiveIntegerField(default=0, verbose_name='Отправленных ожидающих')),
+            ],
+            options={
+                'verbose_name': 'Счетчики предложений',
+                'verbose_name_plural': 'Счетчики предложений',
+            },
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='pending_proposals_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ожидающих предложений'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
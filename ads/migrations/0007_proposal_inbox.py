@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_inbox(apps, schema_editor):
+    ExchangeProposal = apps.get_model('ads', 'ExchangeProposal')
+    ProposalInboxEntry = apps.get_model('ads', 'ProposalInboxEntry')
+
+    rows = ExchangeProposal.objects.values_list('id', 'status', 'created_at', 'sender_user_id', 'receiver_user_id')
+    chunk = []
+    for pk, status, created_at, sender_user_id, receiver_user_id in rows.iterator(chunk_size=5000):
+        chunk.append(ProposalInboxEntry(user_id=sender_user_id, proposal_id=pk, direction='sent',
+                                        status=status, created_at=created_at))
+        chunk.append(ProposalInboxEntry(user_id=receiver_user_id, proposal_id=pk, direction='received',
+                                        status=status, created_at=created_at))
+        if len(chunk) >= 5000:
+            ProposalInboxEntry.objects.bulk_create(chunk)
+            chunk = []
+    ProposalInboxEntry.objects.bulk_create(chunk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0006_proposal_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProposalInboxEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('direction', models.CharField(choices=[('received', 'Полученные'), ('sent', 'Отправленные')], max_length=10, verbose_name='Направление')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('accepted', 'Принято'), ('rejected', 'Отклонено')], max_length=30, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('proposal', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='ads.exchangeproposal', verbose_name='Предложение')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='proposal_inbox', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты предложений',
+                'verbose_name_plural': 'Записи ленты предложений',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='inbox_user_created_idx'), models.Index(fields=['user', 'direction', '-created_at', '-id'], name='inbox_user_dir_created_idx'), models.Index(fields=['user', 'status', '-created_at', '-id'], name='inbox_user_status_created_idx'), models.Index(fields=['user', 'direction', 'status', '-created_at', '-id'], name='inbox_user_dir_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('proposal', 'direction'), name='inbox_proposal_direction_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_inbox, migrations.RunPython.noop),
+    ]
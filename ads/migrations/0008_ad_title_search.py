@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_title_search(apps, schema_editor):
+    Ad = apps.get_model('ads', 'Ad')
+    batch = []
+    for ad in Ad.objects.only('id', 'title').iterator(chunk_size=1000):
+        # Та же нормализация, что ads.models.title_key
+        ad.title_search = ' '.join(ad.title.split()).casefold()[:255]
+        batch.append(ad)
+        if len(batch) >= 1000:
+            Ad.objects.bulk_update(batch, ['title_search'])
+            batch = []
+    Ad.objects.bulk_update(batch, ['title_search'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0007_proposal_inbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='title_search',
+            field=models.CharField(default='', editable=False, max_length=255, verbose_name='Заголовок для поиска'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['user', 'title_search', 'id'], name='ad_user_title_idx'),
+        ),
+        migrations.RunPython(fill_title_search, migrations.RunPython.noop),
+    ]
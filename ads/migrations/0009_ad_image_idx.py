@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0008_ad_title_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['image_url'], name='ad_image_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0009_ad_image_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Новое предложение'), ('accepted', 'Предложение принято'), ('rejected', 'Предложение отклонено')], max_length=10, verbose_name='Событие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('available_at', models.DateTimeField(verbose_name='Доступно с')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток доставки')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Последняя ошибка')),
+                ('proposal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='ads.exchangeproposal', verbose_name='Предложение')),
+                ('recipient', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to=settings.AUTH_USER_MODEL, verbose_name='Получатель')),
+            ],
+            options={
+                'verbose_name': 'Исходящее уведомление',
+                'verbose_name_plural': 'Исходящие уведомления',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['available_at', 'id'], name='outbox_available_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0010_outbox_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarAd',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место в списке')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('ad', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='similar_ads', to='ads.ad', verbose_name='Объявление')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='ads.ad', verbose_name='Похожее объявление')),
+            ],
+            options={
+                'verbose_name': 'Похожее объявление',
+                'verbose_name_plural': 'Похожие объявления',
+                'ordering': ['rank'],
+                'constraints': [models.UniqueConstraint(fields=('ad', 'rank'), name='similar_ad_rank_uniq')],
+            },
+        ),
+    ]
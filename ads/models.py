@@ -3,6 +3,11 @@ from django.db import models
 from django.urls import reverse
 
 
+def title_key(title):
+    """Заголовок для поиска по префиксу: без регистра и лишних пробелов"""
+    return ' '.join(title.split()).casefold()[:255]
+
+
 class Ad(models.Model):
     CATEGORY_CHOICES = [
         ('electronics', 'Электроника'),
@@ -24,16 +29,40 @@ class Ad(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Пользователь')
     title = models.CharField(max_length=255, verbose_name='Заголовок')
+    # title_key(title): SQLite сравнивает регистр кириллицы побайтно, поэтому
+    # поиск по префиксу идет по нормализованной копии заголовка
+    title_search = models.CharField(max_length=255, default='', editable=False,
+                                    verbose_name='Заголовок для поиска')
     description = models.TextField(verbose_name='Описание')
     image_url = models.ImageField(upload_to="ads/", blank=True, null=True, verbose_name='URL изображения')
+    # Имя изображения, для которого построены миниатюры (см. thumbnails.py)
+    thumbnails_source = models.CharField(max_length=100, blank=True, default='', editable=False,
+                                         verbose_name='Миниатюры построены для')
     category = models.CharField(max_length=30, choices=CATEGORY_CHOICES, verbose_name='Категория')
     condition = models.CharField(max_length=30, choices=CONDITION_CHOICES, verbose_name='Состояние')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+    # Меняется только атомарными UPDATE с F() (см. counters.py)
+    pending_proposals_count = models.PositiveIntegerField(default=0, editable=False,
+                                                          verbose_name='Ожидающих предложений')
 
     class Meta:
         verbose_name = 'Объявление'
         verbose_name_plural = 'Объявления'
         ordering = ['-created_at']
+        indexes = [
+            # Лента и курсорная пагинация по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='ad_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='ad_category_created_idx'),
+            models.Index(fields=['condition', '-created_at', '-id'], name='ad_condition_created_idx'),
+            models.Index(fields=['category', 'condition', '-created_at', '-id'], name='ad_cat_cond_created_idx'),
+            # Фильтр "Мои объявления" и список объявлений пользователя в ad_detail
+            models.Index(fields=['user', '-created_at', '-id'], name='ad_user_created_idx'),
+            # Автодополнение объявлений пользователя в форме предложения обмена
+            models.Index(fields=['user', 'title_search', 'id'], name='ad_user_title_idx'),
+            # Проверка доступа к изображению при раздаче медиафайлов (media.py)
+            models.Index(fields=['image_url'], name='ad_image_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -41,6 +70,19 @@ class Ad(models.Model):
     def get_absolute_url(self):
         return reverse('ad_detail', args=[str(self.id)])
 
+    def save(self, *args, **kwargs):
+        if 'title' not in self.get_deferred_fields():
+            self.title_search = title_key(self.title)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'title' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'title_search'}
+        # Сохранение формы не должно перезаписать счетчик значением, прочитанным до параллельного UPDATE
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.get_deferred_fields() | {'pending_proposals_count'}
+            kwargs['update_fields'] = [field.attname for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.attname not in skipped]
+        super().save(*args, **kwargs)
+
 
 class ExchangeProposal(models.Model):
     STATUS_CHOICES = [
@@ -57,11 +99,151 @@ class ExchangeProposal(models.Model):
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='pending',
                               verbose_name='Статус')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    # Владельцы объявлений хранятся в самом предложении, чтобы списки
+    # "мои предложения" выбирались по индексу без JOIN и сортировки.
+    # Отдельные индексы по FK не нужны: их покрывают составные индексы ниже
+    sender_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_exchange_proposals',
+                                    editable=False, db_index=False,
+                                    verbose_name='Владелец объявления-отправителя')
+    receiver_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_exchange_proposals',
+                                      editable=False, db_index=False,
+                                      verbose_name='Владелец объявления-получателя')
 
     class Meta:
         verbose_name = 'Предложение обмена'
         verbose_name_plural = 'Предложения обмена'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['sender_user', '-created_at'], name='proposal_sender_created_idx'),
+            models.Index(fields=['receiver_user', '-created_at'], name='proposal_receiver_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Обмен {self.ad_sender} на {self.ad_receiver}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Статус на момент загрузки: по нему signals.py понимает, изменился ли он при сохранении
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.sender_user_id is None:
+            self.sender_user_id = self.ad_sender.user_id
+        if self.receiver_user_id is None:
+            self.receiver_user_id = self.ad_receiver.user_id
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
+
+class ProposalInboxEntry(models.Model):
+    """
+    Строка ленты предложений пользователя. Каждое предложение попадает в ленту
+    отправителя и получателя, поэтому "все мои предложения" с фильтрами по
+    направлению и статусу выбираются одним запросом по индексу (см. inbox.py)
+    """
+    DIRECTION_CHOICES = [
+        ('received', 'Полученные'),
+        ('sent', 'Отправленные'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='proposal_inbox', db_index=False,
+                             verbose_name='Пользователь')
+    proposal = models.ForeignKey(ExchangeProposal, on_delete=models.CASCADE, related_name='inbox_entries',
+                                 db_index=False, verbose_name='Предложение')
+    direction = models.CharField(max_length=10, choices=DIRECTION_CHOICES, verbose_name='Направление')
+    # Копии полей предложения для фильтрации и сортировки по индексу
+    status = models.CharField(max_length=30, choices=ExchangeProposal.STATUS_CHOICES, verbose_name='Статус')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = 'Запись ленты предложений'
+        verbose_name_plural = 'Записи ленты предложений'
+        ordering = ['-created_at']
+        constraints = [
+            # Покрывает и поиск записей предложения при смене статуса
+            models.UniqueConstraint(fields=['proposal', 'direction'], name='inbox_proposal_direction_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='inbox_user_created_idx'),
+            models.Index(fields=['user', 'direction', '-created_at', '-id'], name='inbox_user_dir_created_idx'),
+            models.Index(fields=['user', 'status', '-created_at', '-id'], name='inbox_user_status_created_idx'),
+            models.Index(fields=['user', 'direction', 'status', '-created_at', '-id'],
+                         name='inbox_user_dir_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_direction_display()}: {self.proposal_id}"
+
+
+class ProposalCounters(models.Model):
+    """Счетчики ожидающих предложений пользователя для значка в шапке (см. counters.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='proposal_counters',
+                                verbose_name='Пользователь')
+    pending_received_count = models.PositiveIntegerField(default=0, verbose_name='Полученных ожидающих')
+    pending_sent_count = models.PositiveIntegerField(default=0, verbose_name='Отправленных ожидающих')
+
+    class Meta:
+        verbose_name = 'Счетчики предложений'
+        verbose_name_plural = 'Счетчики предложений'
+
+    def __str__(self):
+        return f"Счетчики {self.user}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Уведомление участнику обмена, записанное в той же транзакции, что и
+    изменение предложения. Доставляет команда send_notifications (см. outbox.py)
+    """
+    KIND_CHOICES = [
+        ('created', 'Новое предложение'),
+        ('accepted', 'Предложение принято'),
+        ('rejected', 'Предложение отклонено'),
+    ]
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='outbox_events', db_index=False,
+                                  verbose_name='Получатель')
+    proposal = models.ForeignKey(ExchangeProposal, on_delete=models.CASCADE, related_name='outbox_events',
+                                 verbose_name='Предложение')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='Событие')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    # Раньше этого момента событие не выбирается: аренда обработчиком или пауза перед повтором
+    available_at = models.DateTimeField(verbose_name='Доступно с')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток доставки')
+    last_error = models.TextField(blank=True, default='', verbose_name='Последняя ошибка')
+
+    class Meta:
+        verbose_name = 'Исходящее уведомление'
+        verbose_name_plural = 'Исходящие уведомления'
+        ordering = ['id']
+        indexes = [
+            # Очередь обработчика: готовые к доставке в порядке появления
+            models.Index(fields=['available_at', 'id'], name='outbox_available_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.proposal_id} -> {self.recipient_id}"
+
+
+class SimilarAd(models.Model):
+    """Похожее объявление из заранее посчитанного списка (см. similar.py)"""
+    # Отдельный индекс по ad не нужен: его покрывает ограничение (ad, rank)
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='similar_ads', db_index=False,
+                           verbose_name='Объявление')
+    similar = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='+',
+                                verbose_name='Похожее объявление')
+    rank = models.PositiveSmallIntegerField(verbose_name='Место в списке')
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожее объявление'
+        verbose_name_plural = 'Похожие объявления'
+        ordering = ['rank']
+        constraints = [
+            models.UniqueConstraint(fields=['ad', 'rank'], name='similar_ad_rank_uniq'),
+        ]
 
     def __str__(self):
-        return f"Обмен {self.ad_sender} на {self.ad_receiver}"
\ No newline at end of file
+        return f"{self.ad_id} ~ {self.similar_id}"
@@ -0,0 +1,104 @@
+"""
+Доставка сводных уведомлений из очереди outbox.py.
+
+ADS_NOTIFICATION_BACKEND - путь к классу с методами open(), close() и
+deliver(recipient, events):
+ * ads.notifications.EmailBackend - письмо через EMAIL_BACKEND; в
+   разработке это консоль или каталог файлов (filebased);
+ * ads.notifications.WebhookBackend - POST JSON на
+   ADS_NOTIFICATION_WEBHOOK_URL, локально его принимает команда webhook_stub.
+
+Исключение из deliver() означает, что сводку нужно доставить повторно.
+"""
+import hashlib
+import hmac
+import json
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+WEBHOOK_TIMEOUT = 10
+
+TEMPLATES = {
+    'created': 'Новое предложение: «{sender}» в обмен на ваше «{receiver}»',
+    'accepted': 'Ваше предложение «{sender}» в обмен на «{receiver}» принято',
+    'rejected': 'Ваше предложение «{sender}» в обмен на «{receiver}» отклонено',
+}
+
+
+def get_backend():
+    return import_string(settings.ADS_NOTIFICATION_BACKEND)()
+
+
+def event_text(event):
+    proposal = event.proposal
+    return TEMPLATES[event.kind].format(sender=proposal.ad_sender.title, receiver=proposal.ad_receiver.title)
+
+
+def proposals_url():
+    return settings.ADS_SITE_URL.rstrip('/') + reverse('my_proposals')
+
+
+def digest_subject(events):
+    if len(events) == 1:
+        return event_text(events[0])
+    return f'Обмен: новые события по вашим предложениям ({len(events)})'
+
+
+def digest_body(events):
+    lines = [f'- {event_text(event)}' for event in events]
+    return '\n'.join([*lines, '', f'Все предложения: {proposals_url()}'])
+
+
+class EmailBackend:
+    """Одно письмо на получателя; соединение открыто на всю пачку"""
+
+    def open(self):
+        self.connection = get_connection()
+        self.connection.open()
+
+    def close(self):
+        self.connection.close()
+
+    def deliver(self, recipient, events):
+        if not recipient.email:
+            # Адреса нет - доставлять некуда, повторять бессмысленно
+            return
+        EmailMessage(digest_subject(events), digest_body(events), to=[recipient.email],
+                     connection=self.connection).send()
+
+
+class WebhookBackend:
+    """POST JSON со сводкой; при заданном секрете тело подписывается HMAC-SHA256"""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def payload(self, recipient, events):
+        return {
+            'user': recipient.username,
+            'email': recipient.email,
+            'url': proposals_url(),
+            'events': [
+                {'kind': event.kind, 'proposal': event.proposal_id, 'text': event_text(event),
+                 'created_at': event.created_at.isoformat()}
+                for event in events
+            ],
+        }
+
+    def deliver(self, recipient, events):
+        body = json.dumps(self.payload(recipient, events), ensure_ascii=False).encode()
+        headers = {'Content-Type': 'application/json'}
+        secret = getattr(settings, 'ADS_NOTIFICATION_WEBHOOK_SECRET', '')
+        if secret:
+            headers['X-Signature'] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        request = Request(settings.ADS_NOTIFICATION_WEBHOOK_URL, data=body, headers=headers, method='POST')
+        # Ответ 4xx/5xx urlopen превращает в HTTPError
+        with urlopen(request, timeout=WEBHOOK_TIMEOUT):
+            pass
@@ -0,0 +1,112 @@
+"""
+Уведомления участникам обмена через таблицу исходящих (transactional outbox).
+
+Запись события - одна строка OutboxEvent в той же транзакции, что и
+создание предложения или смена его статуса: событие появляется тогда и
+только тогда, когда изменение закоммичено, а запрос не ждет почту или
+webhook. Новые предложения записывает сигнал (signals.py), массовые
+UPDATE в exchange.py - сами.
+
+Команда send_notifications разбирает очередь пачками:
+ * claim() в короткой транзакции выбирает готовые события и сдвигает им
+   available_at на LEASE - параллельный обработчик их не возьмет, а после
+   падения обработчика аренда истечет и события вернутся в очередь;
+ * события пачки группируются по получателю, и каждый получает одно
+   сводное уведомление вместо нескольких;
+ * доставленные события удаляются, при ошибке доставки событие ждет
+   RETRY_DELAY * 2 ** (попытка - 1) и после MAX_ATTEMPTS попыток остается
+   в таблице с текстом ошибки.
+
+Способ доставки задает ADS_NOTIFICATION_BACKEND (notifications.py).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters
+from .models import OutboxEvent
+
+LEASE = timedelta(minutes=5)
+RETRY_DELAY = timedelta(seconds=30)
+MAX_ATTEMPTS = 5
+SENDER_FIELD = counters.ROW_FIELDS.index('sender_user_id')
+
+
+def enqueue(events):
+    """Записывает события [(id получателя, вид, id предложения)]"""
+    now = timezone.now()
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(recipient_id=recipient_id, kind=kind, proposal_id=proposal_id, available_at=now)
+        for recipient_id, kind, proposal_id in events
+    ])
+
+
+def status_events(rows, status):
+    """События смены статуса для отправителей; rows - {id предложения: строка counters.ROW_FIELDS}"""
+    return [(row[SENDER_FIELD], status, proposal_id) for proposal_id, row in rows.items()]
+
+
+def claim(batch_size, now=None):
+    """Берет в работу до batch_size готовых событий"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        queryset = (OutboxEvent.objects.filter(available_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+                    .select_related('recipient', 'proposal__ad_sender', 'proposal__ad_receiver')
+                    .order_by('available_at', 'id'))
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+        events = list(queryset[:batch_size])
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            available_at=now + LEASE, attempts=F('attempts') + 1,
+        )
+    return events
+
+
+def group_by_recipient(events):
+    """Сводки: [(получатель, [события])] в порядке первого события"""
+    groups = defaultdict(list)
+    for event in events:
+        groups[event.recipient_id].append(event)
+    return [(group[0].recipient, group) for group in groups.values()]
+
+
+def complete(events):
+    OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+
+
+def fail(events, error, now=None):
+    """Откладывает повтор доставки с растущей паузой"""
+    now = now or timezone.now()
+    by_attempt = defaultdict(list)
+    for event in events:
+        # claim() уже увеличил attempts в БД
+        by_attempt[event.attempts + 1].append(event.pk)
+    for attempt, pks in by_attempt.items():
+        OutboxEvent.objects.filter(pk__in=pks).update(
+            available_at=now + RETRY_DELAY * 2 ** (attempt - 1), last_error=str(error)[:2000],
+        )
+
+
+def drain(backend, batch_size=100):
+    """Разбирает одну пачку; возвращает (событий, сводок, ошибок доставки)"""
+    events = claim(batch_size)
+    if not events:
+        return 0, 0, 0
+    digests = group_by_recipient(events)
+    failed = 0
+    backend.open()
+    try:
+        for recipient, group in digests:
+            try:
+                backend.deliver(recipient, group)
+            except Exception as exc:
+                failed += 1
+                fail(group, exc)
+            else:
+                complete(group)
+    finally:
+        backend.close()
+    return len(events), len(digests), failed
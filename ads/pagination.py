@@ -0,0 +1,154 @@
+"""
+Курсорная (keyset) пагинация.
+
+Вместо ``OFFSET`` и ``COUNT(*)`` страница выбирается условием
+``(created_at, id) < (курсор)``, поэтому N-я страница стоит столько же,
+сколько первая. Курсоры - непрозрачные base64-токены.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db import connection
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk, direction):
+    payload = json.dumps({'c': created_at.isoformat(), 'i': pk, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = data['d']
+        if direction not in ('next', 'prev'):
+            raise InvalidCursor(token)
+        return datetime.fromisoformat(data['c']), int(data['i']), direction
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError) as exc:
+        raise InvalidCursor(token) from exc
+
+
+def estimate_count(queryset):
+    """
+    Приблизительное число строк без COUNT(*).
+
+    Оценка доступна только для нефильтрованной таблицы на PostgreSQL
+    (pg_class.reltuples), в остальных случаях возвращается None.
+    """
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class KeysetPage:
+    """Страница курсорной пагинации с интерфейсом, похожим на django.core.paginator.Page"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last.created_at, last.pk, 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first.created_at, first.pk, 'prev')
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу (created_at, id) в порядке убывания,
+    что совпадает с Ad.Meta.ordering.
+
+    Общее число объектов не считается: ``count`` возвращает точное значение
+    только при ``exact_count=True``, иначе - оценку или None.
+    """
+
+    def __init__(self, queryset, per_page, exact_count=False):
+        self.queryset = queryset.order_by('-created_at', '-id')
+        self.per_page = int(per_page)
+        self.exact_count = exact_count
+
+    @property
+    def count(self):
+        if self.exact_count:
+            return self.queryset.count()
+        return estimate_count(self.queryset)
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору; неверный или пустой курсор - первая страница"""
+        direction, queryset = self._page_queryset(cursor)
+        page = self._make_page(direction, list(queryset[:self.per_page + 1]))
+        return self.get_page() if page is None else page
+
+    async def aget_page(self, cursor=None):
+        """Асинхронный вариант get_page"""
+        direction, queryset = self._page_queryset(cursor)
+        page = self._make_page(direction, [obj async for obj in queryset[:self.per_page + 1]])
+        return await self.aget_page() if page is None else page
+
+    def _page_queryset(self, cursor):
+        if not cursor:
+            return None, self.queryset
+        try:
+            created_at, pk, direction = decode_cursor(cursor)
+        except InvalidCursor:
+            return None, self.queryset
+        if direction == 'prev':
+            return direction, self.queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')
+        return direction, self.queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    def _make_page(self, direction, rows):
+        """Страница из per_page + 1 строк; None, если курсор назад указывает в начало ленты"""
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            if not rows:
+                return None
+            rows.reverse()
+            return KeysetPage(rows, self, True, has_more)
+        return KeysetPage(rows, self, has_more, direction == 'next')
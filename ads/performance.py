@@ -0,0 +1,137 @@
+"""
+Метрики производительности запроса.
+
+PerformanceMiddleware (middleware.py) заводит RequestMetrics на каждый
+запрос и кладет их в contextvar. Время SQL собирает обертка execute_wrapper,
+которая ставится на каждое новое соединение с БД; время рендеринга - шаблонный
+бэкенд TimedDjangoTemplates. Contextvar переживает sync_to_async, поэтому
+запросы асинхронных представлений тоже учитываются.
+"""
+import threading
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.template.backends.django import DjangoTemplates
+
+_current = ContextVar('ads_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'sql_count', 'sql_time', 'template_time')
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    @property
+    def total_time(self):
+        return perf_counter() - self.started
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_count += 1
+        metrics.sql_time += perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Обработчик connection_created: подключает учет SQL к новому соединению"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    """Шаблон, время рендеринга которого добавляется к метрикам запроса"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        started = perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            if metrics is not None:
+                metrics.template_time += perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates с учетом времени рендеринга"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class RollingHistogram:
+    """Последние N замеров на каждое имя URL и распределение по корзинам"""
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.size))
+
+    def add(self, name, total_ms, sql_count):
+        with self._lock:
+            self._samples[name].append((total_ms, sql_count))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def snapshot(self):
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+
+        result = {}
+        for name, values in sorted(samples.items()):
+            latencies = sorted(total for total, _ in values)
+            buckets = {f'le_{bound}': 0 for bound in self.BUCKETS_MS}
+            buckets['le_inf'] = 0
+            for latency in latencies:
+                bound = next((bound for bound in self.BUCKETS_MS if latency <= bound), None)
+                buckets[f'le_{bound}' if bound else 'le_inf'] += 1
+            result[name] = {
+                'count': len(latencies),
+                'p50_ms': round(self._percentile(latencies, 50), 2),
+                'p95_ms': round(self._percentile(latencies, 95), 2),
+                'p99_ms': round(self._percentile(latencies, 99), 2),
+                'max_ms': round(latencies[-1], 2),
+                'avg_queries': round(sum(count for _, count in values) / len(values), 2),
+                'buckets': buckets,
+            }
+        return result
+
+
+# Окно: последние 1000 запросов на каждое имя URL
+histogram = RollingHistogram(1000)
@@ -0,0 +1,18 @@
+"""Построение запросов, общих для HTML-представлений и API"""
+from .search import search_ads
+
+
+def filter_ads(queryset, query='', category='', condition='', owner=None):
+    """Поиск и фильтрация объявлений по параметрам AdSearchForm"""
+    if query:
+        queryset = search_ads(queryset, query)
+
+    if category:
+        queryset = queryset.filter(category=category)
+
+    if condition:
+        queryset = queryset.filter(condition=condition)
+
+    if owner is not None:
+        queryset = queryset.filter(user=owner)
+    return queryset
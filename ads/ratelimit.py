@@ -0,0 +1,141 @@
+"""
+Ограничение частоты запросов скользящим окном.
+
+Для каждого окна длиной window хранится счетчик в кэше. Оценка числа
+запросов за последние window секунд - счетчик текущего окна плюс счетчик
+предыдущего с весом, равным доле предыдущего окна, еще попадающей в
+скользящее: всплеск на стыке окон не проходит вдвое, а памяти нужно два
+числа на ключ.
+
+Проверка - один атомарный incr и один get, до сессии, пользователя,
+формы и хэширования пароля: отказ 429 почти бесплатен. Чтобы лимит был
+общим для всех процессов, ADS_RATE_LIMIT_CACHE_ALIAS должен указывать на
+общий кэш с атомарным incr (Redis, Memcached); в LocMemCache у каждого
+процесса свой счетчик.
+
+Лимиты из декораторов можно переопределить в ADS_RATE_LIMITS по имени,
+а ADS_RATE_LIMIT_ENABLED = False отключает проверку совсем.
+"""
+import hashlib
+import ipaddress
+import math
+import re
+import time
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse
+
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+@lru_cache
+def parse_rate(rate):
+    """'10/m' или '100/15m' -> (число запросов, длина окна в секундах)"""
+    match = RATE_RE.match(rate)
+    if match is None:
+        raise ValueError(f'Неверный лимит {rate!r}: ожидается вида 10/m или 100/15m')
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * UNITS[unit]
+
+
+def get_cache():
+    return caches[getattr(settings, 'ADS_RATE_LIMIT_CACHE_ALIAS', 'default')]
+
+
+def client_ip(request):
+    """Адрес клиента; адреса IPv6 объединяются по сети /64, которую обычно получает один абонент"""
+    header = getattr(settings, 'ADS_RATE_LIMIT_IP_HEADER', 'REMOTE_ADDR')
+    value = (request.META.get(header) or request.META.get('REMOTE_ADDR', '')).split(',')[0].strip()
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return value
+    if address.version == 6:
+        return str(ipaddress.ip_network(f'{address}/64', strict=False))
+    return str(address)
+
+
+def ip_key(request):
+    return f'ip:{client_ip(request)}'
+
+
+def user_key(request):
+    # id из сессии, а не request.user: без запроса пользователя к БД
+    session = getattr(request, 'session', None)
+    user_id = session.get(SESSION_KEY) if session is not None else None
+    return f'user:{user_id}' if user_id else ip_key(request)
+
+
+KEY_FUNCTIONS = {'ip': ip_key, 'user': user_key}
+
+
+def hit(scope, identity, limit, window, now=None):
+    """Учитывает запрос; возвращает (разрешен ли, через сколько секунд повторить)"""
+    now = time.time() if now is None else now
+    current, elapsed = divmod(now, window)
+    digest = hashlib.md5(identity.encode(), usedforsecurity=False).hexdigest()
+    key = f'ads:ratelimit:{scope}:{digest}:{int(current)}'
+    previous_key = f'ads:ratelimit:{scope}:{digest}:{int(current) - 1}'
+
+    cache = get_cache()
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Счетчик нужен и следующему окну, поэтому живет два окна
+        cache.add(key, 0, timeout=2 * window)
+        count = cache.incr(key)
+    previous = cache.get(previous_key, 0)
+
+    if previous * (window - elapsed) / window + count <= limit:
+        return True, 0
+    if count > limit:
+        # Текущее окно исчерпано само по себе
+        return False, math.ceil(window - elapsed)
+    # Ждем, пока вес предыдущего окна опустится достаточно
+    return False, math.ceil((window - elapsed) - (limit - count) * window / previous)
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse('Слишком много запросов. Повторите попытку позже.', status=429,
+                            content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(max(retry_after, 1))
+    return response
+
+
+def rate_limit(scope, rate, key='ip', methods=('POST',)):
+    """
+    Ограничивает представление rate запросами (например, '5/m') на ключ:
+    'ip', 'user' (id из сессии, для анонимов - ip) или функцию от запроса.
+
+    Проверяются только запросы с методами из methods, так что GET формы
+    входа не расходует лимит. Декоратор ставится выше login_required, чтобы
+    отказ не загружал пользователя. Подходит и для асинхронных представлений.
+    """
+    key_func = KEY_FUNCTIONS[key] if isinstance(key, str) else key
+
+    def check(request):
+        if not getattr(settings, 'ADS_RATE_LIMIT_ENABLED', True):
+            return None
+        if methods and request.method not in methods:
+            return None
+        limit, window = parse_rate(getattr(settings, 'ADS_RATE_LIMITS', {}).get(scope, rate))
+        allowed, retry_after = hit(scope, key_func(request), limit, window)
+        return None if allowed else too_many_requests(retry_after)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                return check(request) or await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return check(request) or view(request, *args, **kwargs)
+        return wrapper
+    return decorator
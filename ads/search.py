@@ -0,0 +1,125 @@
+"""
+Полнотекстовый поиск по объявлениям.
+
+Индекс хранится в отдельной таблице ``ads_ad_fts``:
+ * SQLite - виртуальная таблица FTS5 (rowid = id объявления);
+ * PostgreSQL - таблица с колонкой tsvector и GIN-индексом.
+
+На остальных СУБД поиск откатывается к ``icontains``.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Ad
+
+FTS_TABLE = 'ads_ad_fts'
+PG_CONFIG = 'russian'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    """Поддерживает ли текущая СУБД полнотекстовый индекс"""
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _tokens(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+def _match_expression(tokens):
+    """Поисковое выражение: все слова запроса, каждое как префикс"""
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f"'{token}':*" for token in tokens)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_ads(queryset, query):
+    """Фильтрует queryset объявлений по запросу и сортирует по релевантности"""
+    tokens = _tokens(query)
+    if not tokens or not is_supported():
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+    match = _match_expression(tokens)
+    ad_table = Ad._meta.db_table
+
+    # Таблица индекса присоединяется к запросу один раз: и фильтр, и релевантность
+    # берутся из одного прохода по индексу, а не из подзапроса на каждую строку
+    if connection.vendor == 'postgresql':
+        join = f'"{FTS_TABLE}"."ad_id" = "{ad_table}"."id"'
+        condition = f"\"{FTS_TABLE}\".\"document\" @@ to_tsquery('{PG_CONFIG}', %s)"
+        rank = f"ts_rank(\"{FTS_TABLE}\".\"document\", to_tsquery('{PG_CONFIG}', %s))"
+        ordering = ['-search_rank', '-created_at', '-id']
+    else:
+        join = f'"{FTS_TABLE}"."rowid" = "{ad_table}"."id"'
+        condition = f'"{FTS_TABLE}" MATCH %s'
+        # bm25: чем меньше значение, тем релевантнее; заголовок весит больше описания
+        rank = f'bm25("{FTS_TABLE}", 10.0, 1.0)'
+        ordering = ['search_rank', '-created_at', '-id']
+
+    select_params = [match] if connection.vendor == 'postgresql' else []
+    return queryset.extra(
+        tables=[FTS_TABLE], where=[join, condition], params=[match],
+        select={'search_rank': rank}, select_params=select_params,
+    ).order_by(*ordering)
+
+
+def index_ad(ad):
+    """Добавляет или обновляет объявление в поисковом индексе"""
+    index_ads([ad])
+
+
+def index_ads(ads):
+    """То же для пачки объявлений, например после bulk_create"""
+    if not is_supported() or not ads:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (ad_id, document) "
+                f"VALUES (%s, setweight(to_tsvector('{PG_CONFIG}', %s), 'A') || "
+                f"setweight(to_tsvector('{PG_CONFIG}', %s), 'B')) "
+                f"ON CONFLICT (ad_id) DO UPDATE SET document = EXCLUDED.document",
+                [[ad.pk, ad.title, ad.description] for ad in ads],
+            )
+        else:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[ad.pk] for ad in ads])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+                [[ad.pk, ad.title, ad.description] for ad in ads],
+            )
+
+
+def remove_ad(ad_id):
+    """Удаляет объявление из поискового индекса"""
+    if not is_supported():
+        return
+    column = 'ad_id' if connection.vendor == 'postgresql' else 'rowid'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE {column} = %s', [ad_id])
+
+
+def rebuild_index():
+    """Полностью перестраивает индекс одним INSERT ... SELECT. Возвращает число записей"""
+    if not is_supported():
+        return 0
+    ad_table = Ad._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (ad_id, document) "
+                f"SELECT id, setweight(to_tsvector('{PG_CONFIG}', title), 'A') || "
+                f"setweight(to_tsvector('{PG_CONFIG}', description), 'B') FROM {ad_table}"
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                f'SELECT id, title, description FROM {ad_table}'
+            )
+            # Сливаем сегменты b-дерева FTS5 в один после массовой вставки
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
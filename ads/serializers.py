@@ -0,0 +1,39 @@
+from rest_framework import serializers
+
+from .models import Ad, ExchangeProposal
+
+
+class AdListSerializer(serializers.ModelSerializer):
+    """Компактное представление объявления для списков"""
+    user = serializers.CharField(source='user.username', read_only=True)
+    image = serializers.ImageField(source='image_url', read_only=True, use_url=True)
+
+    class Meta:
+        model = Ad
+        fields = ('id', 'title', 'category', 'condition', 'image', 'user', 'created_at')
+        read_only_fields = fields
+
+
+class AdDetailSerializer(AdListSerializer):
+    class Meta(AdListSerializer.Meta):
+        fields = AdListSerializer.Meta.fields + ('description', 'updated_at')
+        read_only_fields = fields
+
+
+class ProposalAdSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ad
+        fields = ('id', 'title')
+        read_only_fields = fields
+
+
+class ExchangeProposalSerializer(serializers.ModelSerializer):
+    ad_sender = ProposalAdSerializer(read_only=True)
+    ad_receiver = ProposalAdSerializer(read_only=True)
+    sender = serializers.CharField(source='sender_user.username', read_only=True)
+    receiver = serializers.CharField(source='receiver_user.username', read_only=True)
+
+    class Meta:
+        model = ExchangeProposal
+        fields = ('id', 'ad_sender', 'ad_receiver', 'sender', 'receiver', 'comment', 'status', 'created_at')
+        read_only_fields = fields
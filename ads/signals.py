@@ -0,0 +1,128 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from . import cache, counters, inbox, live, outbox, search, similar, thumbnails, trade_cycles
+from .models import Ad, ExchangeProposal, ProposalCounters, SimilarAd
+
+
+@receiver(post_save, sender=Ad)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Синхронизация поискового индекса при сохранении объявления"""
+    if update_fields is not None and not {'title', 'description'} & set(update_fields):
+        return
+    search.index_ad(instance)
+
+
+@receiver(post_delete, sender=Ad)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Удаление объявления из поискового индекса"""
+    search.remove_ad(instance.pk)
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+def invalidate_page_cache(sender, **kwargs):
+    """Сброс кэша страниц при любом изменении объявлений"""
+    cache.bump_generation()
+
+
+@receiver(post_save, sender=Ad)
+def refresh_similar_ads(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Пересчет похожих объявлений после изменения текста или категории"""
+    if raw or update_fields is not None and not {'title', 'description', 'category'} & set(update_fields):
+        return
+    similar.schedule([instance.pk])
+
+
+@receiver(pre_delete, sender=Ad)
+def remember_similar_referrers(sender, instance, **kwargs):
+    """Объявления, в чьих списках похожих есть удаляемое: их строки удалятся каскадом"""
+    instance._similar_referrers = list(SimilarAd.objects.filter(similar=instance).values_list('ad_id', flat=True))
+
+
+@receiver(post_delete, sender=Ad)
+def remove_from_similar_ads(sender, instance, **kwargs):
+    """Пересчет списков, из которых выпало удаленное объявление"""
+    similar.schedule([instance.pk], getattr(instance, '_similar_referrers', ()))
+
+
+@receiver(post_save, sender=Ad)
+def schedule_thumbnails(sender, instance, **kwargs):
+    """Генерация миниатюр для нового изображения"""
+    if thumbnails.needs_thumbnails(instance):
+        thumbnails.schedule(instance)
+
+
+@receiver(post_delete, sender=Ad)
+def delete_thumbnails(sender, instance, **kwargs):
+    """Удаление миниатюр вместе с объявлением"""
+    if instance.thumbnails_source:
+        thumbnails.schedule_delete(instance.thumbnails_source)
+
+
+@receiver(post_save, sender=ExchangeProposal)
+def update_trade_graph(sender, instance, **kwargs):
+    """Учет нового или измененного предложения в графе цепочек обмена"""
+    trade_cycles.sync_proposal(instance)
+
+
+@receiver(post_delete, sender=ExchangeProposal)
+def remove_from_trade_graph(sender, instance, **kwargs):
+    """Удаление предложения из графа цепочек обмена"""
+    trade_cycles.sync_proposal(instance, deleted=True)
+
+
+@receiver(post_save, sender=ExchangeProposal)
+def update_proposal_counters(sender, instance, created, **kwargs):
+    """Счетчики ожидающих предложений при создании и смене статуса"""
+    was_pending = not created and getattr(instance, '_loaded_status', None) == 'pending'
+    is_pending = instance.status == 'pending'
+    if was_pending != is_pending:
+        counters.apply([counters.proposal_row(instance)], 1 if is_pending else -1)
+
+
+@receiver(post_delete, sender=ExchangeProposal)
+def decrement_proposal_counters(sender, instance, **kwargs):
+    """Счетчики при удалении предложения, в том числе каскадном вместе с объявлением"""
+    if instance.status == 'pending':
+        counters.apply([counters.proposal_row(instance)], -1)
+
+
+@receiver(post_save, sender=User)
+def create_proposal_counters(sender, instance, created, raw=False, **kwargs):
+    """Строка счетчиков для нового пользователя"""
+    if created and not raw:
+        ProposalCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=ExchangeProposal)
+def update_proposal_inbox(sender, instance, created, raw=False, **kwargs):
+    """Записи ленты предложений отправителя и получателя"""
+    if raw:
+        return
+    if created:
+        inbox.add_proposals([instance])
+    elif getattr(instance, '_loaded_status', None) != instance.status:
+        inbox.set_status([instance.pk], instance.status)
+
+
+@receiver(post_save, sender=ExchangeProposal)
+def record_proposal_notification(sender, instance, created, raw=False, **kwargs):
+    """Уведомление другой стороне: получателю о новом предложении, отправителю об ответе"""
+    if raw:
+        return
+    if created:
+        outbox.enqueue([(instance.receiver_user_id, 'created', instance.pk)])
+    elif getattr(instance, '_loaded_status', None) != instance.status and instance.status != 'pending':
+        outbox.enqueue([(instance.sender_user_id, instance.status, instance.pk)])
+
+
+@receiver(post_save, sender=ExchangeProposal)
+def publish_live_update(sender, instance, created, raw=False, **kwargs):
+    """Живое обновление открытых лент обоих участников"""
+    if raw:
+        return
+    if created or getattr(instance, '_loaded_status', None) != instance.status:
+        live.publish_proposals({instance.pk: counters.proposal_row(instance)}, instance.status,
+                               kind='created' if created else 'status')
@@ -0,0 +1,266 @@
+"""
+Похожие объявления на странице ad_detail.
+
+Для каждого объявления заранее хранится SIMILAR_LIMIT ближайших в таблице
+SimilarAd, так что страница получает их одним запросом по индексу (ad, rank).
+
+Ближайшие ищутся в полнотекстовом индексе (search.py): запрос - слова
+объявления, объединенные через ИЛИ, каждое как префикс, релевантность -
+bm25 в SQLite (заголовок весит TITLE_WEIGHT) или ts_rank в PostgreSQL.
+Сходство - релевантность кандидата, деленная на релевантность самого
+объявления, и умноженная на CATEGORY_BOOST для той же категории. Слова,
+встречающиеся больше чем в MAX_POSTINGS объявлениях, почти не влияют на
+сходство и в запрос не попадают. Все данные берутся из БД, поэтому списки,
+посчитанные разными процессами, согласованы между собой.
+
+Слова нормализуются без внешних словарей: нижний регистр, ё -> е, без
+стоп-слов, у кириллических слов отсекаются падежные и родовые окончания
+(«телефона», «телефоны» -> «телефон»).
+
+После коммита изменения или удаления объявления (см. signals.py) фоновый
+поток пересчитывает его список, списки, в которых оно было, и списки его
+кандидатов, куда оно теперь может попасть. Полностью таблицу перестраивает
+команда rebuild_similar_ads - ее же нужно запускать после bulk-операций,
+минующих сигналы (seed_data, import_ads). На СУБД без полнотекстового
+индекса списки остаются пустыми.
+"""
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connection, transaction
+
+from .models import Ad, SimilarAd
+from .search import FTS_TABLE, PG_CONFIG, is_supported
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_LIMIT = 4
+# Сколько кандидатов из полнотекстового индекса оценивается для одного объявления
+CANDIDATE_LIMIT = 50
+MIN_SCORE = 0.05
+TITLE_WEIGHT = 2
+CATEGORY_BOOST = 1.5
+MAX_POSTINGS = 5_000
+MAX_QUERY_TERMS = 12
+# Ограничение числа параметров в IN (...) для SQLite
+CHUNK_SIZE = 500
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+CYRILLIC_RE = re.compile(r'^[а-я]+$')
+ENDING_RE = re.compile(
+    r'(иями|ями|ами|иях|ого|его|ому|ему|ыми|ими|ых|их|ая|яя|ое|ее|ые|ие|ой|ей|ий|ый|ую|юю|ом|ем|ам|ям|ах|ях'
+    r'|ов|ев|ия|ью|[аяоеыиуюьй])$'
+)
+MIN_STEM = 3
+STOP_WORDS = frozenset('''
+    и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было
+    вот от меня еще нет о из ему для или при без до это этот эта эти очень уже там тут где есть под над
+    обмен обменяю меняю поменяю отдам продам продаю
+'''.split())
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def stem(word):
+    """Отсекает окончание кириллического слова, оставляя основу не короче MIN_STEM"""
+    if not CYRILLIC_RE.match(word):
+        return word
+    match = ENDING_RE.search(word)
+    if match and match.start() >= MIN_STEM:
+        return word[:match.start()]
+    return word
+
+
+def tokenize(text):
+    """Нормализованные слова текста"""
+    words = TOKEN_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words if len(word) > 1 and word not in STOP_WORDS]
+
+
+def term_frequencies(title, description):
+    """Сублинейные частоты слов объявления: 1 + log(число вхождений)"""
+    counts = defaultdict(int)
+    for term in tokenize(title):
+        counts[term] += TITLE_WEIGHT
+    for term in tokenize(description):
+        counts[term] += 1
+    return {term: 1 + math.log(count) for term, count in counts.items()}
+
+
+def _match_expression(terms):
+    """Поисковое выражение: любое из слов, каждое как префикс"""
+    if connection.vendor == 'postgresql':
+        return ' | '.join(f"'{term}':*" for term in terms)
+    return ' OR '.join(f'"{term}"*' for term in terms)
+
+
+def _is_rare(term, rare):
+    """Встречается ли слово не больше чем в MAX_POSTINGS объявлениях. rare - кэш ответов на время пересчета"""
+    if term not in rare:
+        if connection.vendor == 'postgresql':
+            sql = (f"SELECT COUNT(*) FROM (SELECT 1 FROM {FTS_TABLE} "
+                   f"WHERE document @@ to_tsquery('{PG_CONFIG}', %s) LIMIT %s) matched")
+        else:
+            sql = f'SELECT COUNT(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [_match_expression([term]), MAX_POSTINGS + 1])
+            rare[term] = cursor.fetchone()[0] <= MAX_POSTINGS
+    return rare[term]
+
+
+def _query_terms(title, description, rare):
+    """Самые весомые из редких слов объявления"""
+    frequencies = term_frequencies(title, description)
+    terms = []
+    for term in sorted(frequencies, key=lambda term: (-frequencies[term], term)):
+        if len(terms) == MAX_QUERY_TERMS:
+            break
+        if _is_rare(term, rare):
+            terms.append(term)
+    return terms
+
+
+def candidates(ad_id, title, description, category, rare=None):
+    """Объявления с общими словами: [(сходство, id)] по убыванию сходства, не больше CANDIDATE_LIMIT"""
+    if not is_supported():
+        return []
+    terms = _query_terms(title, description, {} if rare is None else rare)
+    if not terms:
+        return []
+
+    ad_table = Ad._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = (f"SELECT f.ad_id, ts_rank(f.document, query), a.category "
+               f"FROM {FTS_TABLE} f JOIN {ad_table} a ON a.id = f.ad_id, to_tsquery('{PG_CONFIG}', %s) query "
+               f"WHERE f.document @@ query ORDER BY f.ad_id = %s DESC, 2 DESC LIMIT %s")
+    else:
+        sql = (f'SELECT {FTS_TABLE}.rowid, -bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1), {ad_table}.category '
+               f'FROM {FTS_TABLE} JOIN {ad_table} ON {ad_table}.id = {FTS_TABLE}.rowid '
+               f'WHERE {FTS_TABLE} MATCH %s ORDER BY {FTS_TABLE}.rowid = %s DESC, 2 DESC LIMIT %s')
+    with connection.cursor() as cursor:
+        # Само объявление идет первым: его релевантность - масштаб сходства
+        cursor.execute(sql, [_match_expression(terms), ad_id, CANDIDATE_LIMIT + 1])
+        rows = cursor.fetchall()
+    if not rows or rows[0][0] != ad_id or rows[0][1] <= 0:
+        # Объявления еще нет в полнотекстовом индексе
+        return []
+    scale = rows[0][1]
+    return sorted(
+        ((relevance / scale * (CATEGORY_BOOST if other_category == category else 1), other)
+         for other, relevance, other_category in rows[1:]),
+        reverse=True,
+    )
+
+
+def nearest(found):
+    """Список похожих из кандидатов: не больше SIMILAR_LIMIT, не ниже MIN_SCORE"""
+    return [(score, other) for score, other in found if score >= MIN_SCORE][:SIMILAR_LIMIT]
+
+
+def similar_ads(ad_id):
+    """Похожие объявления для страницы: один запрос по индексу (ad, rank)"""
+    return (SimilarAd.objects.filter(ad_id=ad_id).order_by('rank').select_related('similar')
+            .only('similar__id', 'similar__title', 'similar__category', 'similar__condition'))
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _ad_rows(ad_ids):
+    for chunk in _chunks(ad_ids):
+        yield from Ad.objects.filter(pk__in=chunk).values_list('id', 'title', 'description', 'category')
+
+
+def store(lists):
+    """Заменяет списки похожих: {id объявления: [(сходство, id)]}"""
+    ad_ids = set(lists) | {other for neighbours in lists.values() for score, other in neighbours}
+    with transaction.atomic():
+        # Блокировка упорядочивает пересчеты одних и тех же списков в разных процессах
+        # и не дает удалить объявления, на которые ссылаются новые строки
+        existing = set()
+        for chunk in _chunks(sorted(ad_ids)):
+            existing.update(Ad.objects.select_for_update().filter(pk__in=chunk).order_by('pk')
+                            .values_list('pk', flat=True))
+        for chunk in _chunks(lists):
+            SimilarAd.objects.filter(ad_id__in=chunk).delete()
+        SimilarAd.objects.bulk_create(
+            [SimilarAd(ad_id=ad_id, similar_id=other, rank=rank, score=score)
+             for ad_id, neighbours in lists.items() if ad_id in existing
+             for rank, (score, other) in enumerate(pair for pair in neighbours if pair[1] in existing)],
+            batch_size=CHUNK_SIZE,
+        )
+
+
+def refresh_ads(ad_ids, referrers=()):
+    """
+    Пересчитывает списки после изменения объявлений ad_ids. referrers - объявления,
+    в чьих списках были удаленные объявления: их строки уже удалены каскадом
+    """
+    from . import cache
+
+    ad_ids, rare, lists = set(ad_ids), {}, {}
+    # Объявлениям, в чьих списках были изменившиеся, место в списке могло освободиться
+    stale = set(referrers)
+    for chunk in _chunks(ad_ids):
+        stale.update(SimilarAd.objects.filter(similar_id__in=chunk).values_list('ad_id', flat=True))
+    # А в списки своих кандидатов изменившееся объявление теперь может попасть
+    for ad_id, *fields in _ad_rows(ad_ids):
+        found = candidates(ad_id, *fields, rare)
+        lists[ad_id] = nearest(found)
+        stale.update(other for score, other in found if score >= MIN_SCORE)
+    for ad_id, *fields in _ad_rows(stale - set(lists)):
+        lists[ad_id] = nearest(candidates(ad_id, *fields, rare))
+
+    if lists:
+        store(lists)
+        # Закэшированные страницы ad_detail показывают прежние списки
+        cache.bump_generation()
+    return len(lists)
+
+
+def rebuild(batch_size=CHUNK_SIZE):
+    """Полностью перестраивает таблицу похожих объявлений. Возвращает число объявлений"""
+    from . import cache
+
+    rare, last_id, total = {}, 0, 0
+    while True:
+        rows = list(Ad.objects.filter(pk__gt=last_id).order_by('pk')
+                    .values_list('id', 'title', 'description', 'category')[:batch_size])
+        if not rows:
+            break
+        store({ad_id: nearest(candidates(ad_id, *fields, rare)) for ad_id, *fields in rows})
+        last_id, total = rows[-1][0], total + len(rows)
+    cache.bump_generation()
+    return total
+
+
+def _refresh_in_background(ad_ids, referrers):
+    try:
+        refresh_ads(ad_ids, referrers)
+    except Exception:
+        logger.exception('Не удалось обновить похожие объявления для %s', ad_ids)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Один поток: пересчеты не гонятся друг с другом за одни и те же строки
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='similar-ads')
+        return _executor
+
+
+def schedule(ad_ids, referrers=()):
+    """Ставит пересчет в очередь после коммита текущей транзакции"""
+    ad_ids, referrers = list(ad_ids), list(referrers)
+    transaction.on_commit(lambda: get_executor().submit(_refresh_in_background, ad_ids, referrers))
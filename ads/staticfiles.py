@@ -0,0 +1,124 @@
+"""
+Статические файлы: имена с хэшем содержимого и предсжатые варианты.
+
+collectstatic через CompressedManifestStaticFilesStorage кладет рядом с
+каждым текстовым файлом .gz и, если установлен пакет brotli, .br. Сжатие
+выполняется один раз при сборке, а не на каждый запрос.
+
+За nginx STATIC_ROOT раздается так:
+
+    location /static/ {
+        gzip_static on;
+        brotli_static on;   # модуль ngx_brotli
+        expires max;
+        add_header Cache-Control "public, immutable";
+    }
+
+Без прокси (ADS_SERVE_STATIC = True) то же делает представление serve:
+выбирает вариант по Accept-Encoding и выдает файлы с хэшем в имени с
+годовым Cache-Control immutable.
+"""
+import gzip
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.xml', '.html')
+# Маленькие файлы сжимать бессмысленно: выигрыш меньше накладных расходов
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_MAX_AGE = 60 * 60
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Варианты в порядке предпочтения: (кодировка, расширение)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _brotli_compress(content):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(content, quality=11)
+
+
+def compress_file(path):
+    """Пишет path.gz и path.br, если они заметно меньше оригинала"""
+    content = path.read_bytes()
+    if len(content) < MIN_COMPRESS_SIZE:
+        return
+    variants = {
+        '.gz': gzip.compress(content, compresslevel=9, mtime=0),
+        '.br': _brotli_compress(content),
+    }
+    for extension, compressed in variants.items():
+        if compressed is not None and len(compressed) < len(content) * 0.95:
+            path.with_name(path.name + extension).write_bytes(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хэшами в именах плюс предсжатые .gz и .br"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in hashed_names:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                compress_file(Path(self.path(name)))
+
+
+def _accepted_encodings(request):
+    header = request.headers.get('Accept-Encoding', '')
+    return {part.split(';')[0].strip() for part in header.split(',')}
+
+
+def serve(request, path):
+    """Файл из STATIC_ROOT с выбором предсжатого варианта и долгим кэшированием"""
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404
+    if not fullpath.is_file():
+        raise Http404
+
+    stat = fullpath.stat()
+    immutable = bool(HASHED_NAME_RE.search(fullpath.name))
+    if not immutable and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type, _ = mimetypes.guess_type(fullpath.name)
+    served, encoding = fullpath, None
+    accepted = _accepted_encodings(request)
+    for candidate, extension in ENCODINGS:
+        variant = fullpath.with_name(fullpath.name + extension)
+        if candidate in accepted and variant.is_file():
+            served, encoding = variant, candidate
+            break
+
+    response = FileResponse(served.open('rb'), filename=fullpath.name,
+                            content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+    if fullpath.name.endswith(COMPRESSIBLE_EXTENSIONS):
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
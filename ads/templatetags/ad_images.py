@@ -0,0 +1,37 @@
+from django import template
+from django.utils.html import format_html
+
+from ads.thumbnails import variant_urls
+
+register = template.Library()
+
+
+def _srcset(name, ext):
+    return ', '.join(f'{url} {width}w' for url, width in variant_urls(name, ext))
+
+
+@register.simple_tag
+def ad_picture(ad, sizes, css_class='', style=''):
+    """
+    Изображение объявления с srcset по готовым миниатюрам.
+
+    Пока миниатюры не построены, выводится оригинал.
+    """
+    if not ad.image_url:
+        return ''
+
+    name = ad.image_url.name
+    if ad.thumbnails_source != name:
+        return format_html(
+            '<img src="{}" class="{}" alt="{}" style="{}" loading="lazy">',
+            ad.image_url.url, css_class, ad.title, style,
+        )
+
+    fallback_url = variant_urls(name, 'jpg')[0][0]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" style="{}" loading="lazy">'
+        '</picture>',
+        _srcset(name, 'webp'), sizes, fallback_url, _srcset(name, 'jpg'), sizes, css_class, ad.title, style,
+    )
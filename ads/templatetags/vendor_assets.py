@@ -0,0 +1,48 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.signals import setting_changed
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from ads.vendor import ASSETS
+
+register = template.Library()
+
+
+@lru_cache
+def _is_vendored(path):
+    return bool(finders.find(path)) or staticfiles_storage.exists(path)
+
+
+def _reset(**kwargs):
+    if kwargs['setting'] in ('STATICFILES_DIRS', 'STATIC_ROOT', 'STORAGES'):
+        _is_vendored.cache_clear()
+
+
+setting_changed.connect(_reset)
+
+
+@register.simple_tag
+def vendor_asset(name):
+    """
+    <link> или <script> стороннего ресурса из ads.vendor.ASSETS.
+
+    Пока файлы не скачаны командой vendor_static, подключается CDN с integrity.
+    """
+    asset = ASSETS[name]
+    if _is_vendored(asset.local_path):
+        url, integrity = static(asset.local_path), ''
+    else:
+        url, integrity = asset.source.url, asset.source.integrity
+
+    if asset.is_script:
+        if integrity:
+            return format_html('<script src="{}" integrity="{}" crossorigin="anonymous"></script>', url, integrity)
+        return format_html('<script src="{}"></script>', url)
+    if integrity:
+        return format_html('<link rel="stylesheet" href="{}" integrity="{}" crossorigin="anonymous">',
+                           url, integrity)
+    return format_html('<link rel="stylesheet" href="{}">', url)
@@ -0,0 +1,91 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.contrib.auth.models import User
+from ads import similar, thumbnails, trade_cycles
+from ads.models import Ad, ExchangeProposal
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_trade_graph():
+    # Граф живет в памяти процесса и не откатывается вместе с транзакцией теста
+    trade_cycles.graph.reset()
+    yield
+    trade_cycles.graph.reset()
+
+
+class InlineExecutor:
+    def submit(self, func, *args):
+        func(*args)
+
+
+@pytest.fixture(autouse=True)
+def inline_background_jobs(monkeypatch):
+    # Фоновый поток не видит транзакцию теста, поэтому пересчеты выполняются сразу
+    # в потоке теста. Закрытие соединения по их завершении оборвало бы транзакцию
+    # теста в файловой тестовой БД (тестовый Client так же отключает close_old_connections)
+    for module in (similar, thumbnails, trade_cycles):
+        monkeypatch.setattr(module, 'get_executor', InlineExecutor)
+        monkeypatch.setattr(module, 'close_old_connections', lambda: None)
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username='testuser',
+        email='test@example.com',
+        password='testpassword'
+    )
+
+
+@pytest.fixture
+def another_user():
+    return User.objects.create_user(
+        username='anotheruser',
+        email='another@example.com',
+        password='anotherpassword'
+    )
+
+
+@pytest.fixture
+def ad(user):
+    return Ad.objects.create(
+        title='Тестовое объявление',
+        description='Описание тестового объявления',
+        category='electronics',
+        condition='new',
+        user=user
+    )
+
+
+@pytest.fixture
+def another_ad(another_user):
+    return Ad.objects.create(
+        title='Другое объявление',
+        description='Описание другого объявления',
+        category='books',
+        condition='good',
+        user=another_user
+    )
+
+
+@pytest.fixture
+def proposal(ad, another_ad):
+    return ExchangeProposal.objects.create(
+        ad_sender=ad,
+        ad_receiver=another_ad,
+        comment='Предлагаю обмен',
+        status='pending'
+    )
@@ -0,0 +1,96 @@
+import base64
+
+import pytest
+from django.urls import reverse
+
+from ads.models import Ad
+
+
+@pytest.mark.django_db
+class TestAdApi:
+    """Тесты API объявлений"""
+
+    def test_list_uses_search_filters(self, client, ad, another_ad):
+        """Фильтры API совпадают с ad_list"""
+        response = client.get(reverse('api_ad_list'), {'category': 'books'})
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()['results']] == [another_ad.pk]
+
+        response = client.get(reverse('api_ad_list'), {'query': 'тестовое'})
+        assert [item['id'] for item in response.json()['results']] == [ad.pk]
+
+    def test_list_rejects_unknown_category(self, client):
+        response = client.get(reverse('api_ad_list'), {'category': 'cars'})
+        assert response.status_code == 400
+        assert 'category' in response.json()
+
+    def test_list_cursor_pagination(self, client, user):
+        Ad.objects.bulk_create([
+            Ad(title=f'Лот {i}', description='Описание', category='other', condition='good', user=user)
+            for i in range(25)
+        ])
+        first = client.get(reverse('api_ad_list')).json()
+        assert len(first['results']) == 20 and first['previous'] is None
+        second = client.get(first['next']).json()
+        assert len(second['results']) == 5 and second['next'] is None
+        assert not {item['id'] for item in first['results']} & {item['id'] for item in second['results']}
+
+    def test_list_etag_returns_304(self, client, ad):
+        """Неизмененная страница списка возвращается как 304 без тела"""
+        response = client.get(reverse('api_ad_list'))
+        etag = response['ETag']
+        response = client.get(reverse('api_ad_list'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == b''
+
+        ad.title = 'Изменено'
+        ad.save()
+        assert client.get(reverse('api_ad_list'), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_detail_conditional_get(self, client, ad):
+        """Детальная страница поддерживает ETag и Last-Modified"""
+        url = reverse('api_ad_detail', kwargs={'pk': ad.pk})
+        response = client.get(url)
+        assert response.json()['description'] == ad.description
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+        assert client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code == 304
+
+    def test_detail_checks_freshness_with_one_query(self, client, ad, django_assert_num_queries):
+        url = reverse('api_ad_detail', kwargs={'pk': ad.pk})
+        # updated_at для ETag и Last-Modified плюс само объявление
+        with django_assert_num_queries(2):
+            etag = client.get(url)['ETag']
+        with django_assert_num_queries(1):
+            assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    def test_detail_not_found(self, client):
+        assert client.get(reverse('api_ad_detail', kwargs={'pk': 999})).status_code == 404
+
+
+@pytest.mark.django_db
+class TestProposalApi:
+    """Тесты API предложений обмена"""
+
+    def test_requires_authentication(self, client):
+        assert client.get(reverse('api_proposal_list')).status_code == 403
+
+    def test_basic_auth_is_not_accepted(self, client, user, django_assert_num_queries):
+        credentials = base64.b64encode(b'testuser:testpassword').decode()
+        # Пароль не проверяется: ни запроса пользователя, ни хэширования
+        with django_assert_num_queries(0):
+            response = client.get(reverse('api_proposal_list'), HTTP_AUTHORIZATION=f'Basic {credentials}')
+        assert response.status_code == 403
+
+    def test_direction_filter(self, client, user, another_user, proposal):
+        client.force_login(another_user)
+        received = client.get(reverse('api_proposal_list'), {'direction': 'received'}).json()['results']
+        assert [item['id'] for item in received] == [proposal.pk]
+        assert received[0]['sender'] == user.username
+        assert client.get(reverse('api_proposal_list'), {'direction': 'sent'}).json()['results'] == []
+
+    def test_status_filter_and_validation(self, client, another_user, proposal):
+        client.force_login(another_user)
+        assert client.get(reverse('api_proposal_list'), {'status': 'accepted'}).json()['results'] == []
+        pending = client.get(reverse('api_proposal_list'), {'status': 'pending'}).json()['results']
+        assert [(item['id'], item['ad_receiver']['title']) for item in pending] == [(proposal.pk, 'Другое объявление')]
+        assert client.get(reverse('api_proposal_list'), {'direction': 'sideways'}).status_code == 400
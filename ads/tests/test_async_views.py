@@ -0,0 +1,59 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from ads import async_views, views
+
+
+@pytest.fixture
+def async_client():
+    return AsyncClient()
+
+
+def get(client, *args, **kwargs):
+    return async_to_sync(client.get)(*args, **kwargs)
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    """ASGI-запросы обслуживаются асинхронными представлениями"""
+
+    def test_ad_list(self, async_client, ad, another_ad):
+        response = get(async_client, reverse('ad_list'), {'category': 'books'})
+        assert response.status_code == 200
+        assert response.resolver_match.func.__wrapped__ is async_views.ad_list.__wrapped__
+        assert list(response.context['ads']) == [another_ad]
+
+    def test_ad_list_search(self, async_client, ad, another_ad):
+        response = get(async_client, reverse('ad_list'), {'query': 'тестовое'})
+        assert list(response.context['ads']) == [ad]
+
+    def test_ad_detail(self, async_client, user, ad, another_ad):
+        async_client.force_login(user)
+        response = get(async_client, reverse('ad_detail', kwargs={'pk': another_ad.pk}))
+        assert response.status_code == 200
+        assert response.context['has_user_ads'] is True
+        assert get(async_client, reverse('ad_detail', kwargs={'pk': 999})).status_code == 404
+
+    def test_my_proposals(self, async_client, user, proposal):
+        async_client.force_login(user)
+        response = get(async_client, reverse('my_proposals'))
+        assert response.status_code == 200
+        assert [entry.proposal for entry in response.context['page_obj']] == [proposal]
+
+    def test_header_badge(self, async_client, another_user, proposal):
+        # Сессия стандартного ModelBackend: счетчики не приходят вместе с пользователем,
+        # и синхронный запрос из шаблона под ASGI закончился бы SynchronousOnlyOperation
+        async_client.force_login(another_user, backend='django.contrib.auth.backends.ModelBackend')
+        response = get(async_client, reverse('ad_list'))
+        assert response.status_code == 200
+        assert response.context['pending_proposals_badge'] == 1
+
+    def test_my_proposals_requires_login(self, async_client):
+        response = get(async_client, reverse('my_proposals'))
+        assert response.status_code == 302
+
+    def test_wsgi_keeps_sync_views(self, client):
+        response = client.get(reverse('ad_list'))
+        assert response.resolver_match.func.__wrapped__ is views.ad_list.__wrapped__
@@ -0,0 +1,55 @@
+import json
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from ads.models import Ad, ExchangeProposal, SimilarAd
+
+
+@pytest.fixture
+def seeded(db):
+    call_command('seed_data', users=20, ads=300, proposals=200, chunk_size=64, stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestSeedAndBenchmark:
+    """Тесты генератора данных и замеров представлений"""
+
+    def test_seed_data_creates_consistent_rows(self, seeded):
+        """Созданы объявления и предложения между объявлениями разных владельцев"""
+        assert Ad.objects.count() == 300
+        assert ExchangeProposal.objects.count() == 200
+        proposal = ExchangeProposal.objects.select_related('ad_sender', 'ad_receiver').first()
+        assert proposal.sender_user_id == proposal.ad_sender.user_id
+        assert proposal.receiver_user_id == proposal.ad_receiver.user_id
+        assert proposal.sender_user_id != proposal.receiver_user_id
+        # bulk_create минует сигналы, списки похожих строит отдельный шаг
+        assert SimilarAd.objects.exists()
+
+    def test_seed_data_is_reproducible(self, seeded):
+        """Тот же seed дает то же распределение категорий"""
+        first = Counter(Ad.objects.values_list('category', flat=True))
+        Ad.objects.all().delete()
+        call_command('seed_data', users=20, ads=300, proposals=0, chunk_size=64, stdout=StringIO())
+        assert Counter(Ad.objects.values_list('category', flat=True)) == first
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_benchmark_saves_and_compares_baseline(self, seeded, tmp_path):
+        """Результаты сохраняются как baseline и сравниваются с ним при следующем запуске"""
+        baseline = tmp_path / 'baseline.json'
+        call_command('benchmark_views', iterations=2, warmup=0, baseline=str(baseline), save_baseline=True,
+                     stdout=StringIO())
+        report = json.loads(baseline.read_text())
+        assert report['dataset']['ads'] == 300
+        assert {'ad_list', 'ad_detail', 'my_proposals'} <= set(report['scenarios'])
+
+        # Число запросов больше, чем в baseline, - это регрессия
+        for result in report['scenarios'].values():
+            result['queries'] = 0
+        baseline.write_text(json.dumps(report))
+        with pytest.raises(CommandError, match='Регрессии'):
+            call_command('benchmark_views', iterations=1, warmup=0, baseline=str(baseline),
+                         stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,138 @@
+import csv
+import json
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from PIL import Image
+
+from ads import bulk, search
+from ads.models import Ad
+
+ROWS = [
+    {'title': 'Велосипед  горный', 'description': 'Почти новый', 'category': 'sport', 'condition': 'like_new',
+     'image': 'bike.jpg'},
+    {'title': 'Чайник', 'description': 'Электрический', 'category': 'home', 'condition': 'good', 'image': ''},
+    {'title': 'Без описания', 'description': '', 'category': 'home', 'condition': 'good', 'image': ''},
+    {'title': 'Планшет', 'description': 'С чехлом', 'category': 'gadgets', 'condition': 'good', 'image': ''},
+    {'title': 'Книга', 'description': 'Роман', 'category': 'books', 'condition': 'fair', 'image': 'missing.jpg'},
+    {'title': 'Лампа', 'description': 'Настольная', 'category': 'home', 'condition': 'new', 'image': ''},
+]
+
+
+@pytest.fixture
+def images(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path / 'media'
+    directory = tmp_path / 'images'
+    directory.mkdir()
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), 'green').save(buffer, 'JPEG')
+    (directory / 'bike.jpg').write_bytes(buffer.getvalue())
+    return directory
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=bulk.IMPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def run(*args):
+    out, err = StringIO(), StringIO()
+    call_command(*args, stdout=out, stderr=err)
+    return out.getvalue(), err.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportAds:
+    """Тесты массовой загрузки объявлений"""
+
+    def test_valid_rows_are_inserted_invalid_reported(self, user, images, tmp_path):
+        path = write_csv(tmp_path / 'ads.csv', ROWS)
+        out, err = run('import_ads', str(path), '--user', user.username, '--images', str(images),
+                       '--chunk-size', '2')
+
+        ads = {ad.title: ad for ad in Ad.objects.filter(user=user)}
+        assert set(ads) == {'Велосипед  горный', 'Чайник', 'Лампа'}
+        assert ads['Велосипед  горный'].title_search == 'велосипед горный'
+        assert ads['Велосипед  горный'].image_url.name.startswith('ads/bike')
+        assert (images.parent / 'media' / ads['Велосипед  горный'].image_url.name).is_file()
+        assert 'Загружено: 3 строк' in out and 'ошибок: 3' in out
+        assert 'rebuild_similar_ads' in out
+        assert 'строка 4: description' in err
+        assert 'строка 5: category' in err
+        assert 'строка 6: image: нет файла missing.jpg' in err
+
+    def test_imported_ads_are_searchable(self, user, images, tmp_path):
+        run('import_ads', str(write_csv(tmp_path / 'ads.csv', ROWS)), '--user', user.username,
+            '--images', str(images))
+        assert list(search.search_ads(Ad.objects.all(), 'чайник').values_list('title', flat=True)) == ['Чайник']
+
+    def test_jsonl_and_dry_run(self, user, tmp_path):
+        path = tmp_path / 'ads.jsonl'
+        path.write_text('\n'.join([json.dumps(ROWS[1], ensure_ascii=False), '{не json', '']), encoding='utf-8')
+        out, err = run('import_ads', str(path), '--user', user.username, '--dry-run')
+        assert 'Проверено: 1 строк' in out
+        assert 'строка 2: строка не является объектом JSON' in err
+        assert not Ad.objects.exists()
+
+    def test_image_outside_directory_is_rejected(self, user, images, tmp_path):
+        path = write_csv(tmp_path / 'ads.csv', [{**ROWS[1], 'image': '../ads.csv'}])
+        _, err = run('import_ads', str(path), '--user', user.username, '--images', str(images))
+        assert 'вне каталога изображений' in err
+
+    def test_max_errors_aborts_after_saving_checked_rows(self, user, tmp_path):
+        path = write_csv(tmp_path / 'ads.csv', [ROWS[1], ROWS[2], ROWS[3], ROWS[5]])
+        with pytest.raises(CommandError, match='загружено: 1'):
+            run('import_ads', str(path), '--user', user.username, '--max-errors', '2')
+        assert list(Ad.objects.values_list('title', flat=True)) == ['Чайник']
+
+    def test_images_are_removed_when_chunk_fails(self, user, images, tmp_path, monkeypatch):
+        def fail(ads):
+            raise DatabaseError('disk I/O error')
+
+        monkeypatch.setattr(search, 'index_ads', fail)
+        path = write_csv(tmp_path / 'ads.csv', [ROWS[0], ROWS[1]])
+        with pytest.raises(DatabaseError):
+            run('import_ads', str(path), '--user', user.username, '--images', str(images))
+        assert not Ad.objects.exists()
+        assert not list((images.parent / 'media' / 'ads').iterdir())
+
+    def test_unknown_user_and_format(self, user, tmp_path):
+        with pytest.raises(CommandError, match='Нет пользователя'):
+            run('import_ads', str(tmp_path / 'ads.csv'), '--user', 'nobody')
+        with pytest.raises(CommandError, match='Неизвестный формат'):
+            run('import_ads', str(tmp_path / 'ads.xml'), '--user', user.username)
+
+
+@pytest.mark.django_db
+class TestExportAds:
+    """Тесты выгрузки объявлений и предложений"""
+
+    def test_csv_round_trip(self, user, another_user, ad, another_ad, tmp_path):
+        path = tmp_path / 'ads.csv'
+        out, _ = run('export_ads', str(path), '--user', user.username)
+        assert 'Выгружено: 1 строк' in out
+        with open(path, encoding='utf-8', newline='') as file:
+            (row,) = csv.DictReader(file)
+        assert row['id'] == str(ad.pk) and row['user'] == user.username and row['image'] == ''
+
+        Ad.objects.all().delete()
+        run('import_ads', str(path), '--user', another_user.username)
+        assert list(Ad.objects.values_list('title', 'user')) == [(ad.title, another_user.pk)]
+
+    def test_jsonl_proposals(self, proposal, tmp_path):
+        path = tmp_path / 'proposals.jsonl'
+        run('export_ads', str(path), '--model', 'proposals')
+        (row,) = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        assert row['id'] == proposal.pk
+        assert row['status'] == proposal.status
+        assert row['sender_user'] == proposal.sender_user.username
+        assert row['created_at'] == proposal.created_at.isoformat()
+
+    def test_streams_one_query(self, user, ad, another_ad, tmp_path, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            run('export_ads', str(tmp_path / 'ads.jsonl'), '--chunk-size', '1')
@@ -0,0 +1,85 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ads import exchange
+from ads.models import Ad, ExchangeProposal, ProposalCounters
+
+
+def counts(ad, sender, receiver):
+    ad.refresh_from_db(fields=['pending_proposals_count'])
+    return (
+        ad.pending_proposals_count,
+        ProposalCounters.objects.get(user=sender).pending_sent_count,
+        ProposalCounters.objects.get(user=receiver).pending_received_count,
+    )
+
+
+@pytest.mark.django_db
+class TestProposalCounters:
+    """Тесты денормализованных счетчиков ожидающих предложений"""
+
+    def test_new_user_gets_counters(self, user):
+        assert ProposalCounters.objects.filter(user=user).exists()
+
+    def test_create_increments(self, user, another_user, another_ad, proposal):
+        assert counts(another_ad, user, another_user) == (1, 1, 1)
+
+    def test_status_change_decrements(self, user, another_user, another_ad, proposal):
+        proposal.status = 'rejected'
+        proposal.save()
+        assert counts(another_ad, user, another_user) == (0, 0, 0)
+        # Повторное сохранение с тем же статусом счетчики не меняет
+        proposal.save()
+        assert counts(another_ad, user, another_user) == (0, 0, 0)
+
+    def test_accept_decrements_conflicts(self, user, another_user, ad, another_ad, proposal):
+        ExchangeProposal.objects.create(ad_sender=another_ad, ad_receiver=ad)
+        exchange.accept_proposal(proposal)
+        assert counts(another_ad, user, another_user) == (0, 0, 0)
+        assert counts(ad, another_user, user) == (0, 0, 0)
+
+    def test_cascade_delete_decrements(self, user, another_user, ad, another_ad, proposal):
+        ad.delete()
+        assert counts(another_ad, user, another_user)[1:] == (0, 0)
+
+    def test_ad_save_keeps_counter(self, another_ad, proposal):
+        """Сохранение формы не перезаписывает счетчик устаревшим значением"""
+        stale = Ad.objects.get(pk=another_ad.pk)
+        ExchangeProposal.objects.create(ad_sender=proposal.ad_sender, ad_receiver=another_ad)
+        stale.title = 'Новый заголовок'
+        stale.save()
+        another_ad.refresh_from_db()
+        assert (another_ad.title, another_ad.pending_proposals_count) == ('Новый заголовок', 2)
+
+    def test_recount_repairs_drift(self, user, another_user, another_ad, proposal):
+        Ad.objects.update(pending_proposals_count=7)
+        ProposalCounters.objects.all().delete()
+        call_command('recount_proposal_counters', stdout=StringIO())
+        assert counts(another_ad, user, another_user) == (1, 1, 1)
+
+    def test_header_badge_without_aggregate_queries(self, client, another_user, proposal):
+        client.force_login(another_user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse('ad_list'))
+        assert response.context['pending_proposals_badge'] == 1
+        # Счетчики читаются одной строкой по первичному ключу, без COUNT
+        assert not any('COUNT(' in query['sql'] for query in ctx.captured_queries)
+        assert len([query for query in ctx.captured_queries if 'FROM "ads_proposalcounters"' in query['sql']]) == 1
+
+    def test_badge_for_user_without_counters(self, client):
+        user = User.objects.create_user(username='legacy', password='legacypassword')
+        ProposalCounters.objects.filter(user=user).delete()
+        client.force_login(user)
+        assert client.get(reverse('ad_list')).context['pending_proposals_badge'] == 0
+
+    def test_session_from_stock_backend_stays_logged_in(self, client, another_user, proposal):
+        client.force_login(another_user, backend='django.contrib.auth.backends.ModelBackend')
+        response = client.get(reverse('ad_list'))
+        assert response.context['user'] == another_user
+        assert response.context['pending_proposals_badge'] == 1
@@ -0,0 +1,57 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.utils import ConnectionHandler
+
+from project import db_profiles
+
+
+class TestDatabaseProfiles:
+    """Тесты профилей подключения к БД"""
+
+    def test_sqlite_profile_pragmas(self, tmp_path, django_db_blocker):
+        # Отдельное подключение к файлу, не к тестовой БД
+        connections = ConnectionHandler({'default': db_profiles.database('sqlite', tmp_path)})
+        conn = connections['default']
+        with django_db_blocker.unblock():
+            with conn.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                assert cursor.fetchone()[0] == 'wal'
+                cursor.execute('PRAGMA synchronous')
+                assert cursor.fetchone()[0] == 1  # NORMAL
+                cursor.execute('PRAGMA busy_timeout')
+                assert cursor.fetchone()[0] == 5000
+            assert conn.transaction_mode == 'IMMEDIATE'
+            conn.close()
+
+    def test_sqlite_path_from_env(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('ADS_SQLITE_PATH', str(tmp_path / 'other.sqlite3'))
+        assert db_profiles.database('sqlite', tmp_path)['NAME'] == str(tmp_path / 'other.sqlite3')
+
+    def test_sqlite_test_database_is_a_file(self, monkeypatch, tmp_path):
+        assert db_profiles.database('sqlite', tmp_path)['TEST']['NAME'] == tmp_path / 'test_db.sqlite3'
+        monkeypatch.setenv('ADS_SQLITE_TEST_PATH', str(tmp_path / 'other_test.sqlite3'))
+        assert db_profiles.database('sqlite', tmp_path)['TEST']['NAME'] == str(tmp_path / 'other_test.sqlite3')
+
+    def test_postgresql_pool(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('ADS_PG_POOL_MAX', '20')
+        profile = db_profiles.database('postgresql', tmp_path)
+        assert profile['CONN_MAX_AGE'] == 0
+        assert profile['OPTIONS']['pool']['max_size'] == 20
+
+    def test_postgresql_persistent_without_pool(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('ADS_PG_POOL', '0')
+        profile = db_profiles.database('postgresql', tmp_path)
+        assert 'pool' not in profile['OPTIONS']
+        assert (profile['CONN_MAX_AGE'], profile['CONN_HEALTH_CHECKS']) == (db_profiles.CONN_MAX_AGE, True)
+
+    def test_unknown_profile(self, tmp_path):
+        with pytest.raises(ImproperlyConfigured):
+            db_profiles.database('mysql', tmp_path)
+
+    @pytest.mark.django_db
+    def test_write_benchmark_needs_file_database(self, monkeypatch):
+        monkeypatch.setattr(connection, 'is_in_memory_db', lambda: True)
+        with pytest.raises(CommandError):
+            call_command('benchmark_writes', '--seconds', '0')
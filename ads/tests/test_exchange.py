@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ads import exchange
+from ads.models import Ad, ExchangeProposal
+
+
+@pytest.fixture
+def third_user():
+    return User.objects.create_user(username='thirduser', password='thirdpassword')
+
+
+@pytest.fixture
+def third_ad(third_user):
+    return Ad.objects.create(title='Третье объявление', description='Описание', category='home',
+                             condition='good', user=third_user)
+
+
+@pytest.fixture
+def competing(ad, another_ad, third_ad):
+    """Два предложения на объявление another_ad и одно встречное от его владельца"""
+    return [
+        ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=another_ad),
+        ExchangeProposal.objects.create(ad_sender=third_ad, ad_receiver=another_ad),
+        ExchangeProposal.objects.create(ad_sender=another_ad, ad_receiver=third_ad),
+    ]
+
+
+def statuses(proposals):
+    return [ExchangeProposal.objects.get(pk=proposal.pk).status for proposal in proposals]
+
+
+@pytest.mark.django_db
+class TestAcceptProposal:
+    """Тесты принятия предложения с отклонением конфликтующих"""
+
+    def test_accept_rejects_conflicts(self, competing):
+        assert exchange.accept_proposal(competing[0]) == 2
+        assert statuses(competing) == ['accepted', 'rejected', 'rejected']
+
+    def test_unrelated_proposals_stay_pending(self, competing, user, another_user, third_ad):
+        own_ad = Ad.objects.create(title='Еще одно', description='Описание', category='books',
+                                   condition='new', user=user)
+        unrelated = ExchangeProposal.objects.create(ad_sender=own_ad, ad_receiver=third_ad)
+        exchange.accept_proposal(competing[0])
+        assert statuses([unrelated]) == ['pending']
+
+    def test_accept_is_a_fixed_number_of_queries(self, competing):
+        with CaptureQueriesContext(connection) as ctx:
+            exchange.accept_proposal(competing[0])
+        updates = [query for query in ctx.captured_queries
+                   if query['sql'].startswith('UPDATE "ads_exchangeproposal"')]
+        assert len(updates) == 2
+
+    def test_second_accept_conflicts(self, competing):
+        exchange.accept_proposal(competing[0])
+        with pytest.raises(exchange.ProposalConflict):
+            exchange.accept_proposal(competing[1])
+        assert statuses(competing) == ['accepted', 'rejected', 'rejected']
+
+    def test_traded_ad_cannot_be_accepted_again(self, competing, another_ad, third_ad):
+        exchange.accept_proposal(competing[0])
+        late = ExchangeProposal.objects.create(ad_sender=third_ad, ad_receiver=another_ad)
+        with pytest.raises(exchange.AdAlreadyTraded):
+            exchange.accept_proposal(late)
+        assert statuses([late]) == ['pending']
+
+    def test_view_refuses_proposal_on_traded_ad(self, client, third_user, competing, another_ad, third_ad):
+        exchange.accept_proposal(competing[0])
+        client.force_login(third_user)
+        response = client.post(reverse('propose_exchange', kwargs={'ad_id': another_ad.pk}),
+                               {'sender_ad': third_ad.pk}, follow=True)
+        assert 'уже участвует в принятом обмене' in response.content.decode()
+        assert not ExchangeProposal.objects.filter(ad_sender=third_ad, ad_receiver=another_ad,
+                                                   status='pending').exists()
+
+    def test_view_accepts_and_reports_conflicts(self, client, another_user, competing):
+        client.force_login(another_user)
+        response = client.post(
+            reverse('update_proposal_status', kwargs={'proposal_id': competing[1].pk}), {'status': 'accepted'},
+            follow=True,
+        )
+        assert statuses(competing) == ['rejected', 'accepted', 'rejected']
+        assert 'конфликтующих предложений: 2' in response.content.decode()
+
+    def test_view_reject(self, client, another_user, competing):
+        client.force_login(another_user)
+        client.post(reverse('update_proposal_status', kwargs={'proposal_id': competing[0].pk}), {'status': 'rejected'})
+        assert statuses(competing) == ['rejected', 'pending', 'pending']
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(connection.vendor == 'sqlite' and not settings.DATABASES['default'].get('TEST', {}).get('NAME'),
+                    reason='тестовая БД SQLite в памяти не ждет блокировок, а сразу возвращает ошибку')
+class TestConcurrentAccept:
+    """Параллельные принятия предложений на одно объявление"""
+
+    def test_only_one_accept_wins(self, competing):
+        barrier = threading.Barrier(2)
+        outcomes = []
+
+        def accept(proposal):
+            barrier.wait()
+            try:
+                exchange.accept_proposal(proposal)
+                outcomes.append('accepted')
+            except exchange.ProposalConflict:
+                outcomes.append('conflict')
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=accept, args=(proposal,)) for proposal in competing[:2]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(outcomes) == ['accepted', 'conflict']
+        assert sorted(statuses(competing[:2])) == ['accepted', 'rejected']
+
+
+@pytest.mark.django_db
+class TestBatchUpdate:
+    """Тесты пакетного принятия и отклонения"""
+
+    def test_batch_reject(self, client, another_user, competing):
+        client.force_login(another_user)
+        response = client.post(reverse('update_proposals_batch'),
+                               {'status': 'rejected', 'proposal_ids': [competing[0].pk, competing[1].pk]})
+        assert response.status_code == 302
+        assert statuses(competing) == ['rejected', 'rejected', 'pending']
+
+    def test_batch_accept_skips_conflicting(self, client, another_user, competing):
+        client.force_login(another_user)
+        response = client.post(reverse('update_proposals_batch'),
+                               {'status': 'accepted', 'proposal_ids': [competing[0].pk, competing[1].pk]},
+                               follow=True)
+        assert statuses(competing) == ['accepted', 'rejected', 'rejected']
+        assert 'Пропущено предложений: 1' in response.content.decode()
+
+    def test_batch_ignores_foreign_proposals(self, client, user, competing):
+        """Отправитель не может принять собственное предложение"""
+        client.force_login(user)
+        client.post(reverse('update_proposals_batch'), {'status': 'accepted', 'proposal_ids': [competing[0].pk]})
+        assert statuses(competing) == ['pending', 'pending', 'pending']
+
+    def test_batch_validates_input(self, client, another_user, competing):
+        client.force_login(another_user)
+        response = client.post(reverse('update_proposals_batch'),
+                               {'status': 'accepted', 'proposal_ids': ['abc']}, follow=True)
+        assert 'Некорректный список предложений.' in response.content.decode()
+        assert client.get(reverse('update_proposals_batch')).status_code == 405
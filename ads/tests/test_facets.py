@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ads import facets
+from ads.models import Ad
+
+
+@pytest.fixture
+def catalog(user, another_user):
+    rows = [
+        (user, 'Велосипед горный', 'sport', 'good'),
+        (user, 'Велосипед детский', 'sport', 'new'),
+        (another_user, 'Книга о велосипедах', 'books', 'good'),
+        (another_user, 'Гантели', 'sport', 'good'),
+    ]
+    return [Ad.objects.create(user=owner, title=title, description='Описание', category=category,
+                              condition=condition) for owner, title, category, condition in rows]
+
+
+@pytest.mark.django_db
+class TestFacets:
+    """Тесты счетчиков фильтров ленты"""
+
+    def test_counts_without_filters(self, catalog):
+        counts = facets.facet_counts()
+        assert counts['category'] == {'electronics': 0, 'clothing': 0, 'books': 1, 'home': 0, 'sport': 3,
+                                      'toys': 0, 'other': 0}
+        assert (counts['condition']['good'], counts['condition']['new'], counts['condition']['poor']) == (3, 1, 0)
+
+    def test_each_facet_respects_the_other_filter(self, catalog):
+        counts = facets.facet_counts(category='sport', condition='good')
+        # Категории считаются при выбранном состоянии, состояния - при выбранной категории
+        assert (counts['category']['sport'], counts['category']['books']) == (2, 1)
+        assert (counts['condition']['good'], counts['condition']['new']) == (2, 1)
+
+    def test_search_and_owner(self, user, catalog):
+        assert facets.facet_counts(query='велосипед')['category']['sport'] == 2
+        own = facets.facet_counts(owner=user)['category']
+        assert (own['sport'], own['books']) == (2, 0)
+
+    def test_one_query_then_cache(self, catalog):
+        with CaptureQueriesContext(connection) as ctx:
+            facets.facet_counts()
+            facets.facet_counts(category='books')
+        assert len(ctx.captured_queries) == 1
+        assert 'GROUP BY' in ctx.captured_queries[0]['sql']
+
+    def test_ad_changes_reset_cache(self, user, catalog):
+        facets.facet_counts()
+        Ad.objects.create(user=user, title='Куртка', description='Описание', category='clothing', condition='new')
+        assert facets.facet_counts()['category']['clothing'] == 1
+
+    def test_view(self, client, user, catalog):
+        client.force_login(user)
+        response = client.get(reverse('ad_facets'), {'is_mine': 'on', 'condition': 'new'})
+        assert response.json()['category']['sport'] == 1
+        assert response.json()['condition']['good'] == 1
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN есть только в SQLite')
+    def test_grid_uses_covering_index(self, catalog):
+        with CaptureQueriesContext(connection) as ctx:
+            facets.facet_counts()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {ctx.captured_queries[0]['sql']}")
+            plan = [row[-1] for row in cursor.fetchall()]
+        assert not any('TEMP B-TREE' in step for step in plan), plan
+        assert any('COVERING INDEX' in step for step in plan), plan
@@ -0,0 +1,82 @@
+import pytest
+from django.urls import reverse
+
+from ads import exchange, inbox
+from ads.models import Ad, ExchangeProposal, ProposalInboxEntry
+
+
+def entries(response):
+    return [(entry.proposal_id, entry.direction, entry.status) for entry in response.context['page_obj']]
+
+
+@pytest.fixture
+def counter_proposal(ad, another_ad):
+    """Встречное предложение: another_user предлагает обмен пользователю user"""
+    return ExchangeProposal.objects.create(ad_sender=another_ad, ad_receiver=ad)
+
+
+@pytest.mark.django_db
+class TestProposalInbox:
+    """Тесты единой ленты отправленных и полученных предложений"""
+
+    def test_entries_for_both_participants(self, user, another_user, proposal):
+        assert set(ProposalInboxEntry.objects.values_list('user_id', 'direction')) == {
+            (user.pk, 'sent'), (another_user.pk, 'received'),
+        }
+
+    def test_all_tab_mixes_directions(self, client, user, proposal, counter_proposal):
+        client.force_login(user)
+        response = client.get(reverse('my_proposals'))
+        assert entries(response) == [
+            (counter_proposal.pk, 'received', 'pending'), (proposal.pk, 'sent', 'pending'),
+        ]
+
+    def test_direction_and_status_filters(self, client, user, proposal, counter_proposal):
+        exchange.reject_proposals([counter_proposal.pk], user)
+        client.force_login(user)
+        url = reverse('my_proposals')
+        assert entries(client.get(url, {'direction': 'received'})) == [(counter_proposal.pk, 'received', 'rejected')]
+        assert entries(client.get(url, {'status': 'pending'})) == [(proposal.pk, 'sent', 'pending')]
+        assert entries(client.get(url, {'direction': 'sent', 'status': 'rejected'})) == []
+        # Неизвестные значения фильтров игнорируются
+        assert len(entries(client.get(url, {'direction': 'everything'}))) == 2
+
+    def test_status_follows_accept(self, ad, another_ad, proposal, counter_proposal):
+        exchange.accept_proposal(proposal)
+        assert dict(ProposalInboxEntry.objects.values_list('proposal_id', 'status').distinct()) == {
+            proposal.pk: 'accepted', counter_proposal.pk: 'rejected',
+        }
+
+    def test_cursor_pagination(self, client, monkeypatch, user, another_user, another_ad):
+        monkeypatch.setattr(inbox, 'PER_PAGE', 2)
+        ads = [Ad.objects.create(title=f'Объявление {i}', description='Описание', category='books',
+                                 condition='good', user=user) for i in range(3)]
+        proposals = [ExchangeProposal.objects.create(ad_sender=own, ad_receiver=another_ad) for own in ads]
+        client.force_login(user)
+
+        first = client.get(reverse('my_proposals'))
+        assert [entry for entry, *_ in entries(first)] == [proposals[2].pk, proposals[1].pk]
+        cursor = first.context['page_obj'].next_cursor
+        rest = client.get(reverse('proposal_inbox'), {'cursor': cursor})
+        assert [entry for entry, *_ in entries(rest)] == [proposals[0].pk]
+        assert rest.context['page_obj'].next_cursor is None
+
+    def test_fragment_view(self, client, another_user, proposal):
+        client.force_login(another_user)
+        response = client.get(reverse('proposal_inbox'), {'direction': 'received'})
+        content = response.content.decode()
+        assert '<html' not in content
+        assert f'value="{proposal.pk}"' in content
+
+    def test_fragment_requires_login(self, client):
+        assert client.get(reverse('proposal_inbox')).status_code == 302
+
+    def test_rebuild(self, user, another_user, proposal, counter_proposal):
+        ProposalInboxEntry.objects.all().delete()
+        assert inbox.rebuild(chunk_size=1) == 2
+        assert ProposalInboxEntry.objects.filter(user=user).count() == 2
+        assert ProposalInboxEntry.objects.filter(user=another_user).count() == 2
+
+    def test_cascade_delete(self, ad, proposal):
+        ad.delete()
+        assert not ProposalInboxEntry.objects.exists()
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from ads import async_views, exchange, live
+from ads.models import ExchangeProposal
+
+
+class RecordingBus(live.InProcessBus):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, user_id, event):
+        self.published.append((user_id, event))
+
+
+@pytest.fixture
+def bus(settings):
+    settings.ADS_EVENT_BUS = f'{__name__}.RecordingBus'
+    return live.get_bus()
+
+
+class TestInProcessBus:
+    """Тесты шины событий в памяти процесса"""
+
+    def test_publish_from_another_thread(self):
+        bus = live.InProcessBus()
+
+        async def scenario():
+            async with bus.subscribe(1) as queue, bus.subscribe(1) as second, bus.subscribe(2) as other:
+                thread = threading.Thread(target=bus.publish, args=(1, {'type': 'status', 'proposal': 5}))
+                thread.start()
+                thread.join()
+                assert await asyncio.wait_for(queue.get(), 1) == {'type': 'status', 'proposal': 5}
+                assert await asyncio.wait_for(second.get(), 1) == {'type': 'status', 'proposal': 5}
+                assert other.empty()
+            assert not bus._subscribers
+
+        async_to_sync(scenario)()
+
+    def test_overflow_collapses_into_resync(self):
+        bus = live.InProcessBus()
+
+        async def scenario():
+            async with bus.subscribe(1) as queue:
+                for number in range(live.QUEUE_SIZE + 5):
+                    bus.publish(1, {'type': 'created', 'proposal': number})
+                await asyncio.sleep(0)
+                return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        received = async_to_sync(scenario)()
+        # Переполнение сбросило очередь: resync и события, пришедшие после него
+        assert received[0] == live.RESYNC
+        assert [event['proposal'] for event in received[1:]] == list(range(live.QUEUE_SIZE + 1, live.QUEUE_SIZE + 5))
+
+
+@pytest.mark.django_db
+class TestPublishing:
+    """Изменения предложений публикуются обоим участникам после коммита"""
+
+    def test_created(self, bus, user, another_user, ad, another_ad, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            proposal = ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=another_ad)
+        event = {'type': 'created', 'proposal': proposal.pk, 'status': 'pending'}
+        assert bus.published == [(user.pk, event), (another_user.pk, event)]
+
+    def test_nothing_before_commit(self, bus, proposal, another_user, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            exchange.reject_proposals([proposal.pk], another_user)
+        assert bus.published == []
+        for callback in callbacks:
+            callback()
+        assert [event['status'] for _, event in bus.published] == ['rejected', 'rejected']
+
+    def test_accept_publishes_conflicts(self, bus, client, another_user, proposal, ad,
+                                        django_capture_on_commit_callbacks):
+        other = ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=proposal.ad_receiver)
+        client.force_login(another_user)
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse('update_proposal_status', kwargs={'proposal_id': other.pk}), {'status': 'accepted'})
+        statuses = {(event['proposal'], event['status']) for _, event in bus.published}
+        assert statuses == {(other.pk, 'accepted'), (proposal.pk, 'rejected')}
+
+
+@pytest.mark.django_db
+class TestProposalEvents:
+    """Тесты потока событий и карточки предложения"""
+
+    def test_stream_pushes_events(self, user):
+        client = AsyncClient()
+
+        async def scenario():
+            await client.aforce_login(user)
+            response = await client.get(reverse('proposal_events'))
+            assert response['Content-Type'] == 'text/event-stream'
+            stream = aiter(response.streaming_content)
+            assert await anext(stream) == f'retry: {async_views.EVENTS_RETRY}\n\n'.encode()
+            pending = asyncio.ensure_future(anext(stream))
+            while not live.get_bus()._subscribers.get(user.pk):
+                await asyncio.sleep(0.01)
+            live.get_bus().publish(user.pk, {'type': 'status', 'proposal': 7, 'status': 'accepted'})
+            chunk = await asyncio.wait_for(pending, 1)
+            await stream.aclose()
+            return chunk
+
+        chunk = async_to_sync(scenario)()
+        assert chunk == b'event: status\ndata: {"type": "status", "proposal": 7, "status": "accepted"}\n\n'
+
+    def test_anonymous_and_wsgi_get_no_stream(self, client, user):
+        assert async_to_sync(AsyncClient().get)(reverse('proposal_events')).status_code == 204
+        client.force_login(user)
+        assert client.get(reverse('proposal_events')).status_code == 204
+
+    def test_entry_card(self, client, user, another_user, django_user_model, proposal):
+        client.force_login(another_user)
+        response = client.get(reverse('proposal_entry', kwargs={'proposal_id': proposal.pk}))
+        html = response.content.decode()
+        assert f'data-proposal-id="{proposal.pk}"' in html
+        assert 'data-direction="received"' in html
+
+        client.force_login(django_user_model.objects.create_user(username='stranger'))
+        assert client.get(reverse('proposal_entry', kwargs={'proposal_id': proposal.pk})).status_code == 404
+
+    def test_page_subscribes(self, client, user):
+        client.force_login(user)
+        html = client.get(reverse('my_proposals')).content.decode()
+        assert f'data-events-url="{reverse("proposal_events")}"' in html
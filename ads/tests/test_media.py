@@ -0,0 +1,113 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils.http import http_date
+
+from ads import media, thumbnails
+from ads.models import Ad
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_root(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def ad_with_image(user, media_root):
+    return Ad.objects.create(
+        title='Фотоаппарат', description='С объективом', category='electronics', condition='good', user=user,
+        image_url=SimpleUploadedFile('camera.jpg', CONTENT, content_type='image/jpeg'),
+    )
+
+
+def body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+@pytest.mark.django_db
+class TestMediaServing:
+    """Тесты раздачи изображений объявлений"""
+
+    def test_serves_file_with_validators(self, client, ad_with_image):
+        response = client.get(ad_with_image.image_url.url)
+        assert response.status_code == 200
+        assert body(response) == CONTENT
+        assert response['Content-Type'] == 'image/jpeg'
+        assert response['Accept-Ranges'] == 'bytes'
+        assert response['ETag'].startswith('"')
+        assert response['Cache-Control'] == f'public, max-age={media.MEDIA_MAX_AGE}'
+
+    def test_conditional_requests(self, client, ad_with_image):
+        url = ad_with_image.image_url.url
+        first = client.get(url)
+        assert client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
+        assert client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code == 304
+        assert client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code == 200
+
+    @pytest.mark.parametrize('header, start, end', [
+        ('bytes=10-19', 10, 19),
+        ('bytes=1000-', 1000, 1023),
+        ('bytes=-24', 1000, 1023),
+        ('bytes=1020-5000', 1020, 1023),
+    ])
+    def test_range(self, client, ad_with_image, header, start, end):
+        response = client.get(ad_with_image.image_url.url, HTTP_RANGE=header)
+        assert response.status_code == 206
+        assert body(response) == CONTENT[start:end + 1]
+        assert response['Content-Length'] == str(end - start + 1)
+        assert response['Content-Range'] == f'bytes {start}-{end}/{len(CONTENT)}'
+
+    def test_unsatisfiable_range(self, client, ad_with_image):
+        response = client.get(ad_with_image.image_url.url, HTTP_RANGE='bytes=5000-')
+        assert response.status_code == 416
+        assert response['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+    def test_stale_if_range_returns_whole_file(self, client, ad_with_image):
+        response = client.get(ad_with_image.image_url.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        assert response.status_code == 200
+        assert body(response) == CONTENT
+
+    def test_deleted_ad_is_not_served(self, client, ad_with_image):
+        url = ad_with_image.image_url.url
+        assert client.get(url).status_code == 200
+        ad_with_image.delete()
+        assert client.get(url).status_code == 404
+
+    def test_unreferenced_and_outside_files(self, client, ad_with_image, media_root):
+        (media_root / 'ads' / 'orphan.jpg').write_bytes(CONTENT)
+        (media_root / 'notes.txt').write_text('секрет')
+        assert client.get('/media/ads/orphan.jpg').status_code == 404
+        assert client.get('/media/notes.txt').status_code == 404
+        assert client.get('/media/../manage.py').status_code == 404
+
+    def test_thumbnails_follow_original(self, client, ad_with_image, media_root):
+        name = thumbnails.variant_name(ad_with_image.image_url.name, 320, 'webp')
+        (media_root / name).parent.mkdir(parents=True)
+        (media_root / name).write_bytes(b'webp')
+        url = f'/media/{name}'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'image/webp'
+        ad_with_image.delete()
+        assert client.get(url).status_code == 404
+
+    def test_access_check_is_cached(self, client, ad_with_image, django_assert_num_queries):
+        url = ad_with_image.image_url.url
+        # Ни сессии, ни пользователя: только проверка объявления, и та до сброса кэша
+        with django_assert_num_queries(1):
+            client.get(url)
+        with django_assert_num_queries(0):
+            client.get(url)
+
+    @pytest.mark.parametrize('mode, header', [('x-accel-redirect', 'X-Accel-Redirect'), ('x-sendfile', 'X-Sendfile')])
+    def test_accel_handoff(self, client, settings, ad_with_image, mode, header):
+        settings.ADS_MEDIA_ACCEL = mode
+        response = client.get(ad_with_image.image_url.url)
+        assert response.status_code == 200
+        assert response.content == b''
+        assert response['Content-Type'] == 'image/jpeg'
+        expected = f'/protected-media/{ad_with_image.image_url.name}' if mode == 'x-accel-redirect' \
+            else str(settings.MEDIA_ROOT / ad_with_image.image_url.name)
+        assert response[header] == expected
@@ -0,0 +1,139 @@
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from ads import exchange, notifications, outbox
+from ads.models import Ad, ExchangeProposal, OutboxEvent
+
+
+@pytest.fixture
+def third_ad(django_user_model):
+    owner = django_user_model.objects.create_user(username='thirduser', email='third@example.com', password='x')
+    return Ad.objects.create(title='Третье объявление', description='Описание', category='home',
+                             condition='good', user=owner)
+
+
+def events():
+    return sorted(OutboxEvent.objects.values_list('recipient__username', 'kind', 'proposal_id'))
+
+
+def send(*args):
+    out = StringIO()
+    call_command('send_notifications', *args, stdout=out)
+    return out.getvalue()
+
+
+class FailingBackend(notifications.EmailBackend):
+    def deliver(self, recipient, events):
+        raise ConnectionError('почтовый сервер недоступен')
+
+
+@pytest.mark.django_db
+class TestOutboxWrites:
+    """Тесты записи событий вместе с изменением предложений"""
+
+    def test_new_proposal_notifies_receiver(self, client, user, ad, another_ad):
+        client.force_login(user)
+        client.post(reverse('propose_exchange', kwargs={'ad_id': another_ad.pk}),
+                    {'sender_ad': ad.pk, 'comment': 'Меняю'})
+        proposal = ExchangeProposal.objects.get()
+        assert events() == [('anotheruser', 'created', proposal.pk)]
+        # В запросе ничего не доставляется
+        assert mail.outbox == []
+
+    def test_accept_notifies_senders(self, client, another_user, proposal, third_ad):
+        conflicting = ExchangeProposal.objects.create(ad_sender=third_ad, ad_receiver=proposal.ad_receiver)
+        OutboxEvent.objects.all().delete()
+        client.force_login(another_user)
+        client.post(reverse('update_proposal_status', kwargs={'proposal_id': proposal.pk}), {'status': 'accepted'})
+        assert events() == [('testuser', 'accepted', proposal.pk), ('thirduser', 'rejected', conflicting.pk)]
+
+    def test_batch_reject_notifies_senders(self, another_user, proposal):
+        OutboxEvent.objects.all().delete()
+        exchange.reject_proposals([proposal.pk], another_user)
+        assert events() == [('testuser', 'rejected', proposal.pk)]
+
+    def test_rolled_back_change_leaves_no_event(self, ad, another_ad):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=another_ad)
+            raise RuntimeError
+        assert not OutboxEvent.objects.exists()
+
+
+@pytest.mark.django_db
+class TestNotificationWorker:
+    """Тесты обработчика очереди уведомлений"""
+
+    def test_events_for_one_recipient_are_coalesced(self, ad, another_ad, third_ad):
+        ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=another_ad)
+        ExchangeProposal.objects.create(ad_sender=third_ad, ad_receiver=another_ad)
+        ExchangeProposal.objects.create(ad_sender=another_ad, ad_receiver=third_ad)
+
+        out = send()
+        assert 'Событий: 3, уведомлений: 2, ошибок доставки: 0' in out
+        assert not OutboxEvent.objects.exists()
+        message = next(message for message in mail.outbox if message.to == ['another@example.com'])
+        assert 'Тестовое объявление' in message.body and 'Третье объявление' in message.body
+        assert 'http://localhost:8000/my-proposals/' in message.body
+
+    def test_failed_delivery_is_retried_later(self, settings, proposal):
+        settings.ADS_NOTIFICATION_BACKEND = f'{__name__}.FailingBackend'
+        assert 'ошибок доставки: 1' in send()
+        event = OutboxEvent.objects.get()
+        assert event.attempts == 1
+        assert 'недоступен' in event.last_error
+        assert event.available_at > timezone.now() + outbox.RETRY_DELAY / 2
+        # До конца паузы событие не выбирается
+        assert 'Событий: 0' in send()
+
+    def test_gives_up_after_max_attempts(self, proposal):
+        OutboxEvent.objects.update(attempts=outbox.MAX_ATTEMPTS)
+        assert outbox.claim(10) == []
+
+    def test_claimed_events_are_leased(self, proposal):
+        assert len(outbox.claim(10)) == 1
+        assert outbox.claim(10) == []
+        assert len(outbox.claim(10, now=timezone.now() + outbox.LEASE + timedelta(seconds=1))) == 1
+
+    def test_webhook_backend(self, settings, proposal):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                received.append((body, self.headers['X-Signature']))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        settings.ADS_NOTIFICATION_BACKEND = 'ads.notifications.WebhookBackend'
+        settings.ADS_NOTIFICATION_WEBHOOK_URL = f'http://127.0.0.1:{server.server_port}/'
+        settings.ADS_NOTIFICATION_WEBHOOK_SECRET = 'секрет'
+        try:
+            send()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        ((body, signature),) = received
+        payload = json.loads(body)
+        assert payload['user'] == 'anotheruser'
+        assert [event['kind'] for event in payload['events']] == ['created']
+        assert signature == hmac.new('секрет'.encode(), body, hashlib.sha256).hexdigest()
+        assert not OutboxEvent.objects.exists()
@@ -0,0 +1,94 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from ads import cache
+from ads.models import Ad
+
+
+class AsyncOnlyCache:
+    """Кэш, который не дает вызывать блокирующие методы"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __getattr__(self, name):
+        if not name.startswith('a'):
+            raise AssertionError(f'Блокирующий вызов cache.{name} в асинхронном представлении')
+        return getattr(self.cache, name)
+
+
+@pytest.mark.django_db
+class TestPageCache:
+    """Тесты кэша страниц для анонимных посетителей"""
+
+    def test_second_request_is_served_from_cache(self, client, ad):
+        """Повторный запрос отдается из кэша"""
+        cache.reset_stats()
+        first = client.get(reverse('ad_list'), {'category': 'electronics'})
+        second = client.get(reverse('ad_list'), {'category': 'electronics'})
+        assert first['X-Page-Cache'] == 'MISS'
+        assert second['X-Page-Cache'] == 'HIT'
+        assert second.content == first.content
+        assert cache.get_stats() == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5}
+
+    def test_key_ignores_parameter_order_and_unknown_parameters(self, client, ad):
+        """Ключ строится по нормализованным параметрам"""
+        client.get(reverse('ad_list') + '?category=electronics&condition=new')
+        response = client.get(reverse('ad_list') + '?condition=new&utm_source=mail&category=electronics')
+        assert response['X-Page-Cache'] == 'HIT'
+
+    def test_unknown_parameters_do_not_leak_into_cached_page(self, client, user):
+        """Посторонний параметр не попадает в ссылки страницы, которую получат другие посетители"""
+        for i in range(11):
+            Ad.objects.create(title=f'Книга {i}', description='Описание', category='books', condition='good',
+                              user=user)
+        client.get(reverse('ad_list'), {'category': 'books', 'evil': 'x"><b>pwn'})
+        response = client.get(reverse('ad_list'), {'category': 'books'})
+        html = response.content.decode()
+        assert response['X-Page-Cache'] == 'HIT'
+        assert 'evil' not in html and 'pwn' not in html
+        assert '?category=books&amp;cursor=' in html
+        assert f'data-facets-url="{reverse("ad_facets")}?category=books"' in html
+
+    def test_ad_change_invalidates_pages(self, client, ad):
+        """Изменение объявления сбрасывает закэшированные страницы"""
+        client.get(reverse('ad_detail', kwargs={'pk': ad.pk}))
+        ad.title = 'Новый заголовок'
+        ad.save()
+        response = client.get(reverse('ad_detail', kwargs={'pk': ad.pk}))
+        assert response['X-Page-Cache'] == 'MISS'
+        assert 'Новый заголовок' in response.content.decode()
+
+        Ad.objects.get(pk=ad.pk).delete()
+        assert client.get(reverse('ad_detail', kwargs={'pk': ad.pk})).status_code == 404
+
+    def test_authenticated_requests_bypass_cache(self, client, user, ad):
+        """Страницы авторизованных пользователей не кэшируются"""
+        client.force_login(user)
+        client.get(reverse('ad_list'))
+        response = client.get(reverse('ad_list'))
+        assert 'X-Page-Cache' not in response
+
+    def test_file_based_backend(self, client, ad, tmp_path):
+        """Кэш работает и с файловым бэкендом"""
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)}
+        with override_settings(CACHES={'default': backend}):
+            try:
+                assert client.get(reverse('ad_list'))['X-Page-Cache'] == 'MISS'
+                assert client.get(reverse('ad_list'))['X-Page-Cache'] == 'HIT'
+                ad.save()
+                assert client.get(reverse('ad_list'))['X-Page-Cache'] == 'MISS'
+            finally:
+                caches['default'].clear()
+
+    def test_async_views_do_not_block_event_loop(self, monkeypatch, ad):
+        """Под ASGI кэш страниц опрашивается асинхронными методами"""
+        client = AsyncClient()
+        monkeypatch.setattr(cache, 'get_cache', lambda: AsyncOnlyCache(caches['default']))
+        first = async_to_sync(client.get)(reverse('ad_detail', kwargs={'pk': ad.pk}))
+        second = async_to_sync(client.get)(reverse('ad_detail', kwargs={'pk': ad.pk}))
+        assert (first['X-Page-Cache'], second['X-Page-Cache']) == ('MISS', 'HIT')
+        assert second.content == first.content
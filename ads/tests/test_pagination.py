@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ads.models import Ad
+from ads.pagination import KeysetPaginator, decode_cursor, InvalidCursor
+
+
+@pytest.fixture
+def many_ads(user):
+    Ad.objects.bulk_create([
+        Ad(title=f'Объявление {i}', description='Описание', category='other', condition='good', user=user)
+        for i in range(25)
+    ])
+    # Одинаковое время публикации: порядок должен держаться на id
+    Ad.objects.update(created_at=timezone.now())
+    return list(Ad.objects.order_by('-created_at', '-id'))
+
+
+@pytest.mark.django_db
+class TestKeysetPaginator:
+    """Тесты курсорной пагинации"""
+
+    def test_walks_forward_and_back(self, many_ads):
+        """Проход вперед и назад по курсорам возвращает те же страницы"""
+        paginator = KeysetPaginator(Ad.objects.all(), 10)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+
+        assert list(first) == many_ads[:10]
+        assert list(second) == many_ads[10:20]
+        assert list(third) == many_ads[20:]
+        assert not first.has_previous() and not third.has_next()
+
+        back = paginator.get_page(third.previous_cursor)
+        assert list(back) == many_ads[10:20]
+        assert list(paginator.get_page(back.previous_cursor)) == many_ads[:10]
+        assert paginator.get_page(back.previous_cursor).previous_cursor is None
+
+    def test_page_is_single_query_without_count(self, many_ads):
+        """Глубокая страница - один запрос без COUNT и OFFSET"""
+        paginator = KeysetPaginator(Ad.objects.all(), 10)
+        cursor = paginator.get_page().next_cursor
+        with CaptureQueriesContext(connection) as ctx:
+            list(paginator.get_page(cursor))
+        assert len(ctx.captured_queries) == 1
+        sql = ctx.captured_queries[0]['sql'].upper()
+        assert 'COUNT(' not in sql and 'OFFSET' not in sql
+
+    def test_invalid_cursor_falls_back_to_first_page(self, many_ads):
+        """Испорченный курсор открывает первую страницу"""
+        with pytest.raises(InvalidCursor):
+            decode_cursor('not-a-cursor')
+        page = KeysetPaginator(Ad.objects.all(), 10).get_page('not-a-cursor')
+        assert list(page) == many_ads[:10]
+
+    def test_ad_list_renders_cursor_links(self, client, many_ads):
+        """Навигация ad_list содержит курсор следующей страницы"""
+        response = client.get(reverse('ad_list'), {'category': 'other'})
+        page = response.context['page_obj']
+        assert f'cursor={page.next_cursor}' in response.content.decode()
+
+        response = client.get(reverse('ad_list'), {'category': 'other', 'cursor': page.next_cursor})
+        assert list(response.context['ads']) == many_ads[10:20]
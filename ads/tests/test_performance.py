@@ -0,0 +1,50 @@
+import json
+import logging
+import re
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from ads import performance
+
+
+@pytest.fixture
+def staff_user():
+    user = User(username='staff', is_staff=True)
+    user.set_unusable_password()
+    user.save()
+    return user
+
+
+@pytest.mark.django_db
+class TestPerformanceMiddleware:
+    """Тесты middleware с метриками производительности"""
+
+    def test_server_timing_header(self, client, ad):
+        response = client.get(reverse('ad_list'))
+        timing = response['Server-Timing']
+        match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', timing)
+        assert match and int(match.group(1)) >= 1
+        assert re.search(r'tpl;dur=[\d.]+', timing)
+        assert re.search(r'total;dur=[\d.]+', timing)
+
+    def test_structured_log_line(self, client, ad, caplog):
+        with caplog.at_level(logging.INFO, logger='ads.performance'):
+            client.get(reverse('ad_detail', kwargs={'pk': ad.pk}))
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['url_name'] == 'ad_detail'
+        assert record['status'] == 200
+        assert record['sql_count'] >= 1
+
+    def test_stats_endpoint_is_staff_only(self, client, user, staff_user, ad):
+        performance.histogram.clear()
+        client.get(reverse('ad_list'))
+
+        client.force_login(user)
+        assert client.get(reverse('performance_stats')).status_code == 302
+
+        client.force_login(staff_user)
+        stats = client.get(reverse('performance_stats')).json()
+        assert stats['urls']['ad_list']['count'] >= 1
+        assert 'le_inf' in stats['urls']['ad_list']['buckets']
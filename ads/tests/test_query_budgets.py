@@ -0,0 +1,67 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ads import trade_cycles
+from ads.models import Ad, ExchangeProposal
+
+
+def count_queries(client, url, params=None):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url, params or {})
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+def add_rows(user, another_user, ad, another_ad, n):
+    """Добавляет объявления чужих пользователей и предложения в обе стороны"""
+    for i in range(n):
+        owner = User(username=f'trader{i}')
+        owner.set_unusable_password()
+        owner.save()
+        foreign_ad = Ad.objects.create(title=f'Чужое {i}', description='Описание', category='electronics',
+                                       condition='new', user=owner)
+        own_ad = Ad.objects.create(title=f'Свое {i}', description='Описание', category='electronics',
+                                   condition='new', user=user)
+        ExchangeProposal.objects.create(ad_sender=own_ad, ad_receiver=foreign_ad)
+        ExchangeProposal.objects.create(ad_sender=foreign_ad, ad_receiver=ad)
+
+
+def assert_budget(client, user, another_user, ad, another_ad, url, budget, params=None):
+    """Число запросов не превышает бюджет и не зависит от количества строк"""
+    baseline = count_queries(client, url, params)
+    add_rows(user, another_user, ad, another_ad, 8)
+    loaded = count_queries(client, url, params)
+    assert baseline == loaded, f'{url}: {baseline} запросов на 1 строку, {loaded} на 9'
+    assert loaded <= budget, f'{url}: {loaded} запросов при бюджете {budget}'
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    """Бюджет SQL-запросов на страницу"""
+
+    def test_ad_list_anonymous(self, client, user, another_user, ad, another_ad):
+        assert_budget(client, user, another_user, ad, another_ad, reverse('ad_list'), 2)
+
+    def test_ad_list_filtered(self, client, user, another_user, ad, another_ad):
+        assert_budget(client, user, another_user, ad, another_ad, reverse('ad_list'), 2,
+                      {'category': 'electronics', 'condition': 'new'})
+
+    def test_ad_list_authenticated(self, client, user, another_user, ad, another_ad):
+        client.force_login(user)
+        assert_budget(client, user, another_user, ad, another_ad, reverse('ad_list'), 4, {'is_mine': 'on'})
+
+    def test_ad_detail(self, client, user, another_user, ad, another_ad):
+        client.force_login(user)
+        # Похожие объявления - один запрос к заранее посчитанному списку, значок в шапке -
+        # строка счетчиков по первичному ключу
+        assert_budget(client, user, another_user, ad, another_ad,
+                      reverse('ad_detail', kwargs={'pk': another_ad.pk}), 6)
+
+    def test_my_proposals(self, client, user, another_user, ad, another_ad, proposal):
+        client.force_login(user)
+        # Граф цепочек обмена загружается один раз на процесс, а не на каждый запрос
+        trade_cycles.graph.load()
+        assert_budget(client, user, another_user, ad, another_ad, reverse('my_proposals'), 4)
@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ads import trade_cycles
+from ads.models import Ad, ExchangeProposal, ProposalInboxEntry, SimilarAd
+from ads.pagination import encode_cursor
+
+pytestmark = pytest.mark.skipif(connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN есть только в SQLite')
+
+APP_TABLES = (Ad._meta.db_table, ExchangeProposal._meta.db_table, ProposalInboxEntry._meta.db_table,
+              SimilarAd._meta.db_table)
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_indexed(client, url, params=None):
+    """Каждый SELECT по таблицам приложения идет по индексу и без временной сортировки"""
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url, params or {})
+    assert response.status_code == 200
+
+    checked = 0
+    for query in ctx.captured_queries:
+        sql = query['sql']
+        if not sql.startswith('SELECT') or not any(f'"{table}"' in sql for table in APP_TABLES):
+            continue
+        checked += 1
+        for step in query_plan(sql):
+            assert 'TEMP B-TREE' not in step, f'{step}\n{sql}'
+            if step.startswith('SCAN'):
+                # Обход индекса в нужном порядке допустим только с LIMIT,
+                # иначе это такой же полный просмотр таблицы
+                assert 'INDEX' in step and ' LIMIT ' in sql, f'{step}\n{sql}'
+    assert checked
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    """Регрессионные тесты планов запросов основных представлений"""
+
+    def test_ad_list_feed(self, client, ad, another_ad):
+        assert_indexed(client, reverse('ad_list'))
+
+    @pytest.mark.parametrize('params', [
+        {'category': 'electronics'},
+        {'condition': 'new'},
+        {'category': 'electronics', 'condition': 'new'},
+    ])
+    def test_ad_list_filters(self, client, ad, another_ad, params):
+        assert_indexed(client, reverse('ad_list'), params)
+
+    def test_ad_list_next_page(self, client, user, ad, another_ad):
+        response = client.get(reverse('ad_list'))
+        first = response.context['page_obj'][0]
+        assert_indexed(client, reverse('ad_list'), {'cursor': encode_cursor(first.created_at, first.pk, 'next')})
+
+    def test_ad_list_is_mine(self, client, user, ad, another_ad):
+        client.force_login(user)
+        assert_indexed(client, reverse('ad_list'), {'is_mine': 'on'})
+
+    def test_ad_detail(self, client, user, ad, another_ad):
+        SimilarAd.objects.create(ad=another_ad, similar=ad, rank=0, score=0.5)
+        client.force_login(user)
+        assert_indexed(client, reverse('ad_detail', kwargs={'pk': another_ad.pk}))
+
+    @pytest.mark.parametrize('params', [{}, {'q': 'тест'}])
+    def test_sender_ad_autocomplete(self, client, user, ad, another_ad, params):
+        client.force_login(user)
+        assert_indexed(client, reverse('sender_ad_autocomplete', kwargs={'ad_id': another_ad.pk}), params)
+
+    def test_media_access_check(self, client, settings, tmp_path, user):
+        settings.MEDIA_ROOT = tmp_path
+        (tmp_path / 'ads').mkdir()
+        ad = Ad.objects.create(user=user, title='Фото', description='Фото', category='other', condition='good',
+                               image_url='ads/photo.jpg')
+        (tmp_path / 'ads' / 'photo.jpg').write_bytes(b'jpeg')
+        assert_indexed(client, ad.image_url.url)
+        (tmp_path / 'thumbs' / 'ads').mkdir(parents=True)
+        (tmp_path / 'thumbs' / 'ads' / 'photo_160.jpg').write_bytes(b'jpeg')
+        assert_indexed(client, '/media/thumbs/ads/photo_160.jpg')
+
+    def test_proposal_entry(self, client, another_user, proposal):
+        client.force_login(another_user)
+        assert_indexed(client, reverse('proposal_entry', kwargs={'proposal_id': proposal.pk}))
+
+    def test_my_proposals(self, client, user, another_user, proposal):
+        # Полная загрузка графа цепочек обмена не входит в обработку каждого запроса
+        trade_cycles.graph.load()
+        client.force_login(user)
+        assert_indexed(client, reverse('my_proposals'))
+        client.force_login(another_user)
+        assert_indexed(client, reverse('my_proposals'))
+
+    @pytest.mark.parametrize('params', [
+        {'direction': 'received'},
+        {'status': 'pending'},
+        {'direction': 'sent', 'status': 'pending'},
+    ])
+    def test_proposal_inbox_filters(self, client, another_user, proposal, params):
+        client.force_login(another_user)
+        assert_indexed(client, reverse('proposal_inbox'), params)
+
+    @pytest.mark.parametrize('params', [{}, {'direction': 'received'}, {'direction': 'sent', 'status': 'pending'}])
+    def test_api_proposal_list(self, client, another_user, proposal, params):
+        client.force_login(another_user)
+        assert_indexed(client, reverse('api_proposal_list'), params)
@@ -0,0 +1,99 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.urls import reverse
+
+from ads import ratelimit
+from ads.models import ExchangeProposal
+
+# Начало минутного окна
+NOW = 60 * 1_000_000
+
+
+class TestSlidingWindow:
+    """Тесты счетчика скользящего окна"""
+
+    @pytest.mark.parametrize('rate, expected', [('5/s', (5, 1)), ('10/m', (10, 60)), ('100/15m', (100, 900)),
+                                                ('3/d', (3, 86400))])
+    def test_parse_rate(self, rate, expected):
+        assert ratelimit.parse_rate(rate) == expected
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            ratelimit.parse_rate('10 per minute')
+
+    def test_limit_within_window(self):
+        assert [ratelimit.hit('test', 'a', 3, 60, NOW + i)[0] for i in range(4)] == [True, True, True, False]
+        assert ratelimit.hit('test', 'a', 3, 60, NOW + 10) == (False, 50)
+        # У другого ключа свой счетчик
+        assert ratelimit.hit('test', 'b', 3, 60, NOW + 10) == (True, 0)
+
+    def test_previous_window_counts_with_decaying_weight(self):
+        for i in range(3):
+            ratelimit.hit('test', 'a', 3, 60, NOW + 50 + i)
+        # В начале следующего окна почти все три запроса еще в скользящем окне
+        allowed, retry_after = ratelimit.hit('test', 'a', 3, 60, NOW + 65)
+        assert not allowed and 0 < retry_after <= 55
+        # В середине окна вес предыдущего - половина: 1.5 + 2 > 3
+        assert ratelimit.hit('test', 'a', 3, 60, NOW + 90)[0] is False
+        assert ratelimit.hit('test', 'b', 3, 60, NOW + 90)[0] is True
+
+    def test_ipv6_clients_grouped_by_network(self, rf):
+        first = rf.post('/', REMOTE_ADDR='2001:db8:1:2::10')
+        second = rf.post('/', REMOTE_ADDR='2001:db8:1:2:ffff::1')
+        assert ratelimit.ip_key(first) == ratelimit.ip_key(second) == 'ip:2001:db8:1:2::/64'
+
+    def test_proxy_header(self, rf, settings):
+        settings.ADS_RATE_LIMIT_IP_HEADER = 'HTTP_X_REAL_IP'
+        assert ratelimit.client_ip(rf.post('/', HTTP_X_REAL_IP='203.0.113.7')) == '203.0.113.7'
+        assert ratelimit.client_ip(rf.post('/', REMOTE_ADDR='198.51.100.1')) == '198.51.100.1'
+
+    def test_async_view(self, rf):
+        @ratelimit.rate_limit('test-async', '1/m')
+        async def view(request):
+            return HttpResponse('ok')
+
+        assert async_to_sync(view)(rf.post('/')).status_code == 200
+        assert async_to_sync(view)(rf.post('/')).status_code == 429
+
+
+@pytest.mark.django_db
+class TestThrottledViews:
+    """Тесты ограничения входа, регистрации и предложений обмена"""
+
+    def test_login_is_rejected_before_any_work(self, client, user, django_assert_num_queries):
+        data = {'username': user.username, 'password': 'wrong'}
+        for _ in range(10):
+            assert client.post(reverse('login'), data).status_code == 200
+        with django_assert_num_queries(0):
+            response = client.post(reverse('login'), data)
+        assert response.status_code == 429
+        assert int(response['Retry-After']) >= 1
+        # Форма входа открывается, и с другого адреса вход не ограничен
+        assert client.get(reverse('login')).status_code == 200
+        assert client.post(reverse('login'), data, REMOTE_ADDR='10.0.0.2').status_code == 200
+
+    def test_register(self, client, settings):
+        settings.ADS_RATE_LIMITS = {'register': '1/h'}
+        client.post(reverse('register'), {'username': 'first'})
+        assert client.post(reverse('register'), {'username': 'second'}).status_code == 429
+
+    def test_proposals_limited_per_user(self, client, settings, user, another_user, ad, another_ad):
+        settings.ADS_RATE_LIMITS = {'propose_exchange': '2/h'}
+        url = reverse('propose_exchange', kwargs={'ad_id': another_ad.pk})
+        client.force_login(user)
+        for _ in range(2):
+            assert client.post(url, {'sender_ad': ad.pk}).status_code == 302
+        assert client.post(url, {'sender_ad': ad.pk}).status_code == 429
+        assert ExchangeProposal.objects.count() == 2
+
+        # Лимит на пользователя, а не на адрес
+        client.force_login(another_user)
+        url = reverse('propose_exchange', kwargs={'ad_id': ad.pk})
+        assert client.post(url, {'sender_ad': another_ad.pk}).status_code == 302
+
+    def test_can_be_disabled(self, client, settings, user):
+        settings.ADS_RATE_LIMITS = {'login': '1/m'}
+        settings.ADS_RATE_LIMIT_ENABLED = False
+        for _ in range(3):
+            assert client.post(reverse('login'), {'username': user.username, 'password': 'x'}).status_code == 200
@@ -0,0 +1,67 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+
+from ads import search
+from ads.models import Ad
+
+
+@pytest.mark.django_db
+class TestFullTextSearch:
+    """Тесты полнотекстового поиска"""
+
+    def test_search_ranks_title_matches_first(self, user):
+        """Совпадение в заголовке релевантнее совпадения в описании"""
+        in_description = Ad.objects.create(
+            title='Книжная полка', description='Подойдет для велосипеда', category='home', condition='good', user=user
+        )
+        in_title = Ad.objects.create(
+            title='Горный велосипед', description='Почти новый', category='sport', condition='like_new', user=user
+        )
+        result = list(search.search_ads(Ad.objects.all(), 'велосипед'))
+        assert result == [in_title, in_description]
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='план запроса FTS5')
+    def test_index_is_searched_once(self, ad, another_ad):
+        """Релевантность берется из присоединенной таблицы индекса, а не из подзапроса на каждую строку"""
+        sql, params = search.search_ads(Ad.objects.all(), 'тестовое').query.sql_with_params()
+        assert sql.count('MATCH') == 1
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        assert not any('CORRELATED' in step for step in plan)
+
+    def test_search_matches_word_prefix(self, ad):
+        """Поиск по началу слова"""
+        assert ad in search.search_ads(Ad.objects.all(), 'тестов')
+
+    def test_index_follows_update_and_delete(self, ad):
+        """Индекс синхронизируется при изменении и удалении объявления"""
+        ad.title = 'Гитара акустическая'
+        ad.save()
+        assert ad in search.search_ads(Ad.objects.all(), 'гитара')
+        assert ad not in search.search_ads(Ad.objects.all(), 'тестовое')
+
+        ad_id = ad.pk
+        ad.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {search.FTS_TABLE} WHERE rowid = %s', [ad_id])
+            assert cursor.fetchone()[0] == 0
+
+    def test_rebuild_command_indexes_bulk_created_ads(self, user):
+        """Команда rebuild_search_index индексирует объявления, созданные через bulk_create"""
+        Ad.objects.bulk_create([
+            Ad(title=f'Самокат {i}', description='Детский', category='toys', condition='good', user=user)
+            for i in range(5)
+        ])
+        assert not search.search_ads(Ad.objects.all(), 'самокат').exists()
+
+        call_command('rebuild_search_index')
+        assert search.search_ads(Ad.objects.all(), 'самокат').count() == 5
+
+    def test_ad_list_uses_search_index(self, client, ad, another_ad):
+        """Поиск в ad_list возвращает только подходящие объявления"""
+        response = client.get(reverse('ad_list'), {'query': 'другое'})
+        ads_list = list(response.context['ads'])
+        assert ads_list == [another_ad]
@@ -0,0 +1,62 @@
+import pytest
+from django.urls import reverse
+
+from ads import views
+from ads.models import Ad
+
+
+def titles(response):
+    return [user_ad['title'] for user_ad in response.json()['results']]
+
+
+@pytest.fixture
+def own_ads(user):
+    return [Ad.objects.create(title=title, description='Описание', category='books', condition='good', user=user)
+            for title in ('Велосипед горный', 'велосипед детский', 'Гитара', 'Вешалка')]
+
+
+@pytest.mark.django_db
+class TestSenderAdAutocomplete:
+    """Тесты автодополнения объявления для предложения обмена"""
+
+    def url(self, ad):
+        return reverse('sender_ad_autocomplete', kwargs={'ad_id': ad.pk})
+
+    def test_prefix_is_case_insensitive(self, client, user, another_ad, own_ads):
+        client.force_login(user)
+        response = client.get(self.url(another_ad), {'q': '  ВЕЛОСИПЕД '})
+        assert titles(response) == ['Велосипед горный', 'велосипед детский']
+        assert response.json()['more'] is False
+
+    def test_empty_query_lists_by_title(self, client, user, ad, another_ad, own_ads):
+        client.force_login(user)
+        assert titles(client.get(self.url(another_ad))) == [
+            'Велосипед горный', 'велосипед детский', 'Вешалка', 'Гитара', 'Тестовое объявление',
+        ]
+
+    def test_excludes_target_and_foreign_ads(self, client, user, ad, another_ad):
+        client.force_login(user)
+        assert titles(client.get(self.url(ad))) == []
+        assert titles(client.get(self.url(another_ad), {'q': 'Другое'})) == []
+
+    def test_small_pages(self, client, monkeypatch, user, another_ad, own_ads):
+        monkeypatch.setattr(views, 'SENDER_ADS_PER_PAGE', 2)
+        client.force_login(user)
+        response = client.get(self.url(another_ad), {'q': 'в'})
+        assert titles(response) == ['Велосипед горный', 'велосипед детский']
+        assert response.json()['more'] is True
+
+    def test_title_change_updates_key(self, client, user, another_ad, own_ads):
+        own_ads[2].title = 'Скрипка'
+        own_ads[2].save(update_fields=['title'])
+        client.force_login(user)
+        assert titles(client.get(self.url(another_ad), {'q': 'скр'})) == ['Скрипка']
+
+    def test_requires_login(self, client, another_ad):
+        assert client.get(self.url(another_ad)).status_code == 302
+
+    def test_detail_page_does_not_embed_ads(self, client, user, another_ad, own_ads):
+        client.force_login(user)
+        response = client.get(reverse('ad_detail', kwargs={'pk': another_ad.pk}))
+        assert response.context['has_user_ads'] is True
+        assert 'Гитара' not in response.content.decode()
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from project import session_profiles
+
+
+def session_queries(ctx):
+    return [query['sql'] for query in ctx.captured_queries if '"django_session"' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestSessionProfiles:
+    """Тесты профилей хранения сессий и сообщений"""
+
+    def test_unknown_profile(self):
+        with pytest.raises(ImproperlyConfigured):
+            session_profiles.session_settings('redis')
+
+    @pytest.mark.parametrize('profile', ['cache', 'signed_cookies'])
+    def test_low_write_profiles_skip_session_table(self, client, user, another_ad, profile):
+        with override_settings(**session_profiles.session_settings(profile)):
+            with CaptureQueriesContext(connection) as ctx:
+                client.post(reverse('login'), {'username': 'testuser', 'password': 'testpassword'})
+                response = client.get(reverse('ad_detail', kwargs={'pk': another_ad.pk}))
+                client.get(reverse('logout'))
+        assert response.context['user'] == user
+        assert session_queries(ctx) == []
+
+    def test_messages_survive_redirect_in_cookie(self, client, user):
+        with override_settings(**session_profiles.session_settings('signed_cookies')):
+            response = client.post(reverse('login'), {'username': 'testuser', 'password': 'testpassword'},
+                                   follow=True)
+        assert 'Добро пожаловать, testuser!' in response.content.decode()
+
+    def test_unchanged_session_is_not_saved(self, client, user, ad):
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(reverse('ad_detail', kwargs={'pk': ad.pk}))
+        assert not any(sql.startswith(('INSERT', 'UPDATE', 'DELETE')) for sql in session_queries(ctx))
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_benchmark_reports_session_writes(self, tmp_path):
+        output = tmp_path / 'sessions.json'
+        call_command('benchmark_sessions', '--rounds', '1', '--profiles', 'db', 'signed_cookies',
+                     '--output', str(output), stdout=open(tmp_path / 'stdout.txt', 'w'))
+        report = json.loads(output.read_text())
+        assert report['db']['session_writes_per_view'] > 0
+        assert report['signed_cookies']['session_writes_per_view'] == 0
+        assert report['signed_cookies']['db_writes'] < report['db']['db_writes']
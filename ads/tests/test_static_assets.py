@@ -0,0 +1,94 @@
+import gzip
+
+import pytest
+from django.core.management import call_command
+from django.template import Context, Template
+from django.http import Http404
+
+from ads import staticfiles, vendor
+
+CSS = (
+    '/*! Bootstrap */:root{--bs-blue:#0d6efd}body{margin:0}'
+    '.btn,.carousel{display:inline-block}.carousel-item{display:none}'
+    '.btn:not(.collapsed){color:red}'
+    '@media (min-width:576px){.container{max-width:540px}.modal-dialog{margin:auto}}'
+    '@media print{.toast{display:none}}'
+    '@font-face{font-family:x;src:url("fonts/x.woff2?1")}'
+    '.bi-github::before{content:"\\f3ed"}.bi-alarm::before{content:"{"}'
+)
+
+
+def render(name):
+    return Template('{% load vendor_assets %}{% vendor_asset name %}').render(Context({'name': name}))
+
+
+class TestPurgeCss:
+    """Тесты урезания CSS до используемых классов"""
+
+    def test_keeps_only_used_rules(self):
+        purged = vendor.purge_css(CSS, {'btn', 'container', 'bi-github'})
+        assert purged == (
+            '/*! Bootstrap */:root{--bs-blue:#0d6efd}body{margin:0}'
+            '.btn{display:inline-block}'
+            '.btn:not(.collapsed){color:red}'
+            '@media (min-width:576px){.container{max-width:540px}}'
+            '@font-face{font-family:x;src:url("fonts/x.woff2?1")}'
+            '.bi-github::before{content:"\\f3ed"}'
+        )
+
+    def test_used_classes_come_from_templates_and_forms(self):
+        used = vendor.used_classes()
+        # Классы из шаблонов, из атрибутов виджетов форм и из JS Bootstrap
+        assert {'btn-primary', 'form-control', 'bi-github', 'show'} <= used
+        assert 'carousel-item' not in used
+
+
+class TestStaticPipeline:
+    """Тесты сборки и раздачи статических файлов"""
+
+    @pytest.fixture
+    def collected(self, tmp_path, settings):
+        source = tmp_path / 'static'
+        (source / 'vendor' / 'bootstrap').mkdir(parents=True)
+        (source / 'vendor' / 'bootstrap' / 'bootstrap.purged.css').write_text('.btn{color:red}' * 100)
+        settings.STATICFILES_DIRS = [source]
+        settings.STATIC_ROOT = tmp_path / 'collected'
+        call_command('collectstatic', '--noinput', '-v', '0', '-i', 'admin', '-i', 'rest_framework')
+        return settings.STATIC_ROOT
+
+    def test_collectstatic_hashes_and_precompresses(self, collected):
+        (hashed,) = (collected / 'vendor' / 'bootstrap').glob('bootstrap.purged.*.css')
+        assert gzip.decompress(hashed.with_name(hashed.name + '.gz').read_bytes()) == hashed.read_bytes()
+
+    def test_template_uses_local_copy(self, collected):
+        html = render('bootstrap-css')
+        assert 'cdn.jsdelivr.net' not in html
+        assert '/static/vendor/bootstrap/bootstrap.purged.' in html
+
+    def test_serve_precompressed_immutable(self, rf, collected):
+        (hashed,) = (collected / 'vendor' / 'bootstrap').glob('bootstrap.purged.*.css')
+        path = f'vendor/bootstrap/{hashed.name}'
+        response = staticfiles.serve(rf.get('/', headers={'accept-encoding': 'gzip, deflate'}), path)
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Content-Type'].startswith('text/css')
+        assert 'immutable' in response['Cache-Control']
+        assert response['Vary'] == 'Accept-Encoding'
+        assert b''.join(response.streaming_content) == hashed.with_name(hashed.name + '.gz').read_bytes()
+
+        plain = staticfiles.serve(rf.get('/'), path)
+        assert 'Content-Encoding' not in plain
+        with pytest.raises(Http404):
+            staticfiles.serve(rf.get('/'), '../settings.py')
+
+    def test_cdn_fallback_until_vendored(self, tmp_path, settings):
+        settings.STATICFILES_DIRS = [tmp_path]
+        settings.STATIC_ROOT = tmp_path / 'collected'
+        html = render('bootstrap-js')
+        assert 'cdn.jsdelivr.net' in html
+        assert f'integrity="{vendor.ASSETS["bootstrap-js"].source.integrity}"' in html
+
+    def test_small_files_are_not_compressed(self, tmp_path):
+        small = tmp_path / 'small.css'
+        small.write_text('a{}')
+        staticfiles.compress_file(small)
+        assert not (tmp_path / 'small.css.gz').exists()
@@ -0,0 +1,114 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ads import cache, thumbnails
+from ads.management.commands import generate_thumbnails
+from ads.models import Ad
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    with override_settings(MEDIA_ROOT=str(tmp_path)):
+        yield tmp_path
+
+
+def upload(name):
+    buffer = BytesIO()
+    Image.new('RGB', (1200, 900), 'orange').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+def variants_exist(name):
+    return [default_storage.exists(thumbnails.variant_name(name, width, ext))
+            for width in thumbnails.THUMBNAIL_WIDTHS for ext in thumbnails.FORMATS]
+
+
+@pytest.fixture
+def ad_with_image(user, media_root):
+    return Ad.objects.create(
+        title='Фотоаппарат', description='С объективом', category='electronics', condition='good', user=user,
+        image_url=upload('camera.jpg'),
+    )
+
+
+@pytest.mark.django_db
+class TestThumbnails:
+    """Тесты генерации миниатюр"""
+
+    def test_generation_is_deferred_until_commit(self, ad_with_image, django_capture_on_commit_callbacks):
+        """Изображение не обрабатывается в запросе, задача ставится на коммит"""
+        assert thumbnails.needs_thumbnails(ad_with_image)
+        with django_capture_on_commit_callbacks() as callbacks:
+            ad_with_image.save()
+        assert callbacks
+
+    def test_render_variants(self, ad_with_image):
+        """Строятся варианты всех размеров в WebP и JPEG"""
+        name = ad_with_image.image_url.name
+        thumbnails.render_variants(name)
+        for width in thumbnails.THUMBNAIL_WIDTHS:
+            for ext in ('webp', 'jpg'):
+                with default_storage.open(thumbnails.variant_name(name, width, ext)) as variant:
+                    assert Image.open(variant).size == (width, width * 3 // 4)
+
+    def test_list_uses_srcset_once_ready(self, client, ad_with_image):
+        """Список объявлений выводит srcset после построения миниатюр"""
+        assert 'srcset' not in client.get(reverse('ad_list')).content.decode()
+
+        thumbnails.process_ad_image(ad_with_image.pk, ad_with_image.image_url.name)
+        html = client.get(reverse('ad_list')).content.decode()
+        assert 'type="image/webp"' in html
+        assert thumbnails.variant_name(ad_with_image.image_url.name, 320, 'webp') in html
+
+    def test_backfill_command(self, ad_with_image):
+        """Команда generate_thumbnails обрабатывает изображения без миниатюр"""
+        call_command('generate_thumbnails', workers=1)
+        ad_with_image.refresh_from_db()
+        assert not thumbnails.needs_thumbnails(ad_with_image)
+
+    def test_backfill_in_batches_bumps_cache_once(self, user, ad_with_image, monkeypatch):
+        """Команда читает объявления пачками и сбрасывает кэш страниц один раз в конце"""
+        for name in ('first.jpg', 'second.jpg'):
+            Ad.objects.create(title='Объектив', description='Светосильный', category='electronics',
+                              condition='good', user=user, image_url=upload(name))
+        bumps = []
+        monkeypatch.setattr(cache, 'bump_generation', lambda: bumps.append(1))
+        monkeypatch.setattr(generate_thumbnails, 'TASKS_PER_WORKER', 1)
+        call_command('generate_thumbnails', workers=1)
+        assert not any(thumbnails.needs_thumbnails(ad) for ad in Ad.objects.all())
+        assert len(bumps) == 1
+
+    def test_replaced_image_variants_are_deleted(self, ad_with_image, django_capture_on_commit_callbacks):
+        """Варианты прежнего изображения удаляются, как только готовы варианты нового"""
+        old = ad_with_image.image_url.name
+        thumbnails.process_ad_image(ad_with_image.pk, old)
+        ad_with_image.refresh_from_db()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ad_with_image.image_url = upload('lens.jpg')
+            ad_with_image.save()
+        assert not any(variants_exist(old))
+        assert all(variants_exist(ad_with_image.image_url.name))
+
+    def test_outdated_variants_are_discarded(self, ad_with_image):
+        """Варианты изображения, смененного во время обработки, не остаются в хранилище"""
+        name = ad_with_image.image_url.name
+        Ad.objects.filter(pk=ad_with_image.pk).update(image_url='ads/other.jpg')
+        thumbnails.process_ad_image(ad_with_image.pk, name)
+        assert not any(variants_exist(name))
+
+    def test_variants_are_deleted_with_ad(self, ad_with_image, django_capture_on_commit_callbacks):
+        """Удаление объявления удаляет его миниатюры после коммита"""
+        name = ad_with_image.image_url.name
+        thumbnails.process_ad_image(ad_with_image.pk, name)
+        ad = Ad.objects.get(pk=ad_with_image.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            ad.delete()
+        assert not any(variants_exist(name))
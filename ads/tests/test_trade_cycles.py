@@ -0,0 +1,148 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from ads import trade_cycles
+from ads.models import Ad, ExchangeProposal
+
+
+def build_graph(edges, owners=None):
+    """Граф из пар (отправитель, получатель); по умолчанию у каждого объявления свой владелец"""
+    graph = trade_cycles.TradeGraph()
+    owners = owners or {}
+    for proposal_id, (sender, receiver) in enumerate(edges, start=1):
+        graph.add_edge(proposal_id, sender, receiver, owners.get(sender, sender), owners.get(receiver, receiver))
+    return graph
+
+
+class QueuedExecutor:
+    """Откладывает задачи до явного запуска"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, func, *args):
+        self.jobs.append((func, args))
+
+    def run(self):
+        for func, args in self.jobs:
+            func(*args)
+
+
+class TestTradeGraph:
+    """Тесты поиска циклов в графе предложений"""
+
+    def test_finds_triangle_once(self):
+        graph = build_graph([(1, 2), (2, 3), (3, 1), (3, 4)])
+        assert graph.find_cycles() == [(1, 2, 3)]
+
+    def test_two_party_swap_is_not_a_chain(self):
+        graph = build_graph([(1, 2), (2, 1)])
+        assert graph.find_cycles() == []
+
+    def test_respects_max_length(self):
+        edges = [(i, i + 1) for i in range(1, 6)] + [(6, 1)]
+        assert build_graph(edges).find_cycles(max_length=5) == []
+        assert build_graph(edges).find_cycles(max_length=6) == [(1, 2, 3, 4, 5, 6)]
+
+    def test_participants_are_distinct(self):
+        """Пользователь не может участвовать в цепочке дважды"""
+        graph = build_graph([(1, 2), (2, 3), (3, 4), (4, 1)], owners={1: 10, 2: 20, 3: 10, 4: 40})
+        assert graph.find_cycles() == []
+
+    def test_remove_edge_breaks_cycle(self):
+        graph = build_graph([(1, 2), (2, 3), (3, 1)])
+        graph.remove_edge(3)
+        assert graph.find_cycles() == []
+        assert graph.stats() == {'ads': 3, 'edges': 2, 'users': 3}
+
+    def test_duplicate_proposals_keep_edge(self):
+        """Ребро остается, пока есть хотя бы одно ожидающее предложение"""
+        graph = build_graph([(1, 2), (2, 3), (3, 1), (1, 2)])
+        graph.remove_edge(1)
+        assert graph.find_cycles() == [(1, 2, 3)]
+
+    def test_cycles_for_user_start_with_own_ad(self):
+        graph = build_graph([(1, 2), (2, 3), (3, 1)], owners={1: 10, 2: 20, 3: 30})
+        assert graph.cycles_for_user(20) == [(2, 3, 1)]
+        assert graph.cycles_for_user(99) == []
+
+
+@pytest.fixture
+def chain(user, another_user, ad, another_ad):
+    """Цепочка ad -> another_ad -> third_ad -> ad из трех пользователей"""
+    third_user = User.objects.create_user(username='thirduser', password='thirdpassword')
+    third_ad = Ad.objects.create(title='Третье объявление', description='Описание', category='home',
+                                 condition='good', user=third_user)
+    return [
+        ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=another_ad),
+        ExchangeProposal.objects.create(ad_sender=another_ad, ad_receiver=third_ad),
+        ExchangeProposal.objects.create(ad_sender=third_ad, ad_receiver=ad),
+    ]
+
+
+@pytest.mark.django_db
+class TestTradeCycleSuggestions:
+    """Тесты цепочек обмена на странице предложений"""
+
+    def test_my_proposals_shows_chain(self, client, user, ad, chain):
+        client.force_login(user)
+        response = client.get(reverse('my_proposals'))
+        [cycle] = response.context['trade_cycles']
+        assert cycle.ads[0] == ad
+        assert [wanted.pk for _, wanted in cycle.steps] == [p.ad_receiver_id for p in chain]
+        assert 'Возможные цепочки обмена' in response.content.decode()
+
+    def test_graph_follows_status_changes(self, user, chain, django_capture_on_commit_callbacks):
+        trade_cycles.graph.load()
+        with django_capture_on_commit_callbacks(execute=True):
+            chain[1].status = 'rejected'
+            chain[1].save()
+        assert trade_cycles.suggestions_for_user(user) == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            chain[1].status = 'pending'
+            chain[1].save()
+        assert len(trade_cycles.suggestions_for_user(user)) == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            chain[2].delete()
+        assert trade_cycles.suggestions_for_user(user) == []
+
+    def test_stale_graph_is_served_while_reloading(self, settings, monkeypatch, user, chain):
+        trade_cycles.graph.load()
+        executor = QueuedExecutor()
+        monkeypatch.setattr(trade_cycles, 'get_executor', lambda: executor)
+        settings.ADS_TRADE_GRAPH_MAX_AGE = 0
+        ExchangeProposal.objects.filter(pk=chain[0].pk).update(status='rejected')
+        # Перезагрузка поставлена в очередь один раз, а ответ - по прежнему графу
+        assert len(trade_cycles.suggestions_for_user(user)) == 1
+        assert len(trade_cycles.suggestions_for_user(user)) == 1
+        assert len(executor.jobs) == 1
+
+        executor.run()
+        assert trade_cycles.suggestions_for_user(user) == []
+
+    def test_changes_during_reload_are_replayed(self, monkeypatch, user, chain):
+        add_edge = trade_cycles.TradeGraph.add_edge
+
+        def add_edge_then_reject(graph, proposal_id, *args):
+            add_edge(graph, proposal_id, *args)
+            if graph is not trade_cycles.graph and proposal_id == chain[0].pk:
+                # Предложение отклонено, пока загрузка читает строки
+                trade_cycles.graph.apply(proposal_id, *args, False)
+
+        monkeypatch.setattr(trade_cycles.TradeGraph, 'add_edge', add_edge_then_reject)
+        trade_cycles.graph.load()
+        assert trade_cycles.graph.stats()['edges'] == 2
+
+    def test_command_scans_graph(self, chain, tmp_path):
+        output = tmp_path / 'cycles.jsonl'
+        stdout = StringIO()
+        call_command('find_trade_cycles', output=str(output), stdout=stdout)
+        assert 'Найдено циклов: 1' in stdout.getvalue()
+        assert json.loads(output.read_text()) == [proposal.ad_sender_id for proposal in chain]
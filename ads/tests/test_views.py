@@ -1,65 +1,9 @@
 import pytest
-from django.test import Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from ads.models import Ad, ExchangeProposal
 
 
-@pytest.fixture
-def client():
-    return Client()
-
-
-@pytest.fixture
-def user():
-    return User.objects.create_user(
-        username='testuser',
-        email='test@example.com',
-        password='testpassword'
-    )
-
-
-@pytest.fixture
-def another_user():
-    return User.objects.create_user(
-        username='anotheruser',
-        email='another@example.com',
-        password='anotherpassword'
-    )
-
-
-@pytest.fixture
-def ad(user):
-    return Ad.objects.create(
-        title='Тестовое объявление',
-        description='Описание тестового объявления',
-        category='electronics',
-        condition='new',
-        user=user
-    )
-
-
-@pytest.fixture
-def another_ad(another_user):
-    return Ad.objects.create(
-        title='Другое объявление',
-        description='Описание другого объявления',
-        category='books',
-        condition='good',
-        user=another_user
-    )
-
-
-@pytest.fixture
-def proposal(ad, another_ad):
-    return ExchangeProposal.objects.create(
-        ad_sender=ad,
-        ad_receiver=another_ad,
-        comment='Предлагаю обмен',
-        status='pending'
-    )
-
-
 @pytest.mark.django_db
 class TestAuthViews:
     """Тесты для функций аутентификации"""
@@ -288,9 +232,7 @@ class TestProposalViews:
         client.force_login(user)
         response = client.get(reverse('my_proposals'))
         assert response.status_code == 200
-        assert 'sent_proposals' in response.context
-        assert 'received_proposals' in response.context
-        assert list(response.context['sent_proposals']) == [proposal]
+        assert [(entry.proposal, entry.direction) for entry in response.context['page_obj']] == [(proposal, 'sent')]
 
     def test_my_proposals_view_requires_login(self, client):
         """Тест требования авторизации для просмотра предложений"""
@@ -407,5 +349,5 @@ class TestProposalPermissions:
         client.force_login(another_user)
         response = client.get(reverse('my_proposals'))
         assert response.status_code == 200
-        assert list(response.context['received_proposals']) == [proposal]
-        assert list(response.context['sent_proposals']) == []
\ No newline at end of file
+        entries = response.context['page_obj']
+        assert [(entry.proposal, entry.direction) for entry in entries] == [(proposal, 'received')]
\ No newline at end of file
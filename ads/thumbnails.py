@@ -0,0 +1,133 @@
+"""
+Уменьшенные копии изображений объявлений.
+
+Для каждого загруженного изображения строятся варианты шириной
+THUMBNAIL_WIDTHS в форматах WebP и JPEG. Генерация идет в пуле потоков
+после коммита транзакции, а не в обработчике запроса; для уже загруженных
+изображений есть команда generate_thumbnails.
+
+Ad.thumbnails_source хранит имя файла, для которого варианты готовы:
+пока оно не совпадает с image_url, шаблоны выводят оригинал. Варианты
+прежнего изображения удаляются той же задачей, как только готовы новые,
+а при удалении объявления - отдельной задачей после коммита.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = (160, 320, 640)
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 75, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 80, 'optimize': True, 'progressive': True},
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(name, width, ext):
+    """Имя файла варианта: ads/photo.png -> thumbs/ads/photo_320.webp"""
+    stem = os.path.splitext(name)[0]
+    return f'thumbs/{stem}_{width}.{ext}'
+
+
+def variant_urls(name, ext):
+    """Пары (url, ширина) для атрибута srcset"""
+    return [(default_storage.url(variant_name(name, width, ext)), width) for width in THUMBNAIL_WIDTHS]
+
+
+def render_variants(name, storage=None):
+    """Строит и сохраняет все варианты изображения. Не обращается к БД"""
+    storage = storage or default_storage
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.load()
+
+    for width in THUMBNAIL_WIDTHS:
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for ext, options in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, **options)
+            target = variant_name(name, width, ext)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+    return name
+
+
+def delete_variants(name, storage=None):
+    """Удаляет все варианты изображения. Не обращается к БД"""
+    storage = storage or default_storage
+    for width in THUMBNAIL_WIDTHS:
+        for ext in FORMATS:
+            storage.delete(variant_name(name, width, ext))
+
+
+def mark_ready(ad_id, name, bump=True):
+    """
+    Отмечает варианты готовыми, если изображение не сменилось за время обработки.
+    bump=False - не сбрасывать кэш страниц: массовая обработка сбрасывает его один раз в конце
+    """
+    from . import cache
+    from .models import Ad
+
+    updated = Ad.objects.filter(pk=ad_id, image_url=name).update(thumbnails_source=name)
+    if updated and bump:
+        # update() не отправляет сигналы, а закэшированные страницы ссылаются на оригинал
+        cache.bump_generation()
+    return updated
+
+
+def process_ad_image(ad_id, name, previous=''):
+    try:
+        render_variants(name)
+        if mark_ready(ad_id, name):
+            if previous and previous != name:
+                delete_variants(previous)
+        else:
+            # Изображение сменилось или объявление удалено, пока строились варианты
+            delete_variants(name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры для %s', name)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ADS_THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def schedule(ad):
+    """Ставит генерацию вариантов в очередь после коммита текущей транзакции"""
+    ad_id, name, previous = ad.pk, ad.image_url.name, ad.thumbnails_source
+    transaction.on_commit(lambda: get_executor().submit(process_ad_image, ad_id, name, previous))
+
+
+def schedule_delete(name):
+    """Ставит удаление вариантов в очередь после коммита текущей транзакции"""
+    transaction.on_commit(lambda: get_executor().submit(delete_variants, name))
+
+
+def needs_thumbnails(ad):
+    return bool(ad.image_url) and ad.thumbnails_source != ad.image_url.name
@@ -0,0 +1,336 @@
+"""
+Поиск цепочек обмена между несколькими участниками.
+
+Ожидающие предложения образуют ориентированный граф объявлений: ребро
+ad_sender -> ad_receiver значит, что владелец ad_sender готов отдать его за
+ad_receiver. Цикл A -> B -> C -> A - это обмен по кругу: владелец A получает
+B, владелец B получает C, владелец C получает A. Предлагаются циклы длины
+3-5, в которых все участники разные (цикл длины 2 - обычный обмен).
+
+Граф хранится в памяти процесса и обновляется после коммита при каждом
+изменении предложения (см. signals.py). Изменения из других процессов и
+bulk-операций, минующих сигналы, подхватываются полной перезагрузкой раз в
+ADS_TRADE_GRAPH_MAX_AGE секунд. Перезагрузка идет в фоновом потоке, а
+запросы тем временем работают с прежним графом; изменения, примененные во
+время загрузки, повторяются на новом графе перед подменой. Пока граф не
+загружен впервые, цепочки не предлагаются.
+
+Поиск - обход в глубину, ограниченный длиной цикла: сначала обратным
+обходом считается расстояние до стартовой вершины, затем прямой обход идет
+только по вершинам, из которых можно вернуться, не превысив длину цикла.
+Отсечения сильно сокращают перебор на практике, но в худшем случае число
+путей растет как степень исходящих ребер в степени длины цикла. При полном
+обходе графа вершины без входящих или исходящих ребер заранее
+отбрасываются, а каждый цикл ищется только из своей минимальной вершины.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import Ad, ExchangeProposal
+
+logger = logging.getLogger(__name__)
+
+MIN_LENGTH = 3
+MAX_LENGTH = 5
+SUGGESTIONS_LIMIT = 5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trade-graph')
+        return _executor
+
+
+class TradeGraph:
+    """Граф ожидающих предложений обмена"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+        self._loaded_at = None
+        # Изменения, пришедшие во время загрузки; None - загрузка не идет
+        self._journal = None
+        self._refreshing = False
+
+    def _clear(self):
+        # Число ожидающих предложений по каждому ребру: между двумя объявлениями их может быть несколько
+        self._out = defaultdict(dict)
+        self._in = defaultdict(dict)
+        self._edges = {}
+        self._ad_edges = defaultdict(set)
+        self._owner = {}
+        self._user_ads = defaultdict(set)
+
+    @property
+    def is_loaded(self):
+        return self._loaded_at is not None
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+            self._loaded_at = None
+
+    def load(self):
+        """Полная загрузка ожидающих предложений из БД"""
+        with self._lock:
+            self._journal = []
+        fresh = TradeGraph()
+        fresh._loaded_at = time.monotonic()
+        try:
+            rows = (
+                ExchangeProposal.objects.filter(status='pending')
+                .values_list('id', 'ad_sender_id', 'ad_receiver_id', 'sender_user_id', 'receiver_user_id')
+                .iterator(chunk_size=10_000)
+            )
+            for row in rows:
+                fresh.add_edge(*row)
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            # Изменения могли закоммититься после чтения своих строк: повторять их безопасно
+            for method, args in self._journal:
+                getattr(fresh, method)(*args)
+            self._journal = None
+            self._out, self._in, self._edges, self._ad_edges = fresh._out, fresh._in, fresh._edges, fresh._ad_edges
+            self._owner, self._user_ads = fresh._owner, fresh._user_ads
+            self._loaded_at = fresh._loaded_at
+
+    def _record(self, method, *args):
+        """Запоминает изменение для графа, который сейчас загружается"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((method, args))
+
+    def ensure_loaded(self):
+        """Ставит перезагрузку в фоновый поток, если граф устарел; не ждет ее"""
+        max_age = getattr(settings, 'ADS_TRADE_GRAPH_MAX_AGE', 300)
+        with self._lock:
+            if self._refreshing:
+                return
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at <= max_age:
+                return
+            self._refreshing = True
+        get_executor().submit(self._load_in_background)
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception('Не удалось перезагрузить граф цепочек обмена')
+        finally:
+            self._refreshing = False
+            close_old_connections()
+
+    def add_edge(self, proposal_id, sender_ad, receiver_ad, sender_user, receiver_user):
+        with self._lock:
+            if proposal_id in self._edges:
+                return
+            self._edges[proposal_id] = (sender_ad, receiver_ad)
+            self._out[sender_ad][receiver_ad] = self._out[sender_ad].get(receiver_ad, 0) + 1
+            self._in[receiver_ad][sender_ad] = self._in[receiver_ad].get(sender_ad, 0) + 1
+            for ad_id, user_id in ((sender_ad, sender_user), (receiver_ad, receiver_user)):
+                self._ad_edges[ad_id].add(proposal_id)
+                self._owner[ad_id] = user_id
+                self._user_ads[user_id].add(ad_id)
+
+    def remove_edge(self, proposal_id):
+        with self._lock:
+            edge = self._edges.pop(proposal_id, None)
+            if edge is None:
+                return
+            sender_ad, receiver_ad = edge
+            self._decrement(self._out, sender_ad, receiver_ad)
+            self._decrement(self._in, receiver_ad, sender_ad)
+            for ad_id in edge:
+                self._ad_edges[ad_id].discard(proposal_id)
+                if not self._ad_edges[ad_id]:
+                    del self._ad_edges[ad_id]
+                if ad_id not in self._out and ad_id not in self._in:
+                    user_id = self._owner.pop(ad_id)
+                    self._user_ads[user_id].discard(ad_id)
+                    if not self._user_ads[user_id]:
+                        del self._user_ads[user_id]
+
+    @staticmethod
+    def _decrement(adjacency, node, neighbour):
+        edges = adjacency[node]
+        edges[neighbour] -= 1
+        if not edges[neighbour]:
+            del edges[neighbour]
+            if not edges:
+                del adjacency[node]
+
+    def apply(self, proposal_id, sender_ad, receiver_ad, sender_user, receiver_user, pending):
+        """Учитывает новое состояние предложения; до первой загрузки ничего не делает"""
+        self._record('apply', proposal_id, sender_ad, receiver_ad, sender_user, receiver_user, pending)
+        if not self.is_loaded:
+            return
+        with self._lock:
+            self.remove_edge(proposal_id)
+            if pending:
+                self.add_edge(proposal_id, sender_ad, receiver_ad, sender_user, receiver_user)
+
+    def discard_proposals(self, proposal_ids):
+        """Убирает предложения, переставшие ожидать ответа (bulk UPDATE не вызывает сигналы)"""
+        self._record('discard_proposals', list(proposal_ids))
+        if not self.is_loaded:
+            return
+        with self._lock:
+            for proposal_id in proposal_ids:
+                self.remove_edge(proposal_id)
+
+    def discard_ads(self, ad_ids):
+        """Убирает все предложения с участием объявлений, например после принятого обмена"""
+        self._record('discard_ads', list(ad_ids))
+        if not self.is_loaded:
+            return
+        with self._lock:
+            for ad_id in ad_ids:
+                for proposal_id in list(self._ad_edges.get(ad_id, ())):
+                    self.remove_edge(proposal_id)
+
+    def stats(self):
+        with self._lock:
+            return {'ads': len(self._owner), 'edges': len(self._edges), 'users': len(self._user_ads)}
+
+    def _distances_to(self, target, max_depth, allowed):
+        """Наименьшее число ребер от вершин до target, не больше max_depth"""
+        distances = {target: 0}
+        frontier = [target]
+        for depth in range(1, max_depth + 1):
+            next_frontier = []
+            for node in frontier:
+                for previous in self._in.get(node, ()):
+                    if previous not in distances and allowed(previous):
+                        distances[previous] = depth
+                        next_frontier.append(previous)
+            frontier = next_frontier
+        return distances
+
+    def _cycles_from(self, start, min_length, max_length, allowed):
+        distances = self._distances_to(start, max_length - 1, allowed)
+        path = [start]
+        users = {self._owner[start]}
+
+        def extend(node):
+            for following in self._out.get(node, ()):
+                if following == start:
+                    if len(path) >= min_length:
+                        yield tuple(path)
+                    continue
+                distance = distances.get(following)
+                if distance is None or len(path) + distance > max_length:
+                    continue
+                owner = self._owner[following]
+                if owner in users:
+                    continue
+                path.append(following)
+                users.add(owner)
+                yield from extend(following)
+                path.pop()
+                users.discard(owner)
+
+        yield from extend(start)
+
+    def _cyclic_candidates(self):
+        """Вершины, оставшиеся после удаления вершин без входящих или исходящих ребер"""
+        alive = {node for node in self._out if node in self._in}
+        in_degree = {node: sum(1 for previous in self._in[node] if previous in alive) for node in alive}
+        out_degree = {node: sum(1 for following in self._out[node] if following in alive) for node in alive}
+        queue = [node for node in alive if not in_degree[node] or not out_degree[node]]
+        while queue:
+            node = queue.pop()
+            if node not in alive:
+                continue
+            alive.discard(node)
+            for following in self._out[node]:
+                if following in alive:
+                    in_degree[following] -= 1
+                    if not in_degree[following]:
+                        queue.append(following)
+            for previous in self._in[node]:
+                if previous in alive:
+                    out_degree[previous] -= 1
+                    if not out_degree[previous]:
+                        queue.append(previous)
+        return alive
+
+    def find_cycles(self, min_length=MIN_LENGTH, max_length=MAX_LENGTH, limit=None):
+        """Все циклы графа; каждый начинается со своего наименьшего id объявления"""
+        cycles = []
+        with self._lock:
+            candidates = self._cyclic_candidates()
+            for start in sorted(candidates):
+                def allowed(node, start=start):
+                    return node > start and node in candidates
+
+                for cycle in self._cycles_from(start, min_length, max_length, allowed):
+                    cycles.append(cycle)
+                    if limit is not None and len(cycles) >= limit:
+                        return cycles
+        return cycles
+
+    def cycles_for_user(self, user_id, min_length=MIN_LENGTH, max_length=MAX_LENGTH, limit=SUGGESTIONS_LIMIT):
+        """Циклы через объявления пользователя; первым в цикле идет его объявление"""
+        cycles = []
+        with self._lock:
+            for ad_id in sorted(self._user_ads.get(user_id, ())):
+                if ad_id not in self._out or ad_id not in self._in:
+                    continue
+                for cycle in self._cycles_from(ad_id, min_length, max_length, lambda node: True):
+                    cycles.append(cycle)
+                    if len(cycles) >= limit:
+                        return cycles
+        return cycles
+
+
+class TradeCycle:
+    """Цепочка объявлений для вывода в шаблоне"""
+
+    def __init__(self, ads):
+        self.ads = ads
+
+    @property
+    def steps(self):
+        """Пары (что отдает участник, что получает)"""
+        return [(ad, self.ads[(index + 1) % len(self.ads)]) for index, ad in enumerate(self.ads)]
+
+    def __len__(self):
+        return len(self.ads)
+
+
+# Один граф на процесс
+graph = TradeGraph()
+
+
+def sync_proposal(proposal, deleted=False):
+    """Обновляет граф после коммита транзакции, в которой изменилось предложение"""
+    args = (proposal.pk, proposal.ad_sender_id, proposal.ad_receiver_id,
+            proposal.sender_user_id, proposal.receiver_user_id,
+            not deleted and proposal.status == 'pending')
+    transaction.on_commit(lambda: graph.apply(*args))
+
+
+def suggestions_for_user(user, limit=SUGGESTIONS_LIMIT):
+    """Цепочки обмена с участием объявлений пользователя по текущему, возможно устаревшему, графу"""
+    graph.ensure_loaded()
+    cycles = graph.cycles_for_user(user.pk, limit=limit)
+    if not cycles:
+        return []
+    ads = (Ad.objects.select_related('user').only('id', 'title', 'user__username')
+           .in_bulk({ad_id for cycle in cycles for ad_id in cycle}))
+    # Объявление могло быть удалено в другом процессе, пока граф еще не перезагружен
+    return [TradeCycle([ads[ad_id] for ad_id in cycle]) for cycle in cycles if all(ad_id in ads for ad_id in cycle)]
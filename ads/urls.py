@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 from .views import logout_view
 
 urlpatterns = [
@@ -9,11 +9,23 @@ urlpatterns = [
 
     path('', views.ad_list, name='ad_list'),
     path('ads/<int:pk>/', views.ad_detail, name='ad_detail'),
+    path('ads/facets/', views.ad_facets, name='ad_facets'),
     path('ads/new/', views.ad_create, name='ad_create'),
     path('ads/<int:pk>/edit/', views.ad_update, name='ad_update'),
     path('ads/<int:pk>/delete/', views.ad_delete, name='ad_delete'),
 
     path('ads/<int:ad_id>/propose-exchange/', views.create_exchange_proposal, name='propose_exchange'),
+    path('ads/<int:ad_id>/sender-ads/', views.sender_ad_autocomplete, name='sender_ad_autocomplete'),
     path('my-proposals/', views.my_proposals, name='my_proposals'),
+    path('my-proposals/inbox/', views.proposal_inbox, name='proposal_inbox'),
+    path('my-proposals/entries/<int:proposal_id>/', views.proposal_entry, name='proposal_entry'),
+    path('my-proposals/events/', views.proposal_events, name='proposal_events'),
     path('proposals/<int:proposal_id>/update-status/', views.update_proposal_status, name='update_proposal_status'),
+    path('proposals/batch/', views.update_proposals_batch, name='update_proposals_batch'),
+
+    path('perf/', views.performance_stats, name='performance_stats'),
+
+    path('api/ads/', api.ad_list, name='api_ad_list'),
+    path('api/ads/<int:pk>/', api.ad_detail, name='api_ad_detail'),
+    path('api/proposals/', api.proposal_list, name='api_proposal_list'),
 ]
\ No newline at end of file
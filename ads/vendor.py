@@ -0,0 +1,204 @@
+"""
+Сторонние CSS и JS, которые раньше подключались с cdn.jsdelivr.net.
+
+Команда vendor_static скачивает закрепленные версии в static/vendor/
+(проверяя SRI-хэш, где он опубликован) и собирает урезанные копии CSS:
+из Bootstrap и Bootstrap Icons остаются только правила, все классы
+которых встречаются в шаблонах, формах и тегах шаблонов проекта.
+Урезанные файлы нужно пересобирать (vendor_static --purge-only), когда в
+шаблонах появляются новые классы.
+
+Тег {% vendor_asset %} подключает локальную копию, а пока ее нет -
+исходный файл с CDN с атрибутом integrity.
+"""
+import base64
+import hashlib
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+BOOTSTRAP_CDN = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist'
+ICONS_CDN = 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font'
+
+
+@dataclass(frozen=True)
+class VendorFile:
+    path: str
+    url: str
+    integrity: str = ''
+
+
+@dataclass(frozen=True)
+class VendorAsset:
+    """Ресурс страницы: исходный файл и то, что подключается локально"""
+    source: VendorFile
+    # Урезанная копия исходного CSS; для JS подключается сам исходный файл
+    purged_path: str = ''
+
+    @property
+    def local_path(self):
+        return self.purged_path or self.source.path
+
+    @property
+    def is_script(self):
+        return self.source.path.endswith('.js')
+
+
+ASSETS = {
+    'bootstrap-css': VendorAsset(
+        VendorFile('vendor/bootstrap/bootstrap.min.css', f'{BOOTSTRAP_CDN}/css/bootstrap.min.css',
+                   'sha384-9ndCyUaIbzAi2FUVXJi0CjmCapSmO7SnpJef0486qhLnuZ2cdeRhO02iuK6FUUVM'),
+        purged_path='vendor/bootstrap/bootstrap.purged.css',
+    ),
+    'bootstrap-icons-css': VendorAsset(
+        VendorFile('vendor/bootstrap-icons/bootstrap-icons.min.css', f'{ICONS_CDN}/bootstrap-icons.min.css'),
+        purged_path='vendor/bootstrap-icons/bootstrap-icons.purged.css',
+    ),
+    'bootstrap-js': VendorAsset(
+        VendorFile('vendor/bootstrap/bootstrap.bundle.min.js', f'{BOOTSTRAP_CDN}/js/bootstrap.bundle.min.js',
+                   'sha384-geWF76RCwLtnZ8qwWowPQNguL3RmwHVBC9FhGdlKrxdiJJigb/j/68SIy3Te4Bkz'),
+    ),
+}
+
+# Файлы, на которые ссылаются CSS; пути относительны CSS-файла, как в исходнике
+EXTRA_FILES = (
+    VendorFile('vendor/bootstrap-icons/fonts/bootstrap-icons.woff2', f'{ICONS_CDN}/fonts/bootstrap-icons.woff2'),
+    VendorFile('vendor/bootstrap-icons/fonts/bootstrap-icons.woff', f'{ICONS_CDN}/fonts/bootstrap-icons.woff'),
+)
+
+# Классы, которые добавляет JS Bootstrap, а в шаблонах их нет
+SAFELIST = frozenset({
+    'show', 'showing', 'hiding', 'fade', 'collapse', 'collapsing', 'collapsed', 'active', 'disabled',
+    'modal-open', 'modal-backdrop', 'modal-static', 'offcanvas-backdrop', 'dropdown-menu-end',
+    'was-validated', 'is-valid', 'is-invalid', 'visually-hidden', 'tooltip', 'popover',
+})
+
+CLASS_TOKEN_RE = re.compile(r'[A-Za-z][\w-]*')
+SELECTOR_CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+NOT_RE = re.compile(r':not\([^)]*\)')
+COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)
+# Лицензионные комментарии /*! ... */ сохраняются
+LICENSE_RE = re.compile(r'/\*!.*?\*/', re.S)
+GROUPING_AT_RULES = ('@media', '@supports', '@container', '@layer')
+
+
+def static_source_dir():
+    return Path(settings.STATICFILES_DIRS[0])
+
+
+def integrity_of(content):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(content).digest()).decode()
+
+
+def _source_files():
+    """Шаблоны и модули, в которых встречаются CSS-классы"""
+    roots = [Path(directory) for engine in settings.TEMPLATES for directory in engine['DIRS']]
+    app_dir = Path(__file__).resolve().parent
+    roots += [app_dir / 'templates']
+    for root in roots:
+        yield from root.rglob('*.html')
+    yield app_dir / 'forms.py'
+    yield from (app_dir / 'templatetags').glob('*.py')
+
+
+def used_classes():
+    """Все слова из шаблонов и форм: лишние слова безвредны, пропущенный класс - нет"""
+    tokens = set(SAFELIST)
+    for path in _source_files():
+        tokens.update(CLASS_TOKEN_RE.findall(path.read_text(encoding='utf-8')))
+    return tokens
+
+
+def _closing_brace(css, start):
+    depth, i, quote = 0, start, None
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError('Незакрытый блок в CSS')
+
+
+def _split_selectors(prelude):
+    selectors, depth, current = [], 0, []
+    for char in prelude:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            selectors.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    selectors.append(''.join(current))
+    return [selector.strip() for selector in selectors if selector.strip()]
+
+
+def _selector_used(selector, used):
+    # Классы внутри :not() не обязаны встречаться в разметке
+    return all(name in used for name in SELECTOR_CLASS_RE.findall(NOT_RE.sub('', selector)))
+
+
+def purge_css(css, used):
+    """Оставляет правила, у которых хотя бы один селектор состоит из используемых классов"""
+    css = COMMENT_RE.sub('', css)
+    out, i = [], 0
+    while i < len(css):
+        brace = css.find('{', i)
+        if brace == -1:
+            out.append(css[i:].strip())
+            break
+        prelude = css[i:brace]
+        out.extend(LICENSE_RE.findall(prelude))
+        prelude = LICENSE_RE.sub('', prelude)
+        # Инструкции без блока (@charset, @import) перед очередным правилом
+        statement_end = prelude.rfind(';')
+        if statement_end != -1:
+            out.append(prelude[:statement_end + 1].strip())
+            prelude = prelude[statement_end + 1:]
+        prelude = prelude.strip()
+        end = _closing_brace(css, brace)
+        body = css[brace + 1:end]
+
+        if prelude.startswith(GROUPING_AT_RULES):
+            inner = purge_css(body, used)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            # @font-face, @keyframes и прочие блоки без селекторов
+            out.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [selector for selector in _split_selectors(prelude) if _selector_used(selector, used)]
+            if selectors:
+                out.append(f'{",".join(selectors)}{{{body}}}')
+        i = end + 1
+    return ''.join(out)
+
+
+def build_purged(used=None):
+    """Пересобирает урезанные CSS из скачанных файлов; возвращает [(путь, было, стало)]"""
+    used = used_classes() if used is None else used
+    root = static_source_dir()
+    results = []
+    for asset in ASSETS.values():
+        if not asset.purged_path:
+            continue
+        source = (root / asset.source.path).read_text(encoding='utf-8')
+        purged = purge_css(source, used)
+        (root / asset.purged_path).write_text(purged, encoding='utf-8')
+        results.append((asset.purged_path, len(source.encode()), len(purged.encode())))
+    return results
@@ -1,16 +1,35 @@
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.http import HttpResponseForbidden
-
-from .models import Ad, ExchangeProposal
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.db import transaction
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+
+from . import cache, counters, exchange, facets, inbox, performance, similar, trade_cycles
+from .cache import cache_anonymous_page
+from .models import Ad, ExchangeProposal, ProposalInboxEntry, title_key
+from .pagination import KeysetPaginator
+from .ratelimit import rate_limit
+from .queries import filter_ads
 from .forms import AdForm, ExchangeProposalForm, ExchangeProposalStatusForm, AdSearchForm, UserRegistrationForm, \
-    CustomLoginForm
+    CustomLoginForm, ProposalBatchForm, ProposalInboxForm
+
+ADS_PER_PAGE = 10
+# Параметры фильтра ленты: из них состоят ключ кэша страницы и ссылки на другие страницы выдачи
+AD_LIST_FILTERS = ('query', 'category', 'condition', 'is_mine')
+SENDER_ADS_PER_PAGE = 10
+
+# Поля, которые выводит карточка объявления в ad_list.html
+AD_CARD_FIELDS = ('id', 'title', 'description', 'image_url', 'thumbnails_source', 'category', 'condition',
+                  'created_at', 'user__username')
 
 
+@rate_limit('login', '10/m')
 def login_view(request):
     """Вход в аккаунт пользователя"""
     if request.user.is_authenticated:
@@ -43,6 +62,7 @@ def logout_view(request):
         messages.success(request, 'Вы успешно вышли из системы.')
     return redirect('login')
 
+@rate_limit('register', '5/h')
 def register(request):
     """Регистрация нового пользователя"""
     if request.method == 'POST':
@@ -56,55 +76,93 @@ def register(request):
     return render(request, 'ads/register.html', {'form': form})
 
 
-def ad_list(request):
-    """Отображение списка объявлений с поиском и фильтрацией"""
+def ad_list_queryset(request, user):
+    """Запрос ленты по GET-параметрам; общий для синхронной и асинхронной версий ad_list"""
     query = request.GET.get('query', '')
     category = request.GET.get('category', '')
     condition = request.GET.get('condition', '')
     is_mine = bool(request.GET.get('is_mine', ''))
 
-    queryset = Ad.objects.all()
-    print(queryset)
-    if query:
-        queryset = queryset.filter(
-            Q(title__icontains=query) | Q(description__icontains=query)
-        )
-
-    if category:
-        queryset = queryset.filter(category=category)
-
-    if condition:
-        queryset = queryset.filter(condition=condition)
-
-    if is_mine and request.user.is_authenticated:
-        queryset = queryset.filter(user=request.user)
-    paginator = Paginator(queryset, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    print(page_obj)
-    context = {
+    queryset = Ad.objects.select_related('user').only(*AD_CARD_FIELDS)
+    owner = user if is_mine and user.is_authenticated else None
+    return filter_ads(queryset, query, category, condition, owner)
+
+
+def ad_facets(request):
+    """Счетчики объявлений по категориям и состояниям для текущих фильтров ленты"""
+    owner = request.user if request.GET.get('is_mine') and request.user.is_authenticated else None
+    counts = facets.facet_counts(request.GET.get('query', ''), request.GET.get('category', ''),
+                                 request.GET.get('condition', ''), owner)
+    return JsonResponse(counts)
+
+
+def ad_list_context(request, page_obj):
+    # Ссылки строятся только из параметров ключа кэша: посторонние параметры запроса
+    # не должны попасть в страницу, которую затем получат все посетители
+    base_query = urlencode([(name, request.GET[name]) for name in AD_LIST_FILTERS if request.GET.get(name)])
+    return {
         'ads': page_obj,
+        'page_obj': page_obj,
+        'cursor_pagination': not request.GET.get('query'),
         'search_form': AdSearchForm(request.GET),
+        'base_query': base_query,
+        'page_prefix': f'?{base_query}&' if base_query else '?',
     }
 
-    return render(request, 'ads/ad_list.html', context)
+
+@cache_anonymous_page(*AD_LIST_FILTERS, 'page', 'cursor')
+def ad_list(request):
+    """Отображение списка объявлений с поиском и фильтрацией"""
+    queryset = ad_list_queryset(request, request.user)
+    if request.GET.get('query'):
+        # Результаты поиска упорядочены по релевантности, поэтому листаются по номеру страницы
+        paginator = Paginator(queryset, ADS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    else:
+        paginator = KeysetPaginator(queryset, ADS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    return render(request, 'ads/ad_list.html', ad_list_context(request, page_obj))
 
 
+def user_ads_queryset(user, ad_id, prefix=''):
+    """Объявления пользователя, которые можно предложить в обмен на ad_id, по началу заголовка"""
+    queryset = Ad.objects.filter(user=user).exclude(id=ad_id)
+    key = title_key(prefix)
+    if key:
+        # Диапазон вместо LIKE: сравнение идет по индексу (user, title_search, id)
+        queryset = queryset.filter(title_search__gte=key, title_search__lt=key + '\U0010ffff')
+    return queryset.order_by('title_search', 'id').only('id', 'title')
+
+
+@cache_anonymous_page()
 def ad_detail(request, pk):
     """Отображение детальной информации об объявлении"""
-    ad = get_object_or_404(Ad, pk=pk)
+    ad = get_object_or_404(Ad.objects.select_related('user'), pk=pk)
     context = {
         'ad': ad,
-        'is_owner': request.user == ad.user,
+        'is_owner': request.user.pk == ad.user_id,
+        'similar_ads': [row.similar for row in similar.similar_ads(ad.pk)],
     }
 
     if request.user.is_authenticated:
-        context['user_ads'] = Ad.objects.filter(user=request.user).exclude(id=ad.id)
+        # Сами объявления подгружает автодополнение (sender_ad_autocomplete)
+        context['has_user_ads'] = user_ads_queryset(request.user, ad.id).exists()
         context['proposal_form'] = ExchangeProposalForm()
 
     return render(request, 'ads/ad_detail.html', context)
 
 
+@login_required
+def sender_ad_autocomplete(request, ad_id):
+    """Автодополнение объявления, которое пользователь предлагает в обмен"""
+    user_ads = list(user_ads_queryset(request.user, ad_id, request.GET.get('q', ''))[:SENDER_ADS_PER_PAGE + 1])
+    return JsonResponse({
+        'results': [{'id': user_ad.pk, 'title': user_ad.title} for user_ad in user_ads[:SENDER_ADS_PER_PAGE]],
+        'more': len(user_ads) > SENDER_ADS_PER_PAGE,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
 @login_required
 def ad_create(request):
     """Создание нового объявления"""
@@ -158,6 +216,7 @@ def ad_delete(request, pk):
     return render(request, 'ads/ad_confirm_delete.html', {'ad': ad})
 
 
+@rate_limit('propose_exchange', '30/h', key='user')
 @login_required
 def create_exchange_proposal(request, ad_id):
     """Создание предложения обмена"""
@@ -172,11 +231,17 @@ def create_exchange_proposal(request, ad_id):
         sender_ad_id = request.POST.get('sender_ad')
         sender_ad = get_object_or_404(Ad, id=sender_ad_id, user=request.user)
 
+        if exchange.is_traded([sender_ad.pk, receiver_ad.pk]):
+            messages.error(request, 'Одно из объявлений уже участвует в принятом обмене.')
+            return redirect('ad_detail', pk=ad_id)
+
         if form.is_valid():
             proposal = form.save(commit=False)
             proposal.ad_sender = sender_ad
             proposal.ad_receiver = receiver_ad
-            proposal.save()
+            # Лента и уведомление получателю (signals.py) коммитятся вместе с предложением
+            with transaction.atomic():
+                proposal.save()
 
             messages.success(request, 'Предложение обмена успешно отправлено!')
             return redirect('ad_detail', pk=ad_id)
@@ -184,40 +249,127 @@ def create_exchange_proposal(request, ad_id):
     return redirect('ad_detail', pk=ad_id)
 
 
+def proposal_inbox_page(request, user):
+    """Фильтры ленты предложений и пагинатор по GET-параметрам"""
+    form = ProposalInboxForm(request.GET)
+    filters = form.cleaned_data if form.is_valid() else {'direction': '', 'status': ''}
+    queryset = inbox.inbox_queryset(user, filters['direction'], filters['status'])
+    return form, filters, KeysetPaginator(queryset, inbox.PER_PAGE)
+
+
+def proposal_list_context(form, filters, page_obj):
+    return {
+        'inbox_form': form,
+        'filters': filters,
+        'page_obj': page_obj,
+        'inbox_tabs': [('', 'Все')] + ProposalInboxEntry.DIRECTION_CHOICES,
+    }
+
+
 @login_required
 def my_proposals(request):
     """Просмотр предложений обмена пользователя"""
-    sent_proposals = ExchangeProposal.objects.filter(ad_sender__user=request.user).select_related('ad_sender', 'ad_receiver')
-    received_proposals = ExchangeProposal.objects.filter(ad_receiver__user=request.user).select_related('ad_sender', 'ad_receiver')
+    form, filters, paginator = proposal_inbox_page(request, request.user)
+    context = proposal_list_context(form, filters, paginator.get_page(request.GET.get('cursor')))
+    context['trade_cycles'] = trade_cycles.suggestions_for_user(request.user)
+    return render(request, 'ads/proposal_list.html', context)
+
+
+@login_required
+def proposal_inbox(request):
+    """Страница ленты предложений без обрамления: ленивые вкладки и кнопка «Показать еще»"""
+    form, filters, paginator = proposal_inbox_page(request, request.user)
+    context = proposal_list_context(form, filters, paginator.get_page(request.GET.get('cursor')))
+    return render(request, 'ads/includes/_proposal_inbox.html', context)
+
+
+@login_required
+def proposal_entry(request, proposal_id):
+    """Карточка одного предложения для обновления открытой ленты на месте (см. live.py)"""
+    entry = get_object_or_404(inbox.inbox_queryset(request.user), proposal_id=proposal_id)
+    return render(request, 'ads/includes/_proposal_card.html', {'entry': entry})
 
-    return render(request, 'ads/proposal_list.html', {
-        'sent_proposals': sent_proposals,
-        'received_proposals': received_proposals,
-    })
+
+def proposal_events(request):
+    """
+    Поток событий ленты есть только под ASGI (async_views.proposal_events):
+    под WSGI он занял бы поток сервера навсегда. 204 останавливает EventSource
+    """
+    return HttpResponse(status=204)
 
 
 @login_required
 def update_proposal_status(request, proposal_id):
     """Обновление статуса предложения обмена (принятие/отклонение)"""
-    proposal = get_object_or_404(ExchangeProposal, id=proposal_id)
+    proposal = get_object_or_404(
+        ExchangeProposal.objects.only('id', 'status', 'ad_sender_id', *counters.ROW_FIELDS),
+        id=proposal_id,
+    )
 
-    if proposal.ad_receiver.user != request.user:
+    if proposal.receiver_user_id != request.user.pk:
         messages.error(request, 'У вас нет прав для изменения статуса этого предложения.')
         return redirect('my_proposals')
 
     if request.method == 'POST':
         form = ExchangeProposalStatusForm(request.POST, instance=proposal)
         if form.is_valid():
-            form.save()
             status = form.cleaned_data['status']
 
             if status == 'accepted':
-                messages.success(request, 'Предложение обмена принято!')
-            else:
-                messages.success(request, 'Предложение обмена отклонено.')
+                try:
+                    rejected = exchange.accept_proposal(proposal)
+                except exchange.AdAlreadyTraded:
+                    messages.error(request, 'Одно из объявлений уже участвует в принятом обмене.')
+                except exchange.ProposalConflict:
+                    messages.error(request, 'Предложение уже принято или отклонено.')
+                else:
+                    messages.success(request, 'Предложение обмена принято!')
+                    if rejected:
+                        messages.info(request, f'Автоматически отклонено конфликтующих предложений: {rejected}.')
+            elif status == 'rejected':
+                if exchange.reject_proposals([proposal.pk], request.user):
+                    messages.success(request, 'Предложение обмена отклонено.')
+                else:
+                    messages.error(request, 'Предложение уже принято или отклонено.')
 
             return redirect('my_proposals')
 
     return redirect('my_proposals')
 
 
+@login_required
+@require_POST
+def update_proposals_batch(request):
+    """Принятие или отклонение нескольких полученных предложений одним запросом"""
+    form = ProposalBatchForm(request.POST, limit=exchange.BATCH_LIMIT)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('my_proposals')
+
+    proposal_ids = form.cleaned_data['proposal_ids']
+    if form.cleaned_data['status'] == 'accepted':
+        accepted, rejected = exchange.accept_proposals(proposal_ids, request.user)
+        processed = len(accepted)
+        messages.success(request, f'Принято предложений: {processed}.')
+        if rejected:
+            messages.info(request, f'Автоматически отклонено конфликтующих предложений: {rejected}.')
+    else:
+        processed = exchange.reject_proposals(proposal_ids, request.user)
+        messages.success(request, f'Отклонено предложений: {processed}.')
+
+    if processed < len(proposal_ids):
+        messages.warning(request, f'Пропущено предложений: {len(proposal_ids) - processed} - '
+                                  'они уже обработаны или недоступны.')
+    return redirect('my_proposals')
+
+
+@staff_member_required
+def performance_stats(request):
+    """Гистограммы времени ответа по именам URL (только для персонала)"""
+    return JsonResponse({
+        'histogram_enabled': settings.ADS_PERF_HISTOGRAM,
+        'urls': performance.histogram.snapshot(),
+        'page_cache': cache.get_stats(),
+    }, json_dumps_params={'ensure_ascii': False})
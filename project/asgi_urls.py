@@ -0,0 +1,18 @@
+"""
+URL configuration for ASGI requests.
+
+Same routes as project.urls, but the read paths are served by the native
+async views from ads.async_views. Selected per request by
+ads.middleware.AsgiUrlconfMiddleware.
+"""
+from django.urls import path
+
+from ads import async_views
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('', async_views.ad_list, name='ad_list'),
+    path('ads/<int:pk>/', async_views.ad_detail, name='ad_detail'),
+    path('my-proposals/', async_views.my_proposals, name='my_proposals'),
+    path('my-proposals/events/', async_views.proposal_events, name='proposal_events'),
+] + wsgi_urlpatterns
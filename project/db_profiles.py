@@ -0,0 +1,107 @@
+"""
+Профили подключения к БД, выбираются переменной окружения ADS_DB_PROFILE.
+
+sqlite (по умолчанию)
+    Файл ADS_SQLITE_PATH (BASE_DIR/db.sqlite3). Журнал WAL: читатели не
+    блокируют писателя и наоборот; synchronous=NORMAL - в режиме WAL
+    fsync только на контрольных точках; mmap для чтения без системных
+    вызовов. Транзакции начинаются с BEGIN IMMEDIATE, поэтому писатели
+    ждут друг друга в пределах busy_timeout, а не падают с "database is
+    locked" при попытке повысить блокировку посреди транзакции.
+    Соединения живут между запросами, прагмы выполняются один раз.
+    Тестовая БД - тоже файл (ADS_SQLITE_TEST_PATH), а не память: только
+    так параллельные транзакции в тестах ждут блокировку, как в работе.
+
+sqlite-legacy
+    Прежние настройки по умолчанию; нужен для сравнения в benchmark_writes.
+
+postgresql
+    Параметры из ADS_PG_*. По умолчанию пул соединений psycopg
+    (psycopg[pool], Django 5.1+): соединения открыты постоянно и
+    переиспользуются запросами. С ADS_PG_POOL=0 - постоянные соединения
+    Django (CONN_MAX_AGE) с проверкой перед использованием, например за
+    внешним пулом PgBouncer.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',
+)
+
+CONN_MAX_AGE = 600
+
+
+def _env(name, default=''):
+    return os.environ.get(name, default)
+
+
+def sqlite(base_dir):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _env('ADS_SQLITE_PATH') or base_dir / 'db.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+            # Ожидание блокировки на уровне модуля sqlite3, в секундах
+            'timeout': 5,
+        },
+        'TEST': {
+            'NAME': _env('ADS_SQLITE_TEST_PATH') or base_dir / 'test_db.sqlite3',
+        },
+    }
+
+
+def sqlite_legacy(base_dir):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _env('ADS_SQLITE_PATH') or base_dir / 'db.sqlite3',
+    }
+
+
+def postgresql(base_dir):
+    settings = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': _env('ADS_PG_NAME', 'barter'),
+        'USER': _env('ADS_PG_USER', 'barter'),
+        'PASSWORD': _env('ADS_PG_PASSWORD'),
+        'HOST': _env('ADS_PG_HOST', 'localhost'),
+        'PORT': _env('ADS_PG_PORT', '5432'),
+        'OPTIONS': {},
+    }
+    if _env('ADS_PG_POOL', '1') != '0':
+        # Пул сам держит соединения открытыми; Django требует CONN_MAX_AGE = 0
+        settings['CONN_MAX_AGE'] = 0
+        settings['OPTIONS']['pool'] = {
+            'min_size': int(_env('ADS_PG_POOL_MIN', '2')),
+            'max_size': int(_env('ADS_PG_POOL_MAX', '10')),
+            'timeout': 10,
+        }
+    else:
+        settings['CONN_MAX_AGE'] = CONN_MAX_AGE
+        settings['CONN_HEALTH_CHECKS'] = True
+    return settings
+
+
+PROFILES = {
+    'sqlite': sqlite,
+    'sqlite-legacy': sqlite_legacy,
+    'postgresql': postgresql,
+}
+
+
+def database(profile, base_dir):
+    """Настройки DATABASES['default'] для профиля"""
+    try:
+        return PROFILES[profile](base_dir)
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Неизвестный ADS_DB_PROFILE {profile!r}, допустимы: {", ".join(PROFILES)}'
+        ) from None
@@ -0,0 +1,57 @@
+"""
+Профили хранения сессий и flash-сообщений, выбираются переменной окружения
+ADS_SESSION_PROFILE.
+
+db (по умолчанию)
+    Сессии в таблице django_session, сообщения в cookie с переносом в
+    сессию при переполнении - стандартное поведение Django.
+
+cached_db
+    Чтение сессии из кэша, запись сквозная: в кэш и в БД.
+
+cache
+    Сессии только в кэше SESSION_CACHE_ALIAS, сообщения только в cookie.
+    Ни одного запроса к БД на сессию. Кэш должен быть общим для всех
+    процессов (Redis, Memcached), иначе пользователя разлогинит при
+    попадании в другой процесс; при вытеснении ключа сессия теряется.
+
+signed_cookies
+    Сессия и сообщения целиком в подписанных cookie. Ни БД, ни кэша, но
+    выход из аккаунта не отзывает украденную cookie до ее истечения.
+
+Во всех профилях сессия сохраняется только при изменении
+(SESSION_SAVE_EVERY_REQUEST по умолчанию выключен).
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+COOKIE_MESSAGES = 'django.contrib.messages.storage.cookie.CookieStorage'
+FALLBACK_MESSAGES = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
+PROFILES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'MESSAGE_STORAGE': FALLBACK_MESSAGES,
+    },
+    'cached_db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'MESSAGE_STORAGE': FALLBACK_MESSAGES,
+    },
+    'cache': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cache',
+        'MESSAGE_STORAGE': COOKIE_MESSAGES,
+    },
+    'signed_cookies': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies',
+        'MESSAGE_STORAGE': COOKIE_MESSAGES,
+    },
+}
+
+
+def session_settings(profile):
+    """SESSION_ENGINE и MESSAGE_STORAGE для профиля"""
+    try:
+        return dict(PROFILES[profile])
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Неизвестный ADS_SESSION_PROFILE {profile!r}, допустимы: {", ".join(PROFILES)}'
+        ) from None
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from . import db_profiles, session_profiles
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,11 +40,15 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'ads.apps.AdsConfig',
 ]
 
 MIDDLEWARE = [
+    'ads.middleware.AsgiUrlconfMiddleware',
+    'ads.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'ads.middleware.MediaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,9 +59,13 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'project.urls'
 
+# Для ASGI-запросов: те же маршруты, но чтение обслуживают асинхронные представления
+ASGI_URLCONF = 'project.asgi_urls'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендеринга для Server-Timing
+        'BACKEND': 'ads.performance.TimedDjangoTemplates',
         'DIRS': [
             BASE_DIR / 'templates'
         ],
@@ -64,6 +75,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'ads.context_processors.proposal_badge',
             ],
         },
     },
@@ -75,13 +87,98 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Профиль выбирается переменной окружения ADS_DB_PROFILE: sqlite (WAL), sqlite-legacy
+# или postgresql с пулом соединений, см. project/db_profiles.py
+ADS_DB_PROFILE = os.environ.get('ADS_DB_PROFILE', 'sqlite')
+
 DATABASES = {
+    'default': db_profiles.database(ADS_DB_PROFILE, BASE_DIR),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Для нескольких процессов нужен общий бэкенд, например
+# django.core.cache.backends.filebased.FileBasedCache или redis.RedisCache
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Сессии при ADS_SESSION_PROFILE=cache: отдельно, чтобы сброс кэша страниц не разлогинивал
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    },
+}
+
+# Кэш страниц ad_list/ad_detail для анонимных посетителей (ads/cache.py)
+ADS_PAGE_CACHE_ALIAS = 'default'
+ADS_PAGE_CACHE_TIMEOUT = 300
+
+# Ограничение частоты входа, регистрации и предложений обмена (ads/ratelimit.py).
+# Общий для процессов лимит требует общего кэша с атомарным incr (Redis, Memcached)
+ADS_RATE_LIMIT_ENABLED = True
+ADS_RATE_LIMIT_CACHE_ALIAS = 'default'
+# Переопределение лимитов по имени, например {'login': '20/m'}
+ADS_RATE_LIMITS = {}
+# За прокси: заголовок с адресом клиента, который выставляет сам прокси, например 'HTTP_X_REAL_IP'
+ADS_RATE_LIMIT_IP_HEADER = 'REMOTE_ADDR'
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ],
+    # Только сессия: API работает на чтение из того же клиента, а Basic-аутентификация
+    # проверяла бы пароль в каждом запросе в обход ограничения частоты входа (ads/ratelimit.py)
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+}
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # Одна JSON-строка на запрос от ads.middleware.PerformanceMiddleware
+        'ads.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
+# Гистограмма времени ответа по именам URL в памяти процесса, см. /perf/
+ADS_PERF_HISTOGRAM = True
+
+
+
+# Sessions and messages
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+
+# Профиль выбирается переменной окружения ADS_SESSION_PROFILE: db, cached_db, cache
+# или signed_cookies, см. project/session_profiles.py
+ADS_SESSION_PROFILE = os.environ.get('ADS_SESSION_PROFILE', 'db')
+
+_session_profile = session_profiles.session_settings(ADS_SESSION_PROFILE)
+SESSION_ENGINE = _session_profile['SESSION_ENGINE']
+MESSAGE_STORAGE = _session_profile['MESSAGE_STORAGE']
+SESSION_CACHE_ALIAS = 'sessions'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -118,10 +215,57 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Скачанные vendor_static копии Bootstrap и Bootstrap Icons (ads/vendor.py)
+STATICFILES_DIRS = [BASE_DIR / 'static']
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Хэш содержимого в именах и предсжатые .gz/.br, собираются collectstatic (ads/staticfiles.py)
+    'staticfiles': {
+        'BACKEND': 'ads.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Раздавать STATIC_ROOT самим Django, если перед ним нет nginx или CDN
+ADS_SERVE_STATIC = False
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Изображения объявлений отдает ads.middleware.MediaMiddleware (ads/media.py):
+# только файлы существующих объявлений, с ETag и Range
+ADS_SERVE_MEDIA = True
+# Пересылку файла можно передать фронтенд-серверу: '' (сам Django),
+# 'x-accel-redirect' (nginx, internal location ADS_MEDIA_ACCEL_PREFIX) или 'x-sendfile' (Apache)
+ADS_MEDIA_ACCEL = ''
+ADS_MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Число потоков, строящих миниатюры загруженных изображений (ads/thumbnails.py)
+ADS_THUMBNAIL_WORKERS = 2
+
+# Как часто граф цепочек обмена перечитывается из БД целиком, с (ads/trade_cycles.py).
+# Изменения из текущего процесса учитываются сразу
+ADS_TRADE_GRAPH_MAX_AGE = 300
+
+# Уведомления участникам обмена: очередь ads/outbox.py, доставка ads/notifications.py
+# (команда send_notifications). ADS_SITE_URL - для ссылок в письмах
+ADS_NOTIFICATION_BACKEND = 'ads.notifications.EmailBackend'
+ADS_NOTIFICATION_WEBHOOK_URL = 'http://127.0.0.1:8025/'
+ADS_NOTIFICATION_WEBHOOK_SECRET = ''
+ADS_SITE_URL = 'http://localhost:8000'
+
+# Шина живых обновлений ленты предложений (ads/live.py): InProcessBus для одного
+# ASGI-процесса, RedisBus (ADS_EVENT_BUS_URL) для нескольких
+ADS_EVENT_BUS = 'ads.live.InProcessBus'
+ADS_EVENT_BUS_URL = 'redis://127.0.0.1:6379/0'
+
+# В разработке письма выводятся в консоль; filebased пишет их в EMAIL_FILE_PATH
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'noreply@localhost'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
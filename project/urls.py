@@ -15,13 +15,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from ads import staticfiles
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('ads.urls')),
 ]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.ADS_SERVE_STATIC:
+    urlpatterns += [
+        re_path(rf'^{settings.STATIC_URL.strip("/")}/(?P<path>.+)$', staticfiles.serve, name='static'),
+    ]